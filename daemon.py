@@ -0,0 +1,51 @@
+import logging
+from argparse import ArgumentParser
+from pathlib import Path
+
+from quantipy.logger import setupLogger
+
+
+def main() -> None:
+    parser = ArgumentParser(
+        description="""
+        Run several strategies and cron scheduled screeners in a single
+        process.
+
+        Jobs are read from a JSON schedule (see `schedule.json`). By
+        default all trades are paper unless a job sets "live": true.
+        """
+    )
+
+    parser.add_argument(
+        "schedule",
+        type=Path,
+        nargs="?",
+        default=Path("schedule.json"),
+        help="Path of the schedule file",
+    )
+
+    parser.add_argument("-l", "--log-level", type=str, default="INFO")
+
+    args = parser.parse_args()
+
+    if not args.schedule.exists():
+        print('Could not find file along path "%s"' % args.schedule)
+        exit(1)
+
+    from quantipy.scheduler import Scheduler
+
+    scheduler = Scheduler.from_file(args.schedule)
+
+    # One logging pipeline for every hosted strategy
+    setupLogger()
+    for name in [None, *logging.root.manager.loggerDict]:
+        logging.getLogger(name).setLevel(args.log_level)
+
+    try:
+        scheduler.start()
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
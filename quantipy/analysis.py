@@ -0,0 +1,252 @@
+from typing import Iterable, Mapping, Optional, Union
+
+import numpy as np
+from pandas import DataFrame, Series
+
+ROUND_TRIP_COLUMNS = [
+    "symbol",
+    "direction",
+    "entry_time",
+    "exit_time",
+    "entry_price",
+    "exit_price",
+    "entry_size",
+    "exit_size",
+    "pnl",
+    "return",
+    "holding",
+]
+
+
+def orders_frame(orders: Union[DataFrame, Iterable[Mapping]]) -> DataFrame:
+    """
+    Normalize a sequence of orders (e.g. `trades.created` from a
+    backtest result) into a frame with `symbol`, `side`, `time`,
+    `price` and `size` columns.
+
+    Orders missing a `time` fall back to their `created_at` field.
+    """
+    frame = DataFrame(orders)
+    if frame.empty:
+        return DataFrame(columns=["symbol", "side", "time", "price", "size"])
+    if "time" not in frame and "created_at" in frame:
+        frame["time"] = frame["created_at"]
+    if "time" not in frame:
+        frame["time"] = np.arange(len(frame), dtype=float)
+    frame = frame[["symbol", "side", "time", "price", "size"]].copy()
+    for column in ("time", "price", "size"):
+        frame[column] = frame[column].astype(float)
+    return frame
+
+
+def round_trips(orders: Union[DataFrame, Iterable[Mapping]]) -> DataFrame:
+    """
+    Pair entry and exit orders into round trips for every symbol at
+    once.
+
+    Orders are paired in the order they were created per symbol: the
+    first order opens a position and the next one closes it. The side
+    of the opening order decides the direction, so a `sell` followed
+    by a `buy` is a short (`direction == -1`).
+
+    PnL is measured on traded value, so for a long:
+
+    pnl ~> (exit price * exit size) - (entry price * entry size)
+
+    and the sign is flipped for shorts. A trailing unmatched order is
+    treated as a still-open position and ignored.
+    """
+    frame = orders_frame(orders)
+    if frame.empty:
+        return DataFrame(columns=ROUND_TRIP_COLUMNS)
+
+    codes, symbols = frame["symbol"].factorize()
+    order = np.argsort(codes, kind="stable")
+    codes = codes[order]
+
+    # Position of each order within its own symbol's sequence
+    first = np.r_[True, codes[1:] != codes[:-1]]
+    starts = np.flatnonzero(first)
+    rank = np.arange(len(codes)) - np.repeat(
+        starts, np.diff(np.r_[starts, len(codes)])
+    )
+
+    paired = (rank[:-1] % 2 == 0) & (codes[:-1] == codes[1:])
+    entry = order[:-1][paired]
+    exit_ = order[1:][paired]
+
+    side = frame["side"].to_numpy()
+    time = frame["time"].to_numpy()
+    price = frame["price"].to_numpy()
+    size = frame["size"].to_numpy()
+
+    direction = np.where(side[entry] == "buy", 1, -1)
+    entry_value = price[entry] * size[entry]
+    exit_value = price[exit_] * size[exit_]
+    pnl = direction * (exit_value - entry_value)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.where(entry_value != 0, pnl / entry_value, np.nan)
+
+    return DataFrame(
+        {
+            "symbol": symbols[codes[:-1][paired]],
+            "direction": direction,
+            "entry_time": time[entry],
+            "exit_time": time[exit_],
+            "entry_price": price[entry],
+            "exit_price": price[exit_],
+            "entry_size": size[entry],
+            "exit_size": size[exit_],
+            "pnl": pnl,
+            "return": returns,
+            "holding": time[exit_] - time[entry],
+        },
+        columns=ROUND_TRIP_COLUMNS,
+    )
+
+
+def equity(trips: DataFrame) -> Series:
+    """Cumulative realized PnL ordered by exit time"""
+    ordered = trips.sort_values("exit_time", kind="stable")
+    return Series(
+        ordered["pnl"].cumsum().to_numpy(),
+        index=ordered["exit_time"].to_numpy(),
+        name="equity",
+    )
+
+
+def drawdown(trips: DataFrame, window: Optional[int] = None) -> Series:
+    """
+    Drawdown of the realized equity curve from its running peak.
+
+    When `window` is given the peak is taken over the last `window`
+    round trips only, giving a rolling drawdown.
+    """
+    curve = equity(trips)
+    if window is None:
+        peak = curve.cummax()
+    else:
+        peak = curve.rolling(window, min_periods=1).max()
+    # Starting equity (zero) counts as a peak too
+    peak = peak.clip(lower=0)
+    return (curve - peak).rename("drawdown")
+
+
+def exposure(
+    trips: DataFrame,
+    start: Optional[float] = None,
+    stop: Optional[float] = None,
+) -> float:
+    """
+    Fraction of the `start`-`stop` window in which at least one
+    position was open, across all symbols.
+
+    Overlapping positions only count once.
+    """
+    if trips.empty:
+        return 0.0
+    entry = trips["entry_time"].to_numpy(dtype=float)
+    exit_ = trips["exit_time"].to_numpy(dtype=float)
+    start = entry.min() if start is None else float(start)
+    stop = exit_.max() if stop is None else float(stop)
+    if stop <= start:
+        return 0.0
+
+    entry, exit_ = np.clip(entry, start, stop), np.clip(exit_, start, stop)
+    order = np.argsort(entry, kind="stable")
+    entry, exit_ = entry[order], exit_[order]
+
+    # Merge overlapping intervals: a new block starts whenever an
+    # entry is past every exit seen so far
+    reach = np.maximum.accumulate(exit_)
+    blocks = np.flatnonzero(np.r_[True, entry[1:] > reach[:-1]])
+    covered = np.maximum.reduceat(exit_, blocks) - entry[blocks]
+    return float(covered.sum() / (stop - start))
+
+
+def holding_periods(
+    trips: DataFrame, quantiles: Iterable[float] = (0.25, 0.5, 0.75, 0.95)
+) -> dict:
+    """Distribution of holding periods (in seconds)"""
+    holding = trips["holding"].to_numpy(dtype=float)
+    if not len(holding):
+        return {}
+    stats = {"mean": float(holding.mean()), "max": float(holding.max())}
+    for q, value in zip(quantiles, np.quantile(holding, list(quantiles))):
+        stats["p%d" % round(q * 100)] = float(value)
+    return stats
+
+
+def summarize(
+    trips: DataFrame,
+    start: Optional[float] = None,
+    stop: Optional[float] = None,
+) -> dict:
+    """
+    Aggregate statistics for a set of round trips:
+
+    - trades, wins, win rate
+    - gross profit / loss, net PnL and profit factor
+    - expectancy (average PnL per round trip)
+    - exposure over the `start`-`stop` window
+    - holding period distribution
+    - maximum drawdown of the realized equity curve
+    """
+    pnl = trips["pnl"].to_numpy(dtype=float)
+    trades = len(pnl)
+    wins = int((pnl > 0).sum())
+    profit = float(pnl[pnl > 0].sum())
+    loss = float(pnl[pnl <= 0].sum())
+
+    if loss:
+        profit_factor = abs(profit / loss)
+    else:
+        profit_factor = np.inf if profit else np.nan
+
+    return {
+        "trades": trades,
+        "wins": wins,
+        "win_rate": wins / trades if trades else np.nan,
+        "gross_profit": profit,
+        "gross_loss": loss,
+        "net": profit + loss,
+        "profit_factor": profit_factor,
+        "expectancy": float(pnl.mean()) if trades else np.nan,
+        "exposure": exposure(trips, start, stop),
+        "holding": holding_periods(trips),
+        "max_drawdown": float(drawdown(trips).min()) if trades else 0.0,
+    }
+
+
+def by_symbol(trips: DataFrame) -> DataFrame:
+    """Per-symbol trade counts, wins, win rate and net PnL"""
+    grouped = trips.assign(win=trips["pnl"] > 0).groupby("symbol", sort=True)
+    frame = grouped.agg(
+        trades=("pnl", "size"), wins=("win", "sum"), net=("pnl", "sum")
+    )
+    frame["win_rate"] = frame["wins"] / frame["trades"]
+    return frame
+
+
+def analyze(
+    results: Mapping,
+    start: Optional[float] = None,
+    stop: Optional[float] = None,
+) -> dict:
+    """
+    Analyze a backtest results dictionary (as written by `run.py`).
+
+    The backtest `start_time` and `stop_time` are used for the
+    exposure window unless overridden.
+    """
+    trips = round_trips(results["trades"]["created"])
+    if start is None and "start_time" in results:
+        start = float(results["start_time"])
+    if stop is None and "stop_time" in results:
+        stop = float(results["stop_time"])
+    return {
+        "round_trips": trips,
+        "symbols": by_symbol(trips),
+        "summary": summarize(trips, start, stop),
+    }
@@ -0,0 +1,152 @@
+from collections import namedtuple
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+
+# `tracker` is the pid of the resource tracker the creator registered
+# the block with (`None` when it inherited its parent's)
+ArenaHandle = namedtuple(
+    "ArenaHandle",
+    field_names=["name", "rows", "index", "tracker"],
+    defaults=(None,),
+)
+
+
+def tracker_pid() -> Optional[int]:
+    """
+    The pid of the resource tracker this process started, `None` when
+    it uses its parent's (spawned children get the tracker's fd but
+    not its pid, forked ones copy both)
+    """
+    return getattr(resource_tracker._resource_tracker, "_pid", None)
+
+
+class PriceArena:
+    """
+    OHLCV price history for many symbols stored once in a
+    `multiprocessing.shared_memory` block.
+
+    The block holds one float64 row per column (`COLUMNS`) with every
+    symbol's bars laid out back to back, and `index` maps each symbol
+    to its `(offset, length)`. The creating process passes `handle`
+    (a tiny picklable tuple) to workers, which `attach` to the block
+    and get zero-copy, read-only NumPy views instead of loading and
+    pickling their own copy of the history.
+
+    The creator owns the block and must `unlink` it (or use the arena
+    as a context manager) once every worker is done.
+    """
+
+    def __init__(
+        self,
+        shm: SharedMemory,
+        rows: int,
+        index: Dict[str, Tuple[int, int]],
+        owner: bool = False,
+        tracker: Optional[int] = None,
+    ) -> None:
+        self.shm = shm
+        self.rows = rows
+        self.index = index
+        self.owner = owner
+        self.tracker = tracker_pid() if owner else tracker
+        self.array = np.ndarray(
+            (len(COLUMNS), rows), dtype=np.float64, buffer=shm.buf
+        )
+        if not owner:
+            self.array.flags.writeable = False
+
+    @classmethod
+    def create(
+        cls,
+        data: Mapping[str, Mapping[str, Sequence]],
+        name: Optional[str] = None,
+    ) -> "PriceArena":
+        """
+        Copy `data` (symbol -> blankly style dict of columns, or a
+        DataFrame) into a new shared block. Missing columns are NaN.
+        """
+        index, offset = {}, 0
+        for symbol, columns in data.items():
+            length = len(columns["close"])
+            index[symbol] = (offset, length)
+            offset += length
+
+        size = max(len(COLUMNS) * offset * 8, 1)
+        shm = SharedMemory(name=name, create=True, size=size)
+        arena = cls(shm, offset, index, owner=True)
+        for symbol, columns in data.items():
+            start, length = index[symbol]
+            for row, column in enumerate(COLUMNS):
+                if column in columns:
+                    values = np.asarray(columns[column], dtype=np.float64)
+                else:
+                    values = np.nan
+                arena.array[row, start : start + length] = values
+        arena.array.flags.writeable = False
+        return arena
+
+    @classmethod
+    def attach(cls, handle: ArenaHandle) -> "PriceArena":
+        try:
+            # Python 3.13+, attaching doesn't register the block at all
+            shm = SharedMemory(name=handle.name, track=False)
+        except TypeError:
+            shm = SharedMemory(name=handle.name)
+            # Attaching registers the block with this process' resource
+            # tracker. When that's the creator's (the same process, or
+            # its spawned or forked workers) it's the creator's own
+            # registration, which must stay so the creator's `unlink`
+            # (or the tracker, if the creator crashes) cleans up. A
+            # tracker of our own would unlink it when we exit
+            own = tracker_pid()
+            if own is not None and own != handle.tracker:
+                resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(
+            shm, handle.rows, dict(handle.index), tracker=handle.tracker
+        )
+
+    @property
+    def handle(self) -> ArenaHandle:
+        return ArenaHandle(self.shm.name, self.rows, self.index, self.tracker)
+
+    @property
+    def symbols(self) -> Sequence[str]:
+        return list(self.index)
+
+    def column(self, symbol: str, column: str) -> np.ndarray:
+        start, length = self.index[symbol]
+        return self.array[COLUMNS.index(column), start : start + length]
+
+    def __getitem__(self, symbol: str) -> Dict[str, np.ndarray]:
+        start, length = self.index[symbol]
+        return {
+            column: self.array[row, start : start + length]
+            for row, column in enumerate(COLUMNS)
+        }
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def close(self) -> None:
+        # Views into the buffer must be gone before it can be closed
+        self.array = None
+        self.shm.close()
+
+    def unlink(self) -> None:
+        self.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self) -> "PriceArena":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.unlink()
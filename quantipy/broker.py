@@ -0,0 +1,491 @@
+import logging
+import math
+from collections import deque
+from pathlib import Path
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+from blankly import StrategyState
+from blankly.utils import AttributeDict
+from blankly.utils.exceptions import InvalidOrder
+from pandas import read_csv
+
+from quantipy import storage
+from quantipy.resample import COLUMNS, Timeframe, aggregate, seconds
+from quantipy.storage import SUFFIX
+
+# Same limits and rounding as blankly's keyless paper trading
+MIN_SIZE = 1e-9
+MAX_SIZE = 1e15
+DECIMALS = 9
+
+SIDES = {"buy": 1, "sell": -1}
+
+
+def trunc(number: float, decimals: int = DECIMALS) -> float:
+    stepper = 10.0**decimals
+    return math.trunc(stepper * number) / stepper
+
+
+class SimulatedOrder:
+    """
+    A filled market order, answering the `MarketOrder` calls the
+    strategies make without going back to the broker
+    """
+
+    __slots__ = ("response",)
+
+    def __init__(self, response: dict) -> None:
+        self.response = response
+
+    def get_id(self) -> str:
+        return self.response["id"]
+
+    def get_side(self) -> str:
+        return self.response["side"]
+
+    def get_size(self) -> float:
+        return self.response["size"]
+
+    def get_price(self) -> float:
+        return self.response["price"]
+
+    def get_status(self, full: bool = True) -> dict:
+        if full:
+            return self.response
+        return {"status": self.response["status"]}
+
+
+class SimulatedBroker:
+    """
+    A minimal local stand-in for blankly's `PaperTrade` interface.
+
+    It implements only what `TradeManager` and `SimpleStrategy` use
+    (`cash`, `account`, `get_account`, `market_order`, `get_price` and
+    `history`) over local price history (symbol -> blankly style dict
+    of columns, or a DataFrame). Balances live in one float64 array
+    indexed by asset and every fill is appended to an order log, so a
+    replay costs a few array updates per order instead of blankly's
+    account bookkeeping and order lookups.
+
+    Fills follow `PaperTrade` on a keyless exchange: orders fill at
+    the current price, sizes and balances are truncated to 9 decimals
+    and the taker `fee` comes out of what is received. Selling more
+    than is held raises `InvalidOrder` unless `shortable`.
+
+    The clock (`time()`) and prices are driven by `replay`.
+    """
+
+    logger = logging.getLogger("SimulatedBroker")
+
+    def __init__(
+        self,
+        data: Mapping[str, Mapping[str, Sequence]],
+        initial_values: Optional[Mapping[str, float]] = None,
+        quote: str = "USD",
+        fee: float = 0.0,
+        shortable: bool = False,
+    ) -> None:
+        self.quote = quote
+        self.fee = fee
+        self.shortable = shortable
+        self.now = 0.0
+        self.data = {
+            symbol: {
+                column: np.asarray(columns[column], dtype=float)
+                for column in COLUMNS
+                if column in columns
+            }
+            for symbol, columns in data.items()
+        }
+        self.prices: Dict[str, float] = {}
+
+        self.assets: Dict[str, int] = {}
+        self.balances = np.zeros(0)
+        self.asset(quote)
+        for symbol in self.data:
+            self.asset(symbol.partition("-")[0])
+        for asset, value in (initial_values or {}).items():
+            self.balances[self.asset(asset)] = value
+
+        # The order log, one entry per column per fill
+        self.log: Dict[str, list] = {
+            column: []
+            for column in ("time", "symbol", "side", "size", "price", "funds")
+        }
+
+    def asset(self, name: str) -> int:
+        """Index of `name` in `balances`, adding it when new"""
+        index = self.assets.get(name)
+        if index is None:
+            index = self.assets[name] = len(self.assets)
+            self.balances = np.append(self.balances, 0.0)
+        return index
+
+    def time(self) -> float:
+        return self.now
+
+    def get_exchange_type(self) -> str:
+        return "simulated"
+
+    def get_price(self, symbol: str) -> float:
+        return self.prices[symbol]
+
+    def get_account(
+        self, symbol: Optional[str] = None
+    ) -> Union[AttributeDict, float]:
+        if symbol is not None:
+            return self._account(self.assets[symbol])
+        return AttributeDict(
+            {asset: self._account(i) for asset, i in self.assets.items()}
+        )
+
+    def _account(self, index: int) -> AttributeDict:
+        return AttributeDict(
+            {"available": float(self.balances[index]), "hold": 0.0}
+        )
+
+    @property
+    def account(self) -> AttributeDict:
+        return self.get_account()
+
+    @property
+    def cash(self) -> float:
+        return float(self.balances[self.assets[self.quote]])
+
+    def market_order(
+        self, symbol: str, side: str, size: float
+    ) -> SimulatedOrder:
+        if side not in SIDES:
+            raise InvalidOrder("Invalid trade side: %s" % side)
+        if size < MIN_SIZE:
+            raise InvalidOrder(
+                "Size is too small. Minimum is: %s. You requested %s."
+                % (MIN_SIZE, size)
+            )
+        if size > MAX_SIZE:
+            raise InvalidOrder(
+                "Size is too large. Maximum is: %s. You requested %s."
+                % (MAX_SIZE, size)
+            )
+
+        base, _, quote = symbol.partition("-")
+        b, q = self.asset(base), self.asset(quote)
+        price = self.get_price(symbol)
+        funds = price * size
+        size = trunc(size)
+
+        balances = self.balances
+        if side == "buy":
+            requested = trunc(funds)
+            if balances[q] < requested:
+                raise InvalidOrder(
+                    "Insufficient funds. Available: %s requested: %s."
+                    % (balances[q], requested)
+                )
+            balances[b] = trunc(balances[b] + trunc(size - size * self.fee))
+            balances[q] = trunc(balances[q] + trunc(-funds))
+        else:
+            available = trunc(balances[b])
+            if not self.shortable and available < size:
+                raise InvalidOrder(
+                    "Not enough base currency. Available: %s. requested: %s."
+                    % (available, size)
+                )
+            balances[b] = trunc(balances[b] + trunc(-size))
+            balances[q] = trunc(balances[q] + trunc(funds - funds * self.fee))
+
+        log = self.log
+        log["time"].append(self.now)
+        log["symbol"].append(symbol)
+        log["side"].append(SIDES[side])
+        log["size"].append(size)
+        log["price"].append(price)
+        log["funds"].append(funds)
+        return SimulatedOrder(
+            {
+                "id": str(len(log["time"])),
+                "symbol": symbol,
+                "side": side,
+                "size": size,
+                "price": price,
+                "type": "market",
+                "status": "done",
+                "created_at": self.now,
+            }
+        )
+
+    def history(
+        self,
+        symbol: str,
+        to: int = 200,
+        resolution: Timeframe = "1d",
+        return_as: str = "deque",
+        **kwargs,
+    ) -> Dict[str, deque]:
+        """
+        The last `to` bars before the current bar, like a backtest's
+        `history`. Coarser resolutions than the data are resampled.
+        """
+        return self._history(self.data[symbol], to, resolution)
+
+    def _history(
+        self, columns: Mapping[str, np.ndarray], to: int, resolution: Timeframe
+    ) -> Dict[str, deque]:
+        end = int(np.searchsorted(columns["time"], self.now, side="left"))
+        bars = {column: values[:end] for column, values in columns.items()}
+        step = seconds(resolution)
+        if len(bars["time"]) > 1 and step > bars["time"][1] - bars["time"][0]:
+            bars = aggregate(bars, step)
+        return {
+            column: deque(values[-to:].tolist(), to)
+            for column, values in bars.items()
+        }
+
+    def orders(self) -> List[dict]:
+        """The order log as `quantipy.analysis` style orders"""
+        log = self.log
+        return [
+            {
+                "time": time,
+                "symbol": symbol,
+                "side": "buy" if side > 0 else "sell",
+                "size": size,
+                "price": price,
+            }
+            for time, symbol, side, size, price in zip(
+                log["time"],
+                log["symbol"],
+                log["side"],
+                log["size"],
+                log["price"],
+            )
+        ]
+
+
+def replay(
+    strategy: object,
+    broker: SimulatedBroker,
+    symbols: Optional[Iterable[str]] = None,
+    resolution: Timeframe = "1m",
+    start: Optional[float] = None,
+    stop: Optional[float] = None,
+) -> SimulatedBroker:
+    """
+    Run `strategy` over the broker's price history as fast as the
+    strategy can tick, standing in for `strategy.backtest`.
+
+    Every symbol is initialized (`init`) at its first bar in the
+    `start`-`stop` window, then `tick` gets every bar's close in time
+    order (symbols in the order given on the same bar), which is the
+    price a blankly backtest passes for that bar.
+    """
+    symbols = list(broker.data if symbols is None else symbols)
+    strategy.interface = broker
+    strategy.time = broker.time
+    step = seconds(resolution)
+
+    times, closes, owners = [], [], []
+    for i, symbol in enumerate(symbols):
+        time = broker.data[symbol]["time"]
+        lo = 0 if start is None else np.searchsorted(time, start, "left")
+        hi = (
+            len(time) if stop is None else np.searchsorted(time, stop, "right")
+        )
+        times.append(time[lo:hi])
+        closes.append(broker.data[symbol]["close"][lo:hi])
+        owners.append(np.full(hi - lo, i))
+    time, close, owner = (
+        np.concatenate(times),
+        np.concatenate(closes),
+        np.concatenate(owners),
+    )
+    order = np.lexsort((owner, time))
+
+    states = {}
+    prices = broker.prices
+    for t, price, i in zip(
+        time[order].tolist(), close[order].tolist(), owner[order].tolist()
+    ):
+        symbol = symbols[i]
+        broker.now = t
+        prices[symbol] = price
+        state = states.get(symbol)
+        if state is None:
+            state = states[symbol] = StrategyState(
+                strategy, AttributeDict({}), symbol, resolution=step
+            )
+            strategy.init(symbol, state)
+        strategy.tick(price, symbol, state)
+    return broker
+
+
+# Price history to stream, a csv or compact price file (read in
+# chunks) or columns
+Source = Union[Path, str, Mapping[str, Sequence]]
+
+
+def chunks(
+    source: Source, size: int = 8192
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    `source`'s bars, `size` at a time (a block at a time for compact
+    price files, see `quantipy.storage`), as blankly style columns
+    """
+    if isinstance(source, (Path, str)) and Path(source).suffix == SUFFIX:
+        yield from storage.blocks(source, COLUMNS)
+        return
+    if isinstance(source, (Path, str)):
+        with read_csv(source, chunksize=size) as reader:
+            for frame in reader:
+                yield {c: frame[c].to_numpy(dtype=float) for c in COLUMNS}
+        return
+    columns = {c: np.asarray(source[c], dtype=float) for c in COLUMNS}
+    for start in range(0, len(columns["time"]), size):
+        yield {c: v[start : start + size] for c, v in columns.items()}
+
+
+def merge(
+    sources: Sequence[Source], size: int = 8192
+) -> Iterator[Tuple[np.ndarray, Dict[str, np.ndarray]]]:
+    """
+    A k-way merge of the bars of every source, in time order (ties in
+    the order of `sources`), as batches of (source index, columns).
+
+    Each batch holds every bar up to the earliest last bar of the
+    chunks being read, which no chunk still to come can precede, so
+    only one chunk per source is ever in memory.
+    """
+    readers = [chunks(source, size) for source in sources]
+    pending = [next(reader, None) for reader in readers]
+    while True:
+        loaded = [c for c in pending if c is not None and len(c["time"])]
+        if not loaded:
+            return
+        horizon = min(c["time"][-1] for c in loaded)
+
+        parts, owners = [], []
+        for i, chunk in enumerate(pending):
+            if chunk is None or not len(chunk["time"]):
+                continue
+            end = int(np.searchsorted(chunk["time"], horizon, "right"))
+            parts.append({c: v[:end] for c, v in chunk.items()})
+            owners.append(np.full(end, i))
+            if end == len(chunk["time"]):
+                pending[i] = next(readers[i], None)
+            else:
+                pending[i] = {c: v[end:] for c, v in chunk.items()}
+
+        owner = np.concatenate(owners)
+        columns = {c: np.concatenate([p[c] for p in parts]) for c in COLUMNS}
+        order = np.lexsort((owner, columns["time"]))
+        yield owner[order], {c: v[order] for c, v in columns.items()}
+
+
+class StreamingBroker(SimulatedBroker):
+    """
+    A `SimulatedBroker` that only holds the last `window` bars of each
+    symbol, fed to it bar by bar by `stream`.
+
+    `history` answers from that window, so it matches a broker holding
+    the whole history as long as the window covers the longest history
+    the strategy reads (e.g `HISTORY` bars, times the bars per bar of a
+    coarser resolution it asks for).
+    """
+
+    def __init__(
+        self,
+        symbols: Iterable[str],
+        window: int = 10_000,
+        initial_values: Optional[Mapping[str, float]] = None,
+        quote: str = "USD",
+        fee: float = 0.0,
+        shortable: bool = False,
+    ) -> None:
+        symbols = list(symbols)
+        super().__init__(
+            {symbol: {} for symbol in symbols},
+            initial_values,
+            quote=quote,
+            fee=fee,
+            shortable=shortable,
+        )
+        self.window = window
+        # (time, open, high, low, close, volume) per bar
+        self.bars: Dict[str, deque] = {
+            symbol: deque(maxlen=window) for symbol in symbols
+        }
+
+    def history(
+        self,
+        symbol: str,
+        to: int = 200,
+        resolution: Timeframe = "1d",
+        return_as: str = "deque",
+        **kwargs,
+    ) -> Dict[str, deque]:
+        bars = np.array(self.bars[symbol], dtype=float).reshape(-1, 6)
+        return self._history(dict(zip(COLUMNS, bars.T)), to, resolution)
+
+
+def stream(
+    strategy: object,
+    sources: Mapping[str, Source],
+    initial_values: Optional[Mapping[str, float]] = None,
+    resolution: Timeframe = "1m",
+    start: Optional[float] = None,
+    stop: Optional[float] = None,
+    quote: str = "USD",
+    fee: float = 0.0,
+    window: int = 10_000,
+    chunk: int = 8192,
+) -> StreamingBroker:
+    """
+    `replay` out of core: every symbol's bars are read from its source
+    `chunk` bars at a time and merged into one time ordered stream
+    (see `merge`), and only the last `window` bars of each are kept.
+    Memory stays the same however long the history (about `chunk` +
+    `window` bars per symbol), and the fills match `replay` over the
+    same bars (see `StreamingBroker` for the size of `window` that
+    takes).
+    """
+    symbols = list(sources)
+    broker = StreamingBroker(symbols, window, initial_values, quote, fee)
+    strategy.interface = broker
+    strategy.time = broker.time
+    step = seconds(resolution)
+
+    states = {}
+    prices = broker.prices
+    windows = [broker.bars[symbol] for symbol in symbols]
+    for owner, columns in merge(list(sources.values()), chunk):
+        bars = zip(*(columns[c].tolist() for c in COLUMNS))
+        for i, bar in zip(owner.tolist(), bars):
+            windows[i].append(bar)
+            t = bar[0]
+            if start is not None and t < start:
+                continue
+            if stop is not None and t > stop:
+                # Every bar still to come is later
+                return broker
+            symbol = symbols[i]
+            broker.now = t
+            prices[symbol] = bar[4]
+            state = states.get(symbol)
+            if state is None:
+                state = states[symbol] = StrategyState(
+                    strategy, AttributeDict({}), symbol, resolution=step
+                )
+                strategy.init(symbol, state)
+            strategy.tick(bar[4], symbol, state)
+    return broker
@@ -0,0 +1,106 @@
+from typing import Iterable, Iterator, Union
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    A fixed capacity, NumPy backed ring buffer with a (small) deque-like
+    interface.
+
+    Appending past `maxlen` overwrites the oldest value. Values are
+    stored unboxed in a single array so whole-buffer reads are a
+    single copy instead of a Python level iteration.
+    """
+
+    def __init__(
+        self,
+        maxlen: int,
+        iterable: Iterable[float] = (),
+        dtype: Union[str, np.dtype] = np.float64,
+    ) -> None:
+        if maxlen < 1:
+            raise ValueError("RingBuffer maxlen must be positive")
+        self.maxlen = maxlen
+        self._data = np.empty(maxlen, dtype=dtype)
+        self._start = 0
+        self._size = 0
+        self.extend(iterable)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._data.dtype
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def append(self, value: float) -> None:
+        end = (self._start + self._size) % self.maxlen
+        self._data[end] = value
+        if self._size < self.maxlen:
+            self._size += 1
+        else:
+            self._start = (self._start + 1) % self.maxlen
+
+    def extend(self, values: Iterable[float]) -> None:
+        values = np.asarray(
+            list(values) if not hasattr(values, "__len__") else values
+        )
+        if not len(values):
+            return
+        values = values[-self.maxlen :]
+        count = len(values)
+        end = (self._start + self._size) % self.maxlen
+        first = min(count, self.maxlen - end)
+        self._data[end : end + first] = values[:first]
+        self._data[: count - first] = values[first:]
+        overflow = max(self._size + count - self.maxlen, 0)
+        self._size = min(self._size + count, self.maxlen)
+        self._start = (self._start + overflow) % self.maxlen
+
+    def clear(self) -> None:
+        self._start = 0
+        self._size = 0
+
+    def to_numpy(self) -> np.ndarray:
+        """An ordered (oldest first) copy of the buffer contents"""
+        end = self._start + self._size
+        if end <= self.maxlen:
+            return self._data[self._start : end].copy()
+        return np.concatenate(
+            (self._data[self._start :], self._data[: end - self.maxlen])
+        )
+
+    def __array__(
+        self, dtype: np.dtype = None, copy: bool = None
+    ) -> np.ndarray:
+        array = self.to_numpy()
+        return array if dtype is None else array.astype(dtype)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(self.to_numpy().tolist())
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[float, np.ndarray]:
+        if isinstance(index, slice):
+            return self.to_numpy()[index]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("RingBuffer index out of range")
+        return self._data[(self._start + index) % self.maxlen].item()
+
+    def __setitem__(self, index: int, value: float) -> None:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("RingBuffer index out of range")
+        self._data[(self._start + index) % self.maxlen] = value
+
+    def __repr__(self) -> str:
+        return "RingBuffer(%s, maxlen=%d)" % (self.to_numpy(), self.maxlen)
@@ -0,0 +1,239 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+from blankly.utils.time_builder import time_interval_to_seconds
+
+from quantipy.types import HistoricalData
+
+Resolution = Union[str, int, float]
+
+
+class HistoryCache:
+    """
+    Shares history fetches between every strategy and screener hosted
+    in one process.
+
+    Responses are keyed by exchange, symbol, bar count and resolution
+    and stay fresh for one bar (or `ttl` seconds). Concurrent requests
+    for the same key wait for the first fetch instead of issuing their
+    own. Every caller gets its own copy of the deques since strategies
+    append to them on each tick.
+    """
+
+    logger = logging.getLogger("HistoryCache")
+
+    def __init__(self, ttl: Optional[float] = None) -> None:
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple, Tuple[float, dict]] = {}
+        self._locks: Dict[Tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def copy(response: dict) -> HistoricalData:
+        return {
+            column: deque(values, values.maxlen)
+            for column, values in response.items()
+        }
+
+    def _key_lock(self, key: Tuple) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def history(
+        self, interface: object, symbol: str, to: int, resolution: Resolution
+    ) -> HistoricalData:
+        key = (interface.get_exchange_type(), symbol, to, str(resolution))
+        ttl = self.ttl
+        if ttl is None:
+            ttl = time_interval_to_seconds(resolution)
+
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] < ttl:
+                self.hits += 1
+                return self.copy(entry[1])
+            self.misses += 1
+            self.logger.debug("Fetching %d bars of %s", to, symbol)
+            response = interface.history(
+                symbol, to=to, resolution=resolution, return_as="deque"
+            )
+            self._entries[key] = (time.time(), response)
+            return self.copy(response)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# An indicator value, one array or a dict of them (e.g MACD lines)
+Indicator = Union[np.ndarray, Dict[str, np.ndarray]]
+
+
+def digest(values: np.ndarray) -> str:
+    return hashlib.blake2b(
+        np.ascontiguousarray(values, dtype=float).tobytes(), digest_size=16
+    ).hexdigest()
+
+
+class IndicatorCache:
+    """
+    Whole-series indicator values kept on disk, next to the price
+    cache, so repeated backtests and optimizer runs over the same
+    prices skip the indicator work.
+
+    Entries are keyed by the caller's key (e.g symbol, resolution and
+    where the range starts) and the indicator's name, which carries
+    its parameters. Each holds the values and a hash of the closes
+    they were computed from, a differing hash is a miss. When bars
+    were appended since, only the new bars are computed: the indicator
+    runs over them plus `warmup` bars before, and the result is kept
+    if it matches the cached values where they overlap (otherwise the
+    whole series is recomputed).
+
+    Files are evicted least recently used first once the directory
+    outgrows `max_bytes`.
+
+    Only whole-series evaluation (`Program.precompute`, as walk-forward
+    runs do) goes through it. Tick by tick backtests evaluate over the
+    rolling history instead and never read it.
+    """
+
+    logger = logging.getLogger("IndicatorCache")
+
+    def __init__(
+        self,
+        directory: Union[Path, str] = "./price_caches/indicators",
+        max_bytes: int = 256 * 1024**2,
+        warmup: int = 500,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.warmup = warmup
+        self.hits = 0
+        self.extended = 0
+        self.misses = 0
+
+    def path(self, key: Tuple, name: str) -> Path:
+        name = hashlib.blake2b(
+            repr((*key, name)).encode(), digest_size=16
+        ).hexdigest()
+        return self.directory / f"{name}.npz"
+
+    def load(self, path: Path) -> Optional[Tuple[int, str, Indicator]]:
+        try:
+            with np.load(path, allow_pickle=False) as fp:
+                columns = {
+                    column[2:]: fp[column]
+                    for column in fp.files
+                    if column.startswith("v:")
+                }
+                length, hashed = int(fp["length"]), str(fp["digest"])
+        except (OSError, KeyError, ValueError):
+            return None
+        # Mark it as recently used
+        os.utime(path)
+        value = columns.pop("", None) if list(columns) == [""] else columns
+        return length, hashed, value
+
+    def store(self, path: Path, close: np.ndarray, value: Indicator) -> None:
+        columns = value if isinstance(value, dict) else {"": value}
+        arrays = {"v:" + key: np.asarray(a) for key, a in columns.items()}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Written aside and moved in place, so concurrent readers (e.g
+        # walk-forward workers) never see half a file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fp:
+            np.savez(fp, length=len(close), digest=digest(close), **arrays)
+        os.replace(tmp, path)
+        self.evict(keep=path)
+
+    def evict(self, keep: Optional[Path] = None) -> None:
+        entries = []
+        for path in self.directory.glob("*.npz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _extend(
+        self,
+        close: np.ndarray,
+        length: int,
+        cached: Indicator,
+        compute: Callable[[np.ndarray], Indicator],
+    ) -> Optional[Indicator]:
+        start = length - self.warmup
+        if start <= 0:
+            return None
+        tail = compute(close[start:])
+        old = cached if isinstance(cached, dict) else {"": cached}
+        new = tail if isinstance(tail, dict) else {"": tail}
+        if old.keys() != new.keys():
+            return None
+        # The last bars of the warmup have to agree with the cache
+        check = min(16, self.warmup)
+        for key in old:
+            if not np.allclose(
+                new[key][self.warmup - check : self.warmup],
+                old[key][length - check : length],
+                rtol=1e-9,
+                atol=1e-12,
+                equal_nan=True,
+            ):
+                return None
+        merged = {
+            key: np.concatenate([old[key], new[key][self.warmup :]])
+            for key in old
+        }
+        return merged if isinstance(cached, dict) else merged[""]
+
+    def get(
+        self,
+        key: Tuple,
+        name: str,
+        close: np.ndarray,
+        compute: Callable[[np.ndarray], Indicator],
+    ) -> Indicator:
+        """The `name` indicator of `close`, `compute`d when not cached"""
+        close = np.asarray(close, dtype=float)
+        path = self.path(key, name)
+        entry = self.load(path) if path.exists() else None
+        if entry is not None:
+            length, hashed, cached = entry
+            if length <= len(close) and hashed == digest(close[:length]):
+                if length == len(close):
+                    self.hits += 1
+                    return cached
+                value = self._extend(close, length, cached, compute)
+                if value is not None:
+                    self.extended += 1
+                    self.store(path, close, value)
+                    return value
+
+        self.misses += 1
+        self.logger.debug("Computing %s for %s", name, key)
+        value = compute(close)
+        self.store(path, close, value)
+        return value
@@ -0,0 +1,87 @@
+import logging
+import pickle
+from collections import namedtuple
+from pathlib import Path
+from typing import Union
+
+VERSION = 1
+
+logger = logging.getLogger("Checkpoint")
+
+Checkpoint = namedtuple(
+    "Checkpoint",
+    field_names=[
+        "version",
+        "time",
+        "account",
+        "data",
+        "frames",
+        "positions",
+        "audit_log",
+    ],
+)
+
+
+def account_values(interface: object) -> dict:
+    """Total (available + held) balance of every non-empty asset"""
+    values = {}
+    for asset, account in interface.get_account().items():
+        total = account["available"] + account["hold"]
+        if total:
+            values[asset] = total
+    return values
+
+
+def capture(strategy: object, time: float) -> Checkpoint:
+    """
+    Snapshot everything a strategy needs to carry on from `time`
+    instead of replaying from the first bar: the price history buffers
+    (which is all indicator state is derived from), resampled
+    timeframes, open positions, the audit log and the account values
+    of the (paper) interface it ran on.
+    """
+    # Audit records of late ticks may still be queued
+    strategy.watchdog.flush()
+    return Checkpoint(
+        version=VERSION,
+        time=float(time),
+        account=account_values(strategy.interface),
+        data=dict(strategy.data),
+        frames=strategy.frames,
+        positions=dict(strategy.manager.state.positions),
+        audit_log=dict(strategy._audit_log),
+    )
+
+
+def save(strategy: object, path: Union[Path, str], time: float) -> Checkpoint:
+    checkpoint = capture(strategy, time)
+    with open(path, "wb") as fp:
+        pickle.dump(checkpoint, fp, protocol=pickle.HIGHEST_PROTOCOL)
+    logger.info("Wrote checkpoint at %d to `%s`", time, path)
+    return checkpoint
+
+
+def load(path: Union[Path, str]) -> Checkpoint:
+    with open(path, "rb") as fp:
+        checkpoint = pickle.load(fp)
+    if checkpoint.version != VERSION:
+        raise ValueError(
+            "Checkpoint version %s is not supported" % checkpoint.version
+        )
+    return checkpoint
+
+
+def restore(strategy: object, checkpoint: Checkpoint) -> None:
+    """
+    Load a checkpoint into `strategy`. Symbols restored this way skip
+    their history fetch in `init` on the next run, which starts at
+    `checkpoint.time`: that bar's close is corrected, not appended
+    again (see `SimpleStrategy.append_close`).
+    """
+    strategy.data.update(checkpoint.data)
+    strategy.frames = checkpoint.frames
+    strategy.manager.state.positions.update(checkpoint.positions)
+    for symbol, log in checkpoint.audit_log.items():
+        strategy._audit_log[symbol] = list(log)
+    strategy.restored.update(checkpoint.data)
+    strategy.resumed.update(dict.fromkeys(checkpoint.data, checkpoint.time))
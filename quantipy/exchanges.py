@@ -0,0 +1,18 @@
+from quantipy.registry import Registry
+
+# Only the selected exchange (and blankly with it) is ever imported
+EXCHANGES = Registry(
+    {
+        "Binance": "blankly:Binance",
+        "PaperTrade": "blankly:PaperTrade",
+        "Alpaca": "blankly:Alpaca",
+    },
+    group="quantipy.exchanges",
+)
+
+
+def initial_values(exchange: str, amount: float = 1000) -> dict:
+    """Starting paper/backtest cash, quoted in what `exchange` trades"""
+    if exchange == "Binance":
+        return {"USDT": amount}
+    return {"USD": amount}
@@ -0,0 +1,114 @@
+import logging
+from typing import Dict, Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+
+from quantipy.resample import Timeframe, seconds
+
+
+class Blacklist(set):
+    """
+    Symbols a strategy never trades. A set, so the check every tick
+    makes is constant time, that still takes `append` like the list it
+    used to be.
+    """
+
+    def __init__(self, symbols: Iterable[str] = ()) -> None:
+        super().__init__(symbols)
+
+    def append(self, symbol: str) -> None:
+        self.add(symbol)
+
+    def extend(self, symbols: Iterable[str]) -> None:
+        self.update(symbols)
+
+
+class ReferenceFeed:
+    """
+    Bars of symbols a strategy reads but never trades, like the
+    backtest benchmark.
+
+    They don't get price events, so they never run `tick` or any of
+    its callbacks. Their history is loaded in one go the first time
+    it's read (the whole backtest from the backtest's own prices,
+    otherwise the latest bars from the exchange, refreshed at most
+    once per bar) and handed out as read-only arrays cut at the
+    current time.
+    """
+
+    logger = logging.getLogger("ReferenceFeed")
+
+    def __init__(self, size: int = 800) -> None:
+        self.size = size
+        self.resolutions: Dict[str, int] = {}
+        self.columns: Dict[str, Dict[str, np.ndarray]] = {}
+        # Live feeds are refetched once the clock passes this
+        self.expires: Dict[str, float] = {}
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.resolutions
+
+    @property
+    def symbols(self) -> Sequence[str]:
+        return list(self.resolutions)
+
+    def add(self, symbol: str, resolution: Timeframe) -> None:
+        self.resolutions[symbol] = int(seconds(resolution))
+        self.columns.pop(symbol, None)
+
+    def load(
+        self,
+        symbol: str,
+        columns: Mapping[str, Sequence],
+        expires: float = np.inf,
+    ) -> None:
+        """Replace `symbol`'s bars with `columns`, sorted by time"""
+        order = np.argsort(np.asarray(columns["time"], dtype=float))
+        frozen = {}
+        for column in columns:
+            values = np.asarray(columns[column], dtype=float)[order]
+            values.flags.writeable = False
+            frozen[column] = values
+        self.columns[symbol] = frozen
+        self.expires[symbol] = expires
+
+    def fetch(self, interface: object, symbol: str, now: float) -> None:
+        resolution = self.resolutions[symbol]
+        # Backtests hold the benchmark's prices for the whole run
+        prices = getattr(interface, "full_prices", None) or {}
+        if getattr(interface, "backtesting", False) and symbol in prices:
+            frame = prices[symbol].get(resolution)
+            if frame is not None:
+                self.load(symbol, frame)
+                return
+
+        self.logger.debug("Fetching %d bars of %s", self.size, symbol)
+        history = interface.history(
+            symbol, to=self.size, resolution=resolution, return_as="deque"
+        )
+        self.load(symbol, history, expires=now + resolution)
+
+    def get(
+        self,
+        symbol: str,
+        column: str = "close",
+        now: Optional[float] = None,
+        interface: Optional[object] = None,
+    ) -> np.ndarray:
+        """
+        `column` of every bar of `symbol` that opened before `now`
+        (all of them without a `now`)
+        """
+        if symbol not in self:
+            raise KeyError("%s is not a reference symbol" % symbol)
+        stale = now is not None and now >= self.expires.get(symbol, 0)
+        if interface is not None and (symbol not in self.columns or stale):
+            self.fetch(interface, symbol, now or 0.0)
+
+        columns = self.columns.get(symbol)
+        if columns is None:
+            return np.empty(0)
+        if now is None:
+            return columns[column]
+        end = np.searchsorted(columns["time"], now, side="left")
+        return columns[column][:end]
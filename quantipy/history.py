@@ -0,0 +1,222 @@
+import hashlib
+import logging
+import sys
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+from quantipy.buffer import RingBuffer
+
+# A spilled column: its file, `maxlen` and the type it's rebuilt as
+Spilled = Tuple[Path, Optional[int], type]
+
+# Deques, lists and arrays of numbers spill, anything else stays in
+# memory
+SPILLABLE = (deque, list, np.ndarray, RingBuffer)
+
+
+def size_of(history: dict) -> int:
+    """Rough bytes held by a symbol's history (boxed floats included)"""
+    total = sys.getsizeof(history)
+    for values in history.values():
+        total += sys.getsizeof(values)
+        if isinstance(values, RingBuffer):
+            total += values.nbytes
+        elif not isinstance(values, np.ndarray):
+            total += 24 * len(values)
+    return total
+
+
+class HistoryStore(MutableMapping):
+    """
+    The per symbol history of a strategy (`strategy.data`) kept within
+    a memory `budget`.
+
+    It acts like the `defaultdict(dict)` it replaces: reading an
+    unknown symbol gives it an empty history. Symbols are kept in
+    least recently used order, once the histories in memory outgrow
+    `budget` bytes the coldest are spilled to memory-mapped files under
+    `directory` (a temporary directory by default) and read back the
+    next time they're used, e.g on their next tick. Symbols `keep`
+    says are hot (open positions, recent signals) are never spilled.
+
+    Without a `budget` everything stays in memory.
+    """
+
+    logger = logging.getLogger("HistoryStore")
+
+    def __init__(
+        self,
+        budget: Optional[int] = None,
+        directory: Optional[Union[Path, str]] = None,
+        keep: Optional[Callable[[str], bool]] = None,
+    ) -> None:
+        self.budget = budget
+        self.keep = keep or (lambda symbol: False)
+        self._directory = Path(directory) if directory else None
+        self._tmp: Optional[tempfile.TemporaryDirectory] = None
+        self.hot: "OrderedDict[str, dict]" = OrderedDict()
+        self.cold: Dict[str, Dict[str, Spilled]] = {}
+        # `size_of` every hot symbol when it was last set or read, and
+        # their sum, so enforcing the budget doesn't measure them all
+        self.sizes: Dict[str, int] = {}
+        self.total = 0
+        self.evictions = 0
+        self.rehydrations = 0
+        # Live price events tick from their own threads
+        self._lock = threading.RLock()
+
+    @property
+    def directory(self) -> Path:
+        if self._directory is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix="quantipy-")
+            self._directory = Path(self._tmp.name)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        return self._directory
+
+    def __getitem__(self, symbol: str) -> dict:
+        with self._lock:
+            history = self.hot.get(symbol)
+            if history is not None:
+                self.hot.move_to_end(symbol)
+                # It may have grown since (e.g appended closes)
+                self._measure(symbol)
+                return history
+            if symbol in self.cold:
+                history = self.rehydrate(symbol)
+            else:
+                history = {}
+            self.hot[symbol] = history
+            self._measure(symbol)
+            self.enforce(symbol)
+            return history
+
+    def __setitem__(self, symbol: str, history: dict) -> None:
+        with self._lock:
+            self._drop_cold(symbol)
+            self.hot[symbol] = history
+            self.hot.move_to_end(symbol)
+            self._measure(symbol)
+            self.enforce(symbol)
+
+    def __delitem__(self, symbol: str) -> None:
+        with self._lock:
+            if symbol in self.hot:
+                del self.hot[symbol]
+                self._forget(symbol)
+            elif symbol in self.cold:
+                self._drop_cold(symbol)
+            else:
+                raise KeyError(symbol)
+
+    def __contains__(self, symbol: object) -> bool:
+        with self._lock:
+            return symbol in self.hot or symbol in self.cold
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            symbols = list(self.hot) + list(self.cold)
+        yield from symbols
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.hot) + len(self.cold)
+
+    def _measure(self, symbol: str) -> None:
+        size = size_of(self.hot[symbol])
+        self.total += size - self.sizes.get(symbol, 0)
+        self.sizes[symbol] = size
+
+    def _forget(self, symbol: str) -> None:
+        self.total -= self.sizes.pop(symbol, 0)
+
+    def memory(self) -> int:
+        return self.total
+
+    def path(self, symbol: str, column: str) -> Path:
+        name = hashlib.blake2b(symbol.encode(), digest_size=8).hexdigest()
+        return self.directory / f"{name}.{column}.npy"
+
+    def enforce(self, current: Optional[str] = None) -> int:
+        """Spill the coldest symbols until the budget fits"""
+        if self.budget is None or self.total <= self.budget:
+            return 0
+        spilled, skipped = 0, {current}
+        while self.total > self.budget:
+            # Coldest first, without copying the whole LRU order
+            symbol = next(
+                (s for s in self.hot if s not in skipped and not self.keep(s)),
+                None,
+            )
+            if symbol is None:
+                break
+            if self.spill(symbol):
+                spilled += 1
+            else:
+                skipped.add(symbol)
+        return spilled
+
+    def spill(self, symbol: str) -> bool:
+        history = self.hot[symbol]
+        arrays = {}
+        for column, values in history.items():
+            if not isinstance(values, SPILLABLE):
+                return False
+            array = np.asarray(values)
+            if array.dtype.kind not in "biuf":
+                return False
+            arrays[column] = (array, getattr(values, "maxlen", None))
+
+        spilled = {}
+        for column, (array, maxlen) in arrays.items():
+            path = self.path(symbol, column)
+            mapped = np.lib.format.open_memmap(
+                path, mode="w+", dtype=array.dtype, shape=array.shape
+            )
+            mapped[:] = array
+            mapped.flush()
+            del mapped
+            spilled[column] = (path, maxlen, type(history[column]))
+
+        del self.hot[symbol]
+        self._forget(symbol)
+        self.cold[symbol] = spilled
+        self.evictions += 1
+        self.logger.debug("Spilled %s to disk", symbol)
+        return True
+
+    def rehydrate(self, symbol: str) -> dict:
+        history = {}
+        for column, (path, maxlen, kind) in self.cold.pop(symbol).items():
+            values = np.load(path, mmap_mode="r")
+            if kind is np.ndarray:
+                history[column] = np.array(values)
+            elif kind is RingBuffer:
+                history[column] = RingBuffer(maxlen, values, values.dtype)
+            elif kind is deque:
+                history[column] = deque(values.tolist(), maxlen)
+            else:
+                history[column] = values.tolist()
+            del values
+            path.unlink()
+        self.rehydrations += 1
+        self.logger.debug("Read %s back from disk", symbol)
+        return history
+
+    def _drop_cold(self, symbol: str) -> None:
+        for path, _, _ in self.cold.pop(symbol, {}).values():
+            path.unlink(missing_ok=True)
+
+    def metrics(self) -> dict:
+        return {
+            "hot": len(self.hot),
+            "cold": len(self.cold),
+            "memory": self.memory(),
+            "evictions": self.evictions,
+            "rehydrations": self.rehydrations,
+        }
@@ -0,0 +1,385 @@
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+from typing import Callable, Deque, Dict, Iterable, Optional
+
+from blankly import StrategyState
+from blankly.utils import AttributeDict, load_user_preferences
+
+from quantipy.resample import Timeframe, seconds
+
+# What to do with a completed bar when the queue is full:
+#   merge ~> fold it into the symbol's newest queued bar (or drop the
+#   oldest bar when the symbol has none queued)
+#   drop ~> drop the oldest queued bar
+#   block ~> wait for the consumer to make room
+POLICIES = ("merge", "drop", "block")
+
+Tick = namedtuple("Tick", field_names=["symbol", "price", "time", "size"])
+
+
+def buffer_size(default: int = 10_000) -> int:
+    """`websocket_buffer_size` from `settings.json`"""
+    try:
+        return int(
+            load_user_preferences()["settings"]["websocket_buffer_size"]
+        )
+    except (KeyError, TypeError, ValueError):
+        return default
+
+
+class Bar:
+    """An OHLCV bar built from ticks, mutable so it can absorb more"""
+
+    __slots__ = (
+        "symbol",
+        "time",
+        "open",
+        "high",
+        "low",
+        "close",
+        "volume",
+        "ticks",
+        "last",
+        "queued",
+    )
+
+    def __init__(self, symbol: str, bucket: float, tick: Tick) -> None:
+        self.symbol = symbol
+        self.time = bucket
+        self.open = self.high = self.low = self.close = tick.price
+        self.volume = tick.size
+        self.ticks = 1
+        # Exchange time of the last tick, and when the bar was queued
+        self.last = tick.time
+        self.queued = 0.0
+
+    def add(self, tick: Tick) -> None:
+        self.high = max(self.high, tick.price)
+        self.low = min(self.low, tick.price)
+        self.close = tick.price
+        self.volume += tick.size
+        self.ticks += 1
+        self.last = tick.time
+
+    def merge(self, bar: "Bar") -> None:
+        """Absorb the (later) `bar`, keeping this bar's open"""
+        self.time = bar.time
+        self.high = max(self.high, bar.high)
+        self.low = min(self.low, bar.low)
+        self.close = bar.close
+        self.volume += bar.volume
+        self.ticks += bar.ticks
+        self.last = bar.last
+
+
+class TickQueue:
+    """
+    Coalesces a tick stream into `resolution` bars per symbol and hands
+    completed bars to a consumer through a bounded queue.
+
+    Producers (websocket callbacks) `put` ticks, a bar is queued once
+    a tick lands in the next bucket (or `flush` finds its window over)
+    and a consumer `get`s bars in completion order. At most `maxsize`
+    bars wait in the queue, past that `policy` (see `POLICIES`)
+    decides what gives. Depth, drops and merges are tracked for
+    `metrics`.
+    """
+
+    def __init__(
+        self,
+        resolution: Timeframe,
+        maxsize: Optional[int] = None,
+        policy: str = "merge",
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(
+                "Unknown policy `%s`, use one of %s" % (policy, POLICIES)
+            )
+        self.step = seconds(resolution)
+        self.maxsize = maxsize or buffer_size()
+        self.policy = policy
+        self.clock = clock
+
+        self.building: Dict[str, Bar] = {}
+        self.bars: Deque[Bar] = deque()
+        # The newest queued bar of every symbol, merged into when full
+        self.newest: Dict[str, Bar] = {}
+        self.closed = False
+        self._lock = threading.Condition()
+
+        self.ticks = 0
+        self.queued = 0
+        self.dropped = 0
+        self.merged = 0
+        self.max_depth = 0
+
+    def __len__(self) -> int:
+        return len(self.bars)
+
+    def put(
+        self, symbol: str, price: float, at: float, size: float = 0.0
+    ) -> None:
+        tick = Tick(symbol, float(price), float(at), float(size or 0))
+        bucket = tick.time // self.step * self.step
+        with self._lock:
+            self.ticks += 1
+            bar = self.building.get(symbol)
+            if bar is not None and bucket <= bar.time:
+                # Late ticks count towards the bar being built
+                bar.add(tick)
+                return
+            self.building[symbol] = Bar(symbol, bucket, tick)
+            if bar is not None:
+                self._enqueue(bar)
+
+    def flush(self, now: Optional[float] = None) -> int:
+        """
+        Queue every bar whose window is over by `now`. Never blocks: the
+        consumer flushes and it's the only one making room, so with the
+        "block" policy bars that don't fit stay pending until the next
+        flush (or their symbol's next tick queues them)
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            due = [
+                symbol
+                for symbol, bar in self.building.items()
+                if bar.time + self.step <= now
+            ]
+            flushed = 0
+            for symbol in due:
+                if self.policy == "block" and self._full():
+                    break
+                self._enqueue(self.building.pop(symbol))
+                flushed += 1
+            return flushed
+
+    def _full(self) -> bool:
+        return len(self.bars) >= self.maxsize and not self.closed
+
+    def _enqueue(self, bar: Bar) -> None:
+        # Called with the lock held
+        while self._full():
+            if self.policy == "block":
+                self._lock.wait()
+                continue
+            newest = self.newest.get(bar.symbol)
+            if self.policy == "merge" and newest is not None:
+                newest.merge(bar)
+                self.merged += 1
+                return
+            dropped = self.bars.popleft()
+            if self.newest.get(dropped.symbol) is dropped:
+                del self.newest[dropped.symbol]
+            self.dropped += 1
+
+        bar.queued = self.clock()
+        self.bars.append(bar)
+        self.newest[bar.symbol] = bar
+        self.queued += 1
+        self.max_depth = max(self.max_depth, len(self.bars))
+        self._lock.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Bar]:
+        """The oldest completed bar, `None` on timeout or once closed"""
+        with self._lock:
+            if not self.bars and not self.closed:
+                self._lock.wait(timeout)
+            if not self.bars:
+                return None
+            bar = self.bars.popleft()
+            if self.newest.get(bar.symbol) is bar:
+                del self.newest[bar.symbol]
+            self._lock.notify_all()
+            return bar
+
+    def close(self) -> None:
+        with self._lock:
+            self.closed = True
+            self._lock.notify_all()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "depth": len(self.bars),
+                "max_depth": self.max_depth,
+                "ticks": self.ticks,
+                "queued": self.queued,
+                "dropped": self.dropped,
+                "merged": self.merged,
+            }
+
+
+class Ingestor:
+    """
+    Feeds a strategy's `tick` from a `TickQueue` on a dedicated
+    consumer thread instead of blankly's polling price events.
+
+    Every symbol is initialized (`init`) before the first bar, then
+    `tick` gets each bar's close. Alongside the queue's metrics it
+    tracks `wait` (seconds a bar sat in the queue) and `lag` (seconds
+    between a bar's window closing and its tick running).
+    """
+
+    logger = logging.getLogger("Ingestor")
+
+    def __init__(
+        self,
+        strategy: object,
+        symbols: Iterable[str],
+        resolution: Timeframe,
+        maxsize: Optional[int] = None,
+        policy: str = "merge",
+        report: float = 60,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.strategy = strategy
+        self.symbols = list(symbols)
+        self.resolution = resolution
+        self.queue = TickQueue(resolution, maxsize, policy, clock)
+        self.report = report
+        self.clock = clock
+        self.states: Dict[str, StrategyState] = {}
+
+        self.bars = 0
+        self.errors = 0
+        self.wait = {"last": 0.0, "max": 0.0, "total": 0.0}
+        self.lag = {"last": 0.0, "max": 0.0, "total": 0.0}
+        self._thread: Optional[threading.Thread] = None
+
+    def state(self, symbol: str) -> StrategyState:
+        if symbol not in self.states:
+            state = StrategyState(
+                self.strategy,
+                AttributeDict({}),
+                symbol,
+                resolution=self.queue.step,
+            )
+            self.strategy.init(symbol, state)
+            self.states[symbol] = state
+        return self.states[symbol]
+
+    @staticmethod
+    def _track(stats: dict, value: float) -> None:
+        stats["last"] = value
+        stats["max"] = max(stats["max"], value)
+        stats["total"] += value
+
+    def dispatch(self, bar: Bar) -> None:
+        now = self.clock()
+        self._track(self.wait, now - bar.queued)
+        self._track(self.lag, now - (bar.time + self.queue.step))
+        self.bars += 1
+        try:
+            self.strategy.tick(bar.close, bar.symbol, self.state(bar.symbol))
+        except Exception:
+            self.errors += 1
+            self.logger.exception("Tick failed for %s", bar.symbol)
+
+    def run(self) -> None:
+        """Consume bars until the queue is closed"""
+        for symbol in self.symbols:
+            self.state(symbol)
+        # Wake up often enough to close bars of quiet symbols on time
+        timeout = min(1.0, self.queue.step)
+        reported = self.clock()
+        while not self.queue.closed or len(self.queue):
+            bar = self.queue.get(timeout)
+            if bar is not None:
+                self.dispatch(bar)
+            else:
+                self.queue.flush()
+            if self.report and self.clock() - reported >= self.report:
+                reported = self.clock()
+                self.logger.info(self.metrics())
+
+    def start(self) -> threading.Thread:
+        self._thread = threading.Thread(
+            target=self.run, name="Ingestor", daemon=True
+        )
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Close the queue and wait for the queued bars to be ticked"""
+        self.queue.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def metrics(self) -> dict:
+        metrics = self.queue.metrics()
+        metrics["bars"] = self.bars
+        metrics["errors"] = self.errors
+        for name, stats in (("wait", self.wait), ("lag", self.lag)):
+            metrics[name] = stats["last"]
+            metrics[name + "_max"] = stats["max"]
+            metrics[name + "_mean"] = stats["total"] / max(self.bars, 1)
+        return metrics
+
+
+class FakeStream:
+    """
+    A local tick source for tests and dry runs: puts `ticks` on a
+    queue from its own thread, optionally paced at `rate` ticks per
+    second.
+    """
+
+    def __init__(
+        self, ticks: Iterable[Tick], rate: Optional[float] = None
+    ) -> None:
+        self.ticks = ticks
+        self.rate = rate
+        self._thread: Optional[threading.Thread] = None
+
+    def feed(self, queue: TickQueue) -> None:
+        for tick in self.ticks:
+            queue.put(tick.symbol, tick.price, tick.time, tick.size)
+            if self.rate:
+                time.sleep(1 / self.rate)
+
+    def start(self, queue: TickQueue) -> threading.Thread:
+        self._thread = threading.Thread(
+            target=self.feed, args=(queue,), name="FakeStream", daemon=True
+        )
+        self._thread.start()
+        return self._thread
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+class TickerSource:
+    """Live trades/tickers from blankly's websocket tickers"""
+
+    logger = logging.getLogger("TickerSource")
+
+    def __init__(self, exchange_type: str, symbols: Iterable[str]) -> None:
+        self.exchange_type = exchange_type
+        self.symbols = list(symbols)
+        self.tickers = []
+
+    def start(self, queue: TickQueue) -> None:
+        from blankly import TickerManager
+
+        manager = TickerManager(self.exchange_type, "")
+        for symbol in self.symbols:
+
+            def callback(tick: dict, symbol: str = symbol) -> None:
+                try:
+                    queue.put(
+                        symbol,
+                        tick["price"],
+                        tick.get("time") or time.time(),
+                        tick.get("size", 0),
+                    )
+                except (KeyError, TypeError, ValueError):
+                    self.logger.debug("Skipping malformed tick %s", tick)
+
+            self.logger.info("Streaming %s", symbol)
+            self.tickers.append(
+                manager.create_ticker(callback, override_symbol=symbol)
+            )
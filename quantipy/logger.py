@@ -1,5 +1,6 @@
 import logging
 from logging import Formatter
+from logging.handlers import TimedRotatingFileHandler
 
 
 class QuantiPyLogger(Formatter):
@@ -16,3 +17,22 @@ class QuantiPyLogger(Formatter):
             record.levelname, self.__level_to_symbol.get("DEBUG")
         )
         return f"[{symbol}] {record.msg}" % record.args
+
+
+def setupLogger(filename: str = "strategy.log") -> None:
+    loggers = [logging.getLogger()]
+    loggers.extend(
+        logging.getLogger(name) for name in logging.root.manager.loggerDict
+    )
+    fslog = TimedRotatingFileHandler(filename, when="midnight", backupCount=30)
+    fslog.suffix = "%Y%m%d"
+    for logger in loggers:
+        logger.propagate = False
+        console = logging.StreamHandler()
+        formatter = QuantiPyLogger()
+        console.setFormatter(formatter)
+        console.setLevel(logging.DEBUG)
+        logger.addHandler(console)
+        fslog.setFormatter(formatter)
+        logger.addHandler(fslog)
+        logger.setLevel(logging.DEBUG)
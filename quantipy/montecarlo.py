@@ -0,0 +1,123 @@
+from collections import namedtuple
+from typing import Iterable, Optional, Sequence, Union
+
+import numpy as np
+from pandas import DataFrame
+
+METHODS = ("bootstrap", "permute")
+
+# Per simulation results, one entry per simulated trade sequence
+Paths = namedtuple("Paths", field_names=["final", "max_drawdown", "trough"])
+
+
+def simulate(
+    pnl: Union[Sequence[float], np.ndarray],
+    simulations: int = 10_000,
+    method: str = "bootstrap",
+    length: Optional[int] = None,
+    seed: Optional[int] = None,
+    memory: int = 64 * 2**20,
+) -> Paths:
+    """
+    Resample a sequence of round trip PnLs `simulations` times.
+
+    `bootstrap` draws `length` (defaults to the number of trades)
+    trades with replacement, `permute` shuffles the original trades.
+    A permutation always ends on the same total, so it only tells you
+    how much the order of the trades matters for drawdowns.
+
+    Sequences are simulated in chunks of at most `memory` bytes, so
+    the working set stays bounded however many simulations or trades
+    there are. Only three numbers per simulation are kept:
+
+    - final ~> total PnL at the end of the sequence
+    - max_drawdown ~> deepest drop from a running equity peak (<= 0)
+    - trough ~> lowest cumulative PnL reached (<= 0)
+    """
+    if method not in METHODS:
+        raise ValueError(
+            "Unknown method `%s`, use one of %s" % (method, METHODS)
+        )
+
+    pnl = np.asarray(pnl, dtype=np.float64)
+    n = len(pnl) if length is None else int(length)
+    if method == "permute" and n != len(pnl):
+        raise ValueError("A permutation has to keep every trade")
+
+    final = np.zeros(simulations)
+    max_drawdown = np.zeros(simulations)
+    trough = np.zeros(simulations)
+    if not n or not len(pnl):
+        return Paths(final, max_drawdown, trough)
+
+    rng = np.random.default_rng(seed)
+    # Two (chunk, n) float64 arrays are alive at once
+    chunk = int(max(1, min(simulations, memory // (16 * n))))
+    for start in range(0, simulations, chunk):
+        rows = min(chunk, simulations - start)
+        if method == "bootstrap":
+            equity = pnl[rng.integers(0, len(pnl), size=(rows, n))]
+        else:
+            equity = np.tile(pnl, (rows, 1))
+            rng.permuted(equity, axis=1, out=equity)
+
+        np.cumsum(equity, axis=1, out=equity)
+        # Starting equity (zero) counts as a peak too
+        peak = np.maximum.accumulate(equity, axis=1)
+        np.maximum(peak, 0, out=peak)
+        np.subtract(equity, peak, out=peak)
+
+        stop = start + rows
+        final[start:stop] = equity[:, -1]
+        max_drawdown[start:stop] = peak.min(axis=1)
+        trough[start:stop] = np.minimum(equity.min(axis=1), 0)
+
+    return Paths(final, max_drawdown, trough)
+
+
+def risk(
+    paths: Paths,
+    capital: Optional[float] = None,
+    ruin: float = 0.5,
+    quantiles: Iterable[float] = (0.05, 0.5, 0.95),
+) -> dict:
+    """
+    Summarize simulated paths:
+
+    - final PnL and max drawdown distributions (mean and `quantiles`)
+    - the same as fractions of `capital` (when given)
+    - probability of ruin, i.e losing at least `ruin` of `capital` at
+    any point in the sequence
+    """
+    quantiles = list(quantiles)
+
+    def distribution(values: np.ndarray) -> dict:
+        stats = {"mean": float(values.mean())}
+        for q, value in zip(quantiles, np.quantile(values, quantiles)):
+            stats["p%d" % round(q * 100)] = float(value)
+        return stats
+
+    report = {
+        "simulations": len(paths.final),
+        "final": distribution(paths.final),
+        "max_drawdown": distribution(paths.max_drawdown),
+    }
+    if capital:
+        report["return"] = distribution(paths.final / capital)
+        report["max_drawdown_pct"] = distribution(paths.max_drawdown / capital)
+        report["ruin"] = float(np.mean(paths.trough <= -ruin * capital))
+    return report
+
+
+def monte_carlo(
+    trips: DataFrame,
+    simulations: int = 10_000,
+    method: str = "bootstrap",
+    capital: Optional[float] = None,
+    ruin: float = 0.5,
+    seed: Optional[int] = None,
+) -> dict:
+    """Risk estimates for a backtest's round trips (see `round_trips`)"""
+    pnl = trips.sort_values("exit_time", kind="stable")["pnl"].to_numpy()
+    paths = simulate(pnl, simulations, method, seed=seed)
+    return risk(paths, capital, ruin)
@@ -0,0 +1,79 @@
+from typing import Sequence, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Every predicate takes whole series and returns a boolean array of the
+# same length, element `i` being whether the pattern holds for the bars
+# up to and including `i`. Bars without enough history are False, and
+# so is anything compared against NaN.
+#
+# To check the latest bar only (e.g per tick) pass just the tail of the
+# series the pattern looks at and read `[-1]`.
+
+Series = Union[np.ndarray, Sequence[float]]
+
+
+def _windows(mask: np.ndarray, window: int, reduce: str) -> np.ndarray:
+    out = np.zeros(len(mask), dtype=bool)
+    if 0 < window <= len(mask):
+        view = sliding_window_view(mask, window)
+        out[window - 1 :] = getattr(view, reduce)(axis=1)
+    return out
+
+
+def recently(mask: Series, window: int) -> np.ndarray:
+    """`mask` was true at least once in the last `window` bars"""
+    return _windows(np.asarray(mask, dtype=bool), window, "any")
+
+
+def always(mask: Series, window: int) -> np.ndarray:
+    """`mask` was true for each of the last `window` bars"""
+    return _windows(np.asarray(mask, dtype=bool), window, "all")
+
+
+def recently_below(
+    values: Series, threshold: float, window: int
+) -> np.ndarray:
+    """`values` dropped below `threshold` in the last `window` bars"""
+    return recently(np.asarray(values, dtype=float) < threshold, window)
+
+
+def recently_above(
+    values: Series, threshold: float, window: int
+) -> np.ndarray:
+    """`values` rose above `threshold` in the last `window` bars"""
+    return recently(np.asarray(values, dtype=float) > threshold, window)
+
+
+def _run(values: Series, window: int, step: np.ufunc) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    if window == 1:
+        return ~np.isnan(values)
+    # The first bar has nothing to move from
+    moves = np.r_[False, step(values[1:], values[:-1])]
+    return always(moves, window - 1)
+
+
+def rising(values: Series, window: int) -> np.ndarray:
+    """The last `window` values are strictly increasing"""
+    return _run(values, window, np.greater)
+
+
+def falling(values: Series, window: int) -> np.ndarray:
+    """The last `window` values are strictly decreasing"""
+    return _run(values, window, np.less)
+
+
+def crossed_above(a: Series, b: Series) -> np.ndarray:
+    """`a` crossed from below `b` to at or above it on this bar"""
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    above = a >= b
+    return np.r_[False, above[1:] & (a[:-1] < b[:-1])]
+
+
+def crossed_below(a: Series, b: Series) -> np.ndarray:
+    """`a` crossed from above `b` to at or below it on this bar"""
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    below = a <= b
+    return np.r_[False, below[1:] & (a[:-1] > b[:-1])]
@@ -0,0 +1,336 @@
+import copy
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+# Priority classes, lower goes first once tokens are scarce
+PRIORITIES: Dict[str, int] = {"order": 0, "account": 1, "history": 2}
+
+# The class of every interface call QuantiPy makes, anything missing
+# is a data read and queues with the history fetches
+METHODS: Dict[str, str] = {
+    "market_order": "order",
+    "limit_order": "order",
+    "stop_loss_order": "order",
+    "take_profit_order": "order",
+    "cancel_order": "order",
+    "get_account": "account",
+    "get_order": "account",
+    "get_open_orders": "account",
+    "get_fees": "account",
+    "cash": "account",
+    "account": "account",
+    "history": "history",
+    "get_product_history": "history",
+    "get_price": "history",
+}
+
+# Calls answered locally, they never take a token
+LOCAL = frozenset({"get_exchange_type", "get_type", "get_calls"})
+
+# Requests per second and burst per exchange type, well under the
+# documented limits (Binance 1200 weight/min, Alpaca 200/min)
+RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    "binance": (15.0, 30),
+    "alpaca": (3.0, 10),
+}
+DEFAULT_RATE_LIMIT: Tuple[float, int] = (5.0, 10)
+
+
+class RateLimited(Exception):
+    pass
+
+
+class TokenBucket:
+    """`rate` tokens a second, holding at most `burst`"""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+
+    def refill(self) -> None:
+        now = self.clock()
+        elapsed = max(now - self.updated, 0)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def wait(self) -> float:
+        """Seconds until a token is available"""
+        self.refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def take(self) -> bool:
+        self.refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class RequestScheduler:
+    """
+    Paces every exchange request QuantiPy makes through one token
+    bucket per exchange type (see `RATE_LIMITS`).
+
+    Callers block until their request may go out. When tokens run
+    short, waiting orders go before account reads, which go before
+    history fetches (see `PRIORITIES`), so a big history warm-up can't
+    hold up an order. Identical history requests already in flight are
+    coalesced, later callers wait for the first one's response and get
+    their own copy of it.
+
+    Requests run on the calling thread, `wrap` an interface to route
+    its calls through here. Processes sharing an account (e.g the
+    supervisor's workers) each take a `share` of the limits.
+    """
+
+    logger = logging.getLogger("RequestScheduler")
+
+    def __init__(
+        self,
+        limits: Optional[Mapping[str, Tuple[float, int]]] = None,
+        default: Tuple[float, int] = DEFAULT_RATE_LIMIT,
+        share: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.limits = dict(RATE_LIMITS if limits is None else limits)
+        self.default = default
+        self.share = share
+        self.clock = clock
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.waiting: Dict[str, List[Tuple[int, int]]] = {}
+        self.inflight: Dict[tuple, "_Call"] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+        self.requests: Dict[str, int] = {name: 0 for name in PRIORITIES}
+        self.coalesced = 0
+        self.waited = 0.0
+
+    def bucket(self, exchange: str) -> TokenBucket:
+        if exchange not in self.buckets:
+            rate, burst = self.limits.get(exchange, self.default)
+            self.buckets[exchange] = TokenBucket(
+                rate * self.share,
+                max(1, int(burst * self.share)),
+                self.clock,
+            )
+            self.waiting[exchange] = []
+        return self.buckets[exchange]
+
+    def acquire(self, exchange: str, priority: str) -> None:
+        """Block until a request of class `priority` may go out"""
+        started = self.clock()
+        with self._cond:
+            bucket = self.bucket(exchange)
+            ticket = (PRIORITIES[priority], next(self._seq))
+            queue = self.waiting[exchange]
+            heapq.heappush(queue, ticket)
+            try:
+                while not (queue[0] == ticket and bucket.take()):
+                    timeout = bucket.wait() if queue[0] == ticket else None
+                    self._cond.wait(timeout)
+            finally:
+                queue.remove(ticket)
+                heapq.heapify(queue)
+                self._cond.notify_all()
+            self.requests[priority] += 1
+            self.waited += self.clock() - started
+
+    def submit(
+        self,
+        exchange: str,
+        priority: str,
+        fn: Callable,
+        *args,
+        key: Optional[tuple] = None,
+        **kwargs,
+    ) -> object:
+        """
+        Run `fn(*args, **kwargs)` once a token is available. Calls
+        sharing a `key` while one is in flight share its response.
+        """
+        if key is None:
+            self.acquire(exchange, priority)
+            return fn(*args, **kwargs)
+
+        with self._cond:
+            call = self.inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self.inflight[key] = _Call()
+            else:
+                call.shared += 1
+                self.coalesced += 1
+        if not leader:
+            return copy.deepcopy(call.result())
+
+        try:
+            self.acquire(exchange, priority)
+            call.set(fn(*args, **kwargs))
+        except BaseException as ex:
+            call.fail(ex)
+            raise
+        finally:
+            with self._cond:
+                del self.inflight[key]
+        # The others copy the response, so it can't be handed out
+        return copy.deepcopy(call.value) if call.shared else call.value
+
+    def wrap(self, interface: object) -> "ThrottledInterface":
+        if isinstance(interface, ThrottledInterface):
+            return interface
+        return ThrottledInterface(interface, self)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            depth = sum(len(queue) for queue in self.waiting.values())
+        return {
+            **{f"{name}_requests": n for name, n in self.requests.items()},
+            "coalesced": self.coalesced,
+            "waiting": depth,
+            "waited": self.waited,
+        }
+
+
+class _Call:
+    """The response of an in-flight request, for coalesced callers"""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: object = None
+        self.error: Optional[BaseException] = None
+        self.shared = 0
+
+    def set(self, value: object) -> None:
+        self.value = value
+        self.done.set()
+
+    def fail(self, error: BaseException) -> None:
+        self.error = error
+        self.done.set()
+
+    def result(self) -> object:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def _freeze(value: object) -> object:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class ThrottledInterface:
+    """
+    A blankly exchange interface whose calls go through a
+    `RequestScheduler`. Attributes that aren't calls (and calls
+    answered locally) pass straight through.
+    """
+
+    def __init__(self, interface: object, scheduler: RequestScheduler) -> None:
+        self._interface = interface
+        self._scheduler = scheduler
+        self._exchange = interface.get_exchange_type()
+
+    @property
+    def cash(self) -> float:
+        return self._scheduler.submit(
+            self._exchange, "account", lambda: self._interface.cash
+        )
+
+    @property
+    def account(self) -> dict:
+        return self._scheduler.submit(
+            self._exchange, "account", lambda: self._interface.account
+        )
+
+    def __getattr__(self, name: str) -> object:
+        attr = getattr(self._interface, name)
+        if name in LOCAL or name.startswith("_") or not callable(attr):
+            return attr
+        priority = METHODS.get(name, "history")
+
+        def call(*args, **kwargs) -> object:
+            key = None
+            if priority == "history":
+                key = (self._exchange, name, _freeze(args), _freeze(kwargs))
+            return self._scheduler.submit(
+                self._exchange, priority, attr, *args, key=key, **kwargs
+            )
+
+        call.__name__ = name
+        return call
+
+
+class RateLimitedExchange:
+    """
+    A fake exchange interface for tests: it raises `RateLimited` as
+    soon as requests outpace `rate` (with `burst`), like a real one
+    would start rejecting them, and records every call it served.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        latency: float = 0.0,
+        exchange_type: str = "fake",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.limit = TokenBucket(rate, burst, clock)
+        self.latency = latency
+        self.exchange_type = exchange_type
+        self.calls: List[Tuple[str, tuple]] = []
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def get_exchange_type(self) -> str:
+        return self.exchange_type
+
+    def _request(self, name: str, *args) -> None:
+        with self._lock:
+            if not self.limit.take():
+                self.rejected += 1
+                raise RateLimited("%s rejected, too many requests" % name)
+            self.calls.append((name, args))
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def cash(self) -> float:
+        self._request("cash")
+        return 1000.0
+
+    def get_account(self, symbol: Optional[str] = None) -> dict:
+        self._request("get_account", symbol)
+        return {"USD": {"available": 1000.0, "hold": 0.0}}
+
+    def market_order(self, symbol: str, side: str, size: float) -> dict:
+        self._request("market_order", symbol, side, size)
+        return {"symbol": symbol, "side": side, "size": size}
+
+    def history(
+        self,
+        symbol: str,
+        to: int = 200,
+        resolution: str = "1d",
+        return_as: str = "deque",
+    ) -> dict:
+        self._request("history", symbol, to)
+        return {"close": list(range(to))}
@@ -0,0 +1,379 @@
+import logging
+import struct
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Union,
+)
+
+import numpy as np
+from blankly import StrategyState
+from blankly.utils import AttributeDict
+
+from quantipy.broker import SIDES, SimulatedBroker
+from quantipy.resample import Timeframe, seconds
+
+# A tick log is `MAGIC` followed by fixed size records:
+#
+#   kind (u8), symbol id (u16), time (f64), price (f64), value (f64)
+#
+# - SYMBOL ~> names a symbol id, `price` is its resolution (seconds)
+#   and `value` the length of the utf-8 name following the record
+# - TICK ~> a price event, `value` is the seconds `tick` took live
+# - ORDER ~> a market order, `value` is its size (negative sells)
+# - HISTORY ~> a history fetch, `price` is its resolution and `value`
+#   the number of bars, followed by that many `BAR` records
+#
+# Everything is little-endian, a record cut off by a crash is ignored.
+MAGIC = b"QPTICK\x01\n"
+RECORD = struct.Struct("<BHddd")
+BAR = struct.Struct("<6d")
+SYMBOL, TICK, ORDER, HISTORY = range(4)
+
+KINDS = {SYMBOL: "symbol", TICK: "tick", ORDER: "order", HISTORY: "history"}
+
+BAR_COLUMNS = ("time", "open", "high", "low", "close", "volume")
+
+# A record of a tick log, `value` as in the records and `bars` the
+# columns of a history fetch
+Event = namedtuple(
+    "Event", field_names=["kind", "symbol", "time", "price", "value", "bars"]
+)
+
+
+class TickRecorder:
+    """
+    Appends every price event a strategy ticks, every market order it
+    places and every history fetch it makes to a compact binary log
+    (see `MAGIC`), to be replayed offline with `replay`.
+
+    `record` hooks it into a strategy. Ticks also record how long the
+    strategy took on them, so latency spikes seen live can be compared
+    with the replay. Writes are buffered and flushed at least every
+    `flush` seconds, live price events tick from their own threads.
+    """
+
+    logger = logging.getLogger("TickRecorder")
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        flush: float = 1.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.flush_every = flush
+        self.clock = clock
+        self.ids: Dict[str, int] = {}
+        self.prices: Dict[str, float] = {}
+        self.records = 0
+        self._lock = threading.Lock()
+        new = not self.path.exists() or not self.path.stat().st_size
+        if not new:
+            # Carry on with the symbols already in the log
+            self.ids = {name: i for i, name in enumerate(symbols(self.path))}
+        self._fp = open(self.path, "ab")
+        if new:
+            self._fp.write(MAGIC)
+        self._flushed = clock()
+
+    def _symbol(self, symbol: str, resolution: float) -> int:
+        index = self.ids.get(symbol)
+        if index is None:
+            index = self.ids[symbol] = len(self.ids)
+            name = symbol.encode()
+            self._write(SYMBOL, index, 0.0, resolution, len(name), name)
+        return index
+
+    def _write(
+        self,
+        kind: int,
+        index: int,
+        at: float,
+        price: float,
+        value: float,
+        payload: bytes = b"",
+    ) -> None:
+        self._fp.write(RECORD.pack(kind, index, at, price, value) + payload)
+        self.records += 1
+
+    def _maybe_flush(self, now: float) -> None:
+        if now - self._flushed >= self.flush_every:
+            self._fp.flush()
+            self._flushed = now
+
+    def tick(
+        self,
+        symbol: str,
+        price: float,
+        at: float,
+        took: float = 0.0,
+        resolution: float = 0.0,
+    ) -> None:
+        with self._lock:
+            index = self._symbol(symbol, resolution)
+            self._write(TICK, index, at, price, took)
+            self.prices[symbol] = price
+            self._maybe_flush(at)
+
+    def order(
+        self, symbol: str, side: str, size: float, price: float, at: float
+    ) -> None:
+        with self._lock:
+            index = self._symbol(symbol, 0.0)
+            self._write(ORDER, index, at, price, SIDES[side] * size)
+            self._maybe_flush(at)
+
+    def history(
+        self,
+        symbol: str,
+        bars: Mapping[str, Sequence],
+        resolution: float,
+        at: float,
+    ) -> None:
+        columns = np.column_stack(
+            [np.asarray(bars[c], dtype="<f8") for c in BAR_COLUMNS]
+        )
+        with self._lock:
+            index = self._symbol(symbol, resolution)
+            self._write(
+                HISTORY, index, at, resolution, len(columns), columns.tobytes()
+            )
+            self._maybe_flush(at)
+
+    def wrap(self, tick: Callable) -> Callable:
+        """A `tick(price, symbol, state)` that records every call"""
+
+        def recorded(price: float, symbol: str, state: StrategyState) -> None:
+            at = self.clock()
+            started = time.perf_counter()
+            try:
+                tick(price, symbol, state)
+            finally:
+                took = time.perf_counter() - started
+                resolution = float(getattr(state, "resolution", 0) or 0)
+                self.tick(symbol, price, at, took, resolution)
+
+        recorded.__name__ = getattr(tick, "__name__", "tick")
+        return recorded
+
+    def record(self, strategy: object) -> None:
+        """Record what `strategy` ticks, orders and fetches from now on"""
+        strategy.tick = self.wrap(strategy.tick)
+        strategy.interface = RecordingInterface(strategy.interface, self)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._fp.flush()
+            self._flushed = self.clock()
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._fp.closed:
+                self._fp.close()
+
+
+class RecordingInterface:
+    """
+    A blankly exchange interface whose market orders and history
+    fetches are recorded by a `TickRecorder`, everything else passes
+    straight through
+    """
+
+    def __init__(self, interface: object, recorder: TickRecorder) -> None:
+        self._interface = interface
+        self._recorder = recorder
+
+    def __getattr__(self, name: str) -> object:
+        return getattr(self._interface, name)
+
+    def market_order(self, symbol: str, side: str, size: float) -> object:
+        order = self._interface.market_order(symbol, side=side, size=size)
+        try:
+            price = float(order.get_price())
+        except Exception:
+            # Live orders don't always know their fill price yet
+            price = self._recorder.prices.get(symbol, float("nan"))
+        self._recorder.order(symbol, side, size, price, self._recorder.clock())
+        return order
+
+    def history(
+        self,
+        symbol: str,
+        to: int = 200,
+        resolution: Timeframe = "1d",
+        return_as: str = "deque",
+        **kwargs,
+    ) -> object:
+        bars = self._interface.history(
+            symbol, to=to, resolution=resolution, return_as=return_as, **kwargs
+        )
+        try:
+            self._recorder.history(
+                symbol, bars, seconds(resolution), self._recorder.clock()
+            )
+        except (KeyError, TypeError, ValueError):
+            self._recorder.logger.warning(
+                "Could not record the history of %s", symbol
+            )
+        return bars
+
+
+def read(path: Union[Path, str]) -> Iterator[Event]:
+    """Every event in a tick log, in the order it was recorded"""
+    names: Dict[int, str] = {}
+    with open(path, "rb") as fp:
+        if fp.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a tick log" % path)
+        while True:
+            record = fp.read(RECORD.size)
+            if len(record) < RECORD.size:
+                return
+            kind, index, at, price, value = RECORD.unpack(record)
+            if kind == SYMBOL:
+                name = fp.read(int(value))
+                if len(name) < value:
+                    return
+                names[index] = name.decode()
+            bars = None
+            if kind == HISTORY:
+                size = int(value) * BAR.size
+                data = fp.read(size)
+                if len(data) < size:
+                    return
+                rows = np.frombuffer(data, dtype="<f8").reshape(-1, 6)
+                bars = dict(zip(BAR_COLUMNS, rows.T))
+            yield Event(KINDS[kind], names[index], at, price, value, bars)
+
+
+def symbols(path: Union[Path, str]) -> List[str]:
+    """The symbols of a tick log, in the order of their ids"""
+    names = []
+    with open(path, "rb") as fp:
+        if fp.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a tick log" % path)
+        while True:
+            record = fp.read(RECORD.size)
+            if len(record) < RECORD.size:
+                return names
+            kind, _, _, _, value = RECORD.unpack(record)
+            if kind == SYMBOL:
+                names.append(fp.read(int(value)).decode())
+            elif kind == HISTORY:
+                fp.seek(int(value) * BAR.size, 1)
+
+
+# A tick log split up for a replay: the bars the broker serves per
+# symbol (fetched histories and ticks), each symbol's resolution, the
+# ticks and the orders placed live (`quantipy.analysis` style)
+Session = namedtuple(
+    "Session", field_names=["data", "resolutions", "ticks", "orders"]
+)
+
+# What a replay saw: the broker it traded on, the ticks it replayed and
+# how long each took live and replayed
+Replayed = namedtuple(
+    "Replayed", field_names=["broker", "session", "live", "replayed"]
+)
+
+
+def load(path: Union[Path, str]) -> Session:
+    history: Dict[str, List[Mapping[str, Sequence]]] = {}
+    resolutions: Dict[str, float] = {}
+    ticks, orders = [], []
+    for e in read(path):
+        if e.kind in ("symbol", "history") and e.price:
+            resolutions.setdefault(e.symbol, e.price)
+        if e.kind == "history":
+            history.setdefault(e.symbol, []).append(e.bars)
+        elif e.kind == "tick":
+            ticks.append(e)
+            # Ticks are bars of a single price
+            bar = dict.fromkeys(BAR_COLUMNS, [e.price])
+            bar.update(time=[e.time], volume=[0.0])
+            history.setdefault(e.symbol, []).append(bar)
+        elif e.kind == "order":
+            orders.append(
+                {
+                    "time": e.time,
+                    "symbol": e.symbol,
+                    "side": "buy" if e.value > 0 else "sell",
+                    "size": abs(e.value),
+                    "price": e.price,
+                }
+            )
+
+    data = {}
+    for symbol, parts in history.items():
+        columns = {
+            c: np.concatenate([np.asarray(p[c], dtype=float) for p in parts])
+            for c in BAR_COLUMNS
+        }
+        # Refetched histories overlap, keep the first copy of each bar
+        _, first = np.unique(columns["time"], return_index=True)
+        data[symbol] = {c: values[first] for c, values in columns.items()}
+    return Session(data, resolutions, ticks, orders)
+
+
+def replay(
+    strategy: object,
+    path: Union[Path, str],
+    initial_values: Optional[Mapping[str, float]] = None,
+    quote: str = "USD",
+    fee: float = 0.0,
+    speed: Optional[float] = None,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Replayed:
+    """
+    Feed a tick log back through `strategy.tick` on a
+    `SimulatedBroker`, as fast as it can tick or `speed` times as fast
+    as it was recorded.
+
+    The broker's history of each symbol is what the strategy fetched
+    live followed by the recorded ticks, so `init` (and anything else
+    reading history) sees what it saw live, and orders fill at the
+    recorded prices.
+    """
+    session = load(path)
+    broker = SimulatedBroker(
+        session.data, initial_values, quote=quote, fee=fee
+    )
+    strategy.interface = broker
+    strategy.time = broker.time
+
+    ticks = session.ticks
+    replayed = np.zeros(len(ticks))
+    states: Dict[str, StrategyState] = {}
+    started, first = clock(), ticks[0].time if ticks else 0.0
+    for i, e in enumerate(ticks):
+        if speed:
+            wait = (e.time - first) / speed - (clock() - started)
+            if wait > 0:
+                sleep(wait)
+        broker.now = e.time
+        broker.prices[e.symbol] = e.price
+        state = states.get(e.symbol)
+        if state is None:
+            state = states[e.symbol] = StrategyState(
+                strategy,
+                AttributeDict({}),
+                e.symbol,
+                resolution=int(session.resolutions.get(e.symbol, 60)),
+            )
+            strategy.init(e.symbol, state)
+        tick_started = time.perf_counter()
+        strategy.tick(e.price, e.symbol, state)
+        replayed[i] = time.perf_counter() - tick_started
+
+    live = np.array([e.value for e in ticks])
+    return Replayed(broker, session, live, replayed)
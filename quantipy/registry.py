@@ -0,0 +1,87 @@
+import ast
+from importlib import import_module
+from importlib.metadata import entry_points
+from importlib.util import find_spec
+from typing import Callable, Dict, Iterator, Mapping, Optional
+
+
+class Registry(Mapping):
+    """
+    A lazy name -> object registry.
+
+    Objects are registered by import path (`"package.module:Name"`)
+    and only imported the first time they are looked up, so listing or
+    selecting one strategy/exchange never pays the import cost of the
+    others. Extra objects can be contributed by installed packages
+    through the `group` entry point group.
+    """
+
+    def __init__(
+        self, paths: Dict[str, str], group: Optional[str] = None
+    ) -> None:
+        self.paths: Dict[str, str] = dict(paths)
+        self.group = group
+        self._loaded: Dict[str, Callable] = {}
+        self._scanned = group is None
+
+    def _scan(self) -> None:
+        if self._scanned:
+            return
+        self._scanned = True
+        try:
+            entries = entry_points(group=self.group)
+        except TypeError:
+            # Python 3.9 only supports the dict interface
+            entries = entry_points().get(self.group, [])
+        for entry in entries:
+            self.paths.setdefault(entry.name, entry.value)
+
+    def register(self, name: str, path: str) -> None:
+        self.paths[name] = path
+        self._loaded.pop(name, None)
+
+    def path(self, name: str) -> str:
+        if name not in self.paths:
+            self._scan()
+        return self.paths[name]
+
+    def __getitem__(self, name: str) -> Callable:
+        if name not in self._loaded:
+            module, _, attr = self.path(name).partition(":")
+            self._loaded[name] = getattr(import_module(module), attr)
+        return self._loaded[name]
+
+    def __iter__(self) -> Iterator[str]:
+        self._scan()
+        return iter(self.paths)
+
+    def __len__(self) -> int:
+        self._scan()
+        return len(self.paths)
+
+    def __contains__(self, name: object) -> bool:
+        try:
+            self.path(name)
+        except KeyError:
+            return False
+        return True
+
+    def doc(self, name: str) -> Optional[str]:
+        """
+        The docstring of a registered object, read from its source
+        without importing it (falls back to importing if the source
+        can't be found).
+        """
+        if name in self._loaded:
+            return self._loaded[name].__doc__
+        module, _, attr = self.path(name).partition(":")
+        spec = find_spec(module)
+        if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+            return self[name].__doc__
+        with open(spec.origin) as fp:
+            tree = ast.parse(fp.read())
+        for node in tree.body:
+            if isinstance(node, (ast.ClassDef, ast.FunctionDef)):
+                if node.name == attr:
+                    return ast.get_docstring(node, clean=False)
+        return self[name].__doc__
@@ -0,0 +1,156 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Mapping, Sequence, Union
+
+import numpy as np
+from blankly.utils.time_builder import time_interval_to_seconds
+
+from quantipy.buffer import RingBuffer
+
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+
+Timeframe = Union[str, int, float]
+
+
+def seconds(timeframe: Timeframe) -> int:
+    return int(time_interval_to_seconds(timeframe))
+
+
+def aggregate(history: Mapping[str, Sequence], timeframe: int) -> dict:
+    """
+    Aggregate base resolution bars (a blankly style dict of columns)
+    into `timeframe` second bars in one vectorized pass.
+
+    Bars are aligned to multiples of `timeframe` since the epoch. When
+    only closes are available the other columns are derived from them.
+    """
+    time = np.asarray(history["time"], dtype=float)
+    if not len(time):
+        return {column: np.empty(0) for column in COLUMNS}
+    close = np.asarray(history["close"], dtype=float)
+    _open = np.asarray(history.get("open", close), dtype=float)
+    high = np.asarray(history.get("high", close), dtype=float)
+    low = np.asarray(history.get("low", close), dtype=float)
+    volume = np.asarray(
+        history.get("volume", np.zeros_like(close)), dtype=float
+    )
+
+    bucket = (time // timeframe) * timeframe
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(time)] - 1
+
+    return {
+        "time": bucket[starts],
+        "open": _open[starts],
+        "high": np.maximum.reduceat(high, starts),
+        "low": np.minimum.reduceat(low, starts),
+        "close": close[ends],
+        "volume": np.add.reduceat(volume, starts),
+    }
+
+
+class Resampler:
+    """
+    Keeps higher timeframe bars for every symbol, built incrementally
+    from a single base resolution stream.
+
+    Completed bars are kept in fixed size `RingBuffer`s (one per
+    column, mirroring blankly's history layout) and the bar currently
+    being built is kept separately until a tick lands in the next
+    bucket. This lets a strategy running at e.g. 1m also read 30m and
+    1d bars without fetching or loading any extra history.
+    """
+
+    def __init__(
+        self, timeframes: Iterable[Timeframe], size: int = 800
+    ) -> None:
+        self.timeframes: Dict[int, Timeframe] = {
+            seconds(timeframe): timeframe for timeframe in timeframes
+        }
+        self.size = size
+        self.bars: Dict[str, Dict[int, Dict[str, RingBuffer]]] = defaultdict(
+            dict
+        )
+        self.partial: Dict[str, Dict[int, List[float]]] = defaultdict(dict)
+
+    def _buffers(self, symbol: str, timeframe: int) -> Dict[str, RingBuffer]:
+        if timeframe not in self.bars[symbol]:
+            self.bars[symbol][timeframe] = {
+                column: RingBuffer(self.size) for column in COLUMNS
+            }
+        return self.bars[symbol][timeframe]
+
+    def _key(self, timeframe: Timeframe) -> int:
+        key = seconds(timeframe)
+        if key not in self.timeframes:
+            raise KeyError("Timeframe %s is not being resampled" % timeframe)
+        return key
+
+    def seed(self, symbol: str, history: Mapping[str, Sequence]) -> None:
+        """
+        Build every timeframe from already fetched base resolution
+        history, replacing anything previously kept for `symbol`.
+        """
+        self.bars.pop(symbol, None)
+        self.partial.pop(symbol, None)
+        for timeframe in self.timeframes:
+            bars = aggregate(history, timeframe)
+            if not len(bars["time"]):
+                continue
+            buffers = self._buffers(symbol, timeframe)
+            for column in COLUMNS:
+                buffers[column].extend(bars[column][:-1])
+            # The newest bucket may still be filling up
+            self.partial[symbol][timeframe] = [
+                float(bars[column][-1]) for column in COLUMNS
+            ]
+
+    def update(
+        self, symbol: str, time: float, price: float, volume: float = 0.0
+    ) -> None:
+        """Fold a new base resolution tick into every timeframe"""
+        for timeframe in self.timeframes:
+            bucket = (time // timeframe) * timeframe
+            bar = self.partial[symbol].get(timeframe)
+            if bar is None or bucket > bar[0]:
+                if bar is not None:
+                    buffers = self._buffers(symbol, timeframe)
+                    for column, value in zip(COLUMNS, bar):
+                        buffers[column].append(value)
+                self.partial[symbol][timeframe] = [
+                    bucket,
+                    price,
+                    price,
+                    price,
+                    price,
+                    volume,
+                ]
+            elif bucket == bar[0]:
+                bar[2] = max(bar[2], price)
+                bar[3] = min(bar[3], price)
+                bar[4] = price
+                bar[5] += volume
+
+    def bars_for(
+        self, symbol: str, timeframe: Timeframe, partial: bool = True
+    ) -> Dict[str, np.ndarray]:
+        """
+        All kept bars of `timeframe` for `symbol` as arrays (oldest
+        first). The bar still being built is included unless `partial`
+        is False.
+        """
+        key = self._key(timeframe)
+        buffers = self.bars[symbol].get(key)
+        bars = {
+            column: (buffers[column].to_numpy() if buffers else np.empty(0))
+            for column in COLUMNS
+        }
+        bar = self.partial[symbol].get(key)
+        if partial and bar is not None:
+            for column, value in zip(COLUMNS, bar):
+                bars[column] = np.append(bars[column], value)
+        return bars
+
+    def close(
+        self, symbol: str, timeframe: Timeframe, partial: bool = True
+    ) -> np.ndarray:
+        return self.bars_for(symbol, timeframe, partial)["close"]
@@ -0,0 +1,201 @@
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Mapping, Optional, Union
+
+from croniter import croniter
+
+from quantipy.cache import HistoryCache
+from quantipy.exchanges import EXCHANGES, initial_values
+from quantipy.ratelimit import RequestScheduler
+from quantipy.strategies import STRATEGIES
+
+Job = namedtuple(
+    "Job",
+    field_names=[
+        "name",
+        "strategy",
+        "exchange",
+        "symbols",
+        "resolution",
+        "cron",
+        "live",
+        "portfolio",
+        "top",
+    ],
+    defaults=["30m", None, False, None, 10],
+)
+
+
+class Scheduler:
+    """
+    Hosts several strategy instances (and cron scheduled screeners) in
+    one process.
+
+    Jobs without a `cron` expression are regular strategies: their
+    price events are added and the strategy is started. Jobs with one
+    are screeners run whenever the expression fires. Every job shares
+    the same exchange connections, `HistoryCache`, `RequestScheduler`
+    and logging setup so N strategies don't cost N times the memory
+    and API traffic (or blow through the rate limits).
+
+    Jobs are read from a JSON file, e.g:
+
+    {
+        "jobs": [
+            {
+                "name": "crypto",
+                "strategy": "Oversold",
+                "exchange": "Binance",
+                "symbols": ["BTC-USDT", "ETH-USDT"]
+            },
+            {
+                "name": "nasdaq",
+                "strategy": "AdvancedHarmonicOscillators",
+                "exchange": "Alpaca",
+                "symbols": "NASDAQ100",
+                "cron": "*/30 9-16 * * 1-5"
+            }
+        ]
+    }
+    """
+
+    logger = logging.getLogger("Scheduler")
+
+    def __init__(
+        self,
+        jobs: Iterable[Job],
+        history: Optional[HistoryCache] = None,
+        strategies: Mapping = STRATEGIES,
+        exchanges: Mapping = EXCHANGES,
+        symbol_lists: Union[Path, str] = "symbols.json",
+        requests: Optional[RequestScheduler] = None,
+    ) -> None:
+        self.jobs: List[Job] = list(jobs)
+        self.history = history or HistoryCache()
+        self.requests = requests or RequestScheduler()
+        self.strategies = strategies
+        self.exchanges = exchanges
+        self.symbol_lists = Path(symbol_lists)
+        self.instances: Dict[str, object] = {}
+        self.next_run: Dict[str, float] = {}
+        self._connections: Dict[tuple, object] = {}
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_file(cls, path: Union[Path, str], **kwargs) -> "Scheduler":
+        with open(path) as fp:
+            data = json.load(fp)
+        return cls((Job(**job) for job in data["jobs"]), **kwargs)
+
+    @property
+    def screeners(self) -> List[Job]:
+        return [job for job in self.jobs if job.cron]
+
+    def symbols(self, job: Job) -> List[str]:
+        if isinstance(job.symbols, str):
+            with open(self.symbol_lists) as fp:
+                return json.load(fp)[job.symbols][: job.top]
+        return list(job.symbols)
+
+    def connection(self, job: Job) -> object:
+        """One exchange connection per exchange/portfolio pair"""
+        key = (job.exchange, job.portfolio)
+        if key not in self._connections:
+            self._connections[key] = self.exchanges[job.exchange](
+                portfolio_name=job.portfolio
+            )
+        return self._connections[key]
+
+    def instance(self, job: Job) -> object:
+        if job.name in self.instances:
+            return self.instances[job.name]
+
+        exchange = self.connection(job)
+        if not job.live and not job.cron:
+            from blankly import PaperTrade
+
+            exchange = PaperTrade(
+                exchange, initial_account_values=initial_values(job.exchange)
+            )
+
+        strategy = self.strategies[job.strategy](exchange)
+        strategy.history_cache = self.history
+        # Strategies from plugins may not be throttleable
+        if hasattr(strategy, "throttle"):
+            strategy.throttle(self.requests)
+        self.instances[job.name] = strategy
+        return strategy
+
+    def screen(self, job: Job) -> dict:
+        from blankly import ScreenerState
+
+        strategy = self.instance(job)
+        symbols = self.symbols(job)
+        state = ScreenerState(
+            SimpleNamespace(
+                symbols=symbols,
+                interface=self.requests.wrap(self.connection(job).interface),
+            )
+        )
+        state.resolution = job.resolution
+
+        results = {}
+        for symbol in symbols:
+            try:
+                results[symbol] = strategy.screener(symbol, state)
+            except Exception as ex:
+                self.logger.error("[%s] %s failed: %s", job.name, symbol, ex)
+
+        hits = [symbol for symbol in results if results[symbol].get("buy")]
+        self.logger.info(
+            "[%s] %s: %s",
+            job.name,
+            datetime.now().strftime("%c"),
+            ", ".join(hits) or "no signals",
+        )
+        return results
+
+    def run_pending(self, now: Optional[float] = None) -> List[str]:
+        """Run every screener that is due, returns the ones that ran"""
+        now = time.time() if now is None else now
+        ran = []
+        for job in self.screeners:
+            if job.name not in self.next_run:
+                self.next_run[job.name] = croniter(job.cron, now).get_next()
+            if self.next_run[job.name] <= now:
+                self.screen(job)
+                ran.append(job.name)
+                self.next_run[job.name] = croniter(job.cron, now).get_next()
+        return ran
+
+    def start(self) -> None:
+        for job in self.jobs:
+            if job.cron:
+                continue
+            strategy = self.instance(job)
+            for symbol in self.symbols(job):
+                self.logger.info("[%s] Tracking symbol: %s", job.name, symbol)
+                strategy.add_price_event(
+                    strategy.tick,
+                    symbol=symbol,
+                    resolution=job.resolution,
+                    init=strategy.init,
+                )
+            strategy.start()
+
+        while not self._stop.is_set():
+            self.run_pending()
+            if not self.next_run:
+                self._stop.wait()
+                break
+            delay = min(self.next_run.values()) - time.time()
+            self._stop.wait(max(delay, 0))
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,666 @@
+import ast
+import operator
+import time
+from functools import lru_cache, partial
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+
+from quantipy import patterns
+
+if TYPE_CHECKING:
+    from quantipy.cache import IndicatorCache
+
+# A tiny declarative language for buy/sell rules.
+#
+# Rules are expressions over indicator nodes, built either in Python:
+#
+#   rsi(14) <= param("OVERSOLD")
+#   (stoch_rsi_k() * 100 < 20) & macd_cross_up()
+#
+# or parsed from a string with `parse`, where names are strategy
+# constants and `&`, `|` and `~` bind looser than comparisons:
+#
+#   parse("rsi(14) < OVERSOLD & macd_cross_up()")
+#
+# Every node has a canonical `name`, so equal sub-expressions are the
+# same node no matter how often they're written and are only computed
+# once per evaluation. An `Evaluation` computes nodes lazily on first
+# access, either for whole series (backtests, see `Program.run`) or for
+# the latest bar only (`Evaluation.last`), which also short-circuits
+# `&`/`|` so e.g the MACD isn't computed when the RSI rule already
+# failed. Given `SignalStats`, the operands of `&`/`|` are reordered by
+# their measured cost and selectivity, so the cheapest operand likely
+# to decide the outcome goes first.
+
+Value = Union[np.ndarray, float, int, dict]
+
+
+class Node:
+    """An expression node, `inputs` are evaluated before `compute`"""
+
+    def __init__(self, name: str, inputs: Sequence["Node"] = ()) -> None:
+        self.name = name
+        self.inputs = tuple(inputs)
+        # Static nodes don't depend on any `param`, so their values can
+        # be shared between strategy variants
+        self.static = all(node.static for node in self.inputs)
+
+    def compute(self, *values: Value) -> Value:
+        raise NotImplementedError
+
+    def evaluate(self, evaluation: "Evaluation") -> Value:
+        return self.compute(*(evaluation[node] for node in self.inputs))
+
+    def last(self, evaluation: "Evaluation") -> bool:
+        values = np.asarray(evaluation[self])
+        if not values.ndim:
+            return bool(values)
+        return bool(len(values) and values[-1])
+
+    def __repr__(self) -> str:
+        return self.name
+
+    def __lt__(self, other: object) -> "Node":
+        return binary("<", np.less, self, other)
+
+    def __le__(self, other: object) -> "Node":
+        return binary("<=", np.less_equal, self, other)
+
+    def __gt__(self, other: object) -> "Node":
+        return binary(">", np.greater, self, other)
+
+    def __ge__(self, other: object) -> "Node":
+        return binary(">=", np.greater_equal, self, other)
+
+    def __add__(self, other: object) -> "Node":
+        return binary("+", np.add, self, other)
+
+    def __radd__(self, other: object) -> "Node":
+        return binary("+", np.add, other, self)
+
+    def __sub__(self, other: object) -> "Node":
+        return binary("-", np.subtract, self, other)
+
+    def __rsub__(self, other: object) -> "Node":
+        return binary("-", np.subtract, other, self)
+
+    def __mul__(self, other: object) -> "Node":
+        return binary("*", np.multiply, self, other)
+
+    def __rmul__(self, other: object) -> "Node":
+        return binary("*", np.multiply, other, self)
+
+    def __truediv__(self, other: object) -> "Node":
+        return binary("/", np.divide, self, other)
+
+    def __rtruediv__(self, other: object) -> "Node":
+        return binary("/", np.divide, other, self)
+
+    def __and__(self, other: object) -> "Node":
+        return And(self, lift(other))
+
+    def __rand__(self, other: object) -> "Node":
+        return And(lift(other), self)
+
+    def __or__(self, other: object) -> "Node":
+        return Or(self, lift(other))
+
+    def __ror__(self, other: object) -> "Node":
+        return Or(lift(other), self)
+
+    def __invert__(self) -> "Node":
+        return Apply(f"~{self.name}", np.logical_not, self)
+
+
+class Close(Node):
+    """The close prices, every evaluation is seeded with them"""
+
+    def __init__(self) -> None:
+        super().__init__("close")
+
+    def evaluate(self, evaluation: "Evaluation") -> Value:
+        raise KeyError("Evaluation has no close prices")
+
+
+class Const(Node):
+    def __init__(self, value: float) -> None:
+        super().__init__(repr(value))
+        self.value = value
+
+    def evaluate(self, evaluation: "Evaluation") -> Value:
+        return self.value
+
+
+class Param(Node):
+    """A strategy constant, read from the evaluation's `env`"""
+
+    def __init__(self, attr: str) -> None:
+        super().__init__(attr)
+        self.attr = attr
+        self.static = False
+
+    def evaluate(self, evaluation: "Evaluation") -> Value:
+        return getattr(evaluation.env, self.attr)
+
+
+class Apply(Node):
+    def __init__(self, name: str, fn: Callable, *inputs: Node) -> None:
+        super().__init__(name, inputs)
+        self.fn = fn
+
+    def compute(self, *values: Value) -> Value:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.fn(*values)
+
+
+class And(Node):
+    """`a & b & ...`, per bar the operands are checked in order"""
+
+    op, reduce, short = "&", np.logical_and, False
+
+    def __init__(self, *operands: Node) -> None:
+        flat: List[Node] = []
+        for node in operands:
+            flat += node.inputs if type(node) is type(self) else [node]
+        super().__init__(
+            "(%s)" % f" {self.op} ".join(node.name for node in flat), flat
+        )
+
+    def compute(self, *values: Value) -> Value:
+        return self.reduce.reduce(np.broadcast_arrays(*values))
+
+    def last(self, evaluation: "Evaluation") -> bool:
+        stats = evaluation.stats
+        if stats is None:
+            for node in self.inputs:
+                if node.last(evaluation) is self.short:
+                    return self.short
+            return not self.short
+
+        for node in stats.order(self):
+            value = node.last(evaluation)
+            stats.record(self, node, value, evaluation)
+            if value is self.short:
+                return self.short
+        return not self.short
+
+
+class Or(And):
+    """`a | b | ...`"""
+
+    op, reduce, short = "|", np.logical_or, True
+
+
+class SignalStats:
+    """
+    Runtime cost and outcome of every `&`/`|` operand, gathered over
+    many evaluations (e.g every tick of a strategy).
+
+    An operand's cost is the time spent computing the nodes only it
+    uses. Subexpressions shared with its siblings are left out, they
+    are computed once for whichever operand goes first and would
+    otherwise be charged to it alone. Stats are kept per parent, as a
+    hit settles an `&` and an `|` differently.
+
+    `order` puts the operands most likely to settle their `&` (a
+    `False`) or `|` (a `True`) per second spent on them first, and is
+    refreshed every `every` evaluations of the parent. Operands never
+    seen yet go first so they get measured. `report` shows each
+    operand's hit rate and cost.
+    """
+
+    def __init__(self, every: int = 100) -> None:
+        self.every = every
+        # (parent name, operand name) -> [evaluations, hits, seconds]
+        self.stats: Dict[Tuple[str, str], List[float]] = {}
+        self._orders: Dict[str, List[Node]] = {}
+        self._counts: Dict[str, int] = {}
+        self._own: Dict[str, Dict[str, Set[str]]] = {}
+
+    def own(self, parent: And, node: Node) -> Set[str]:
+        """Names of the nodes `node` doesn't share with its siblings"""
+        own = self._own.get(parent.name)
+        if own is None:
+            used = {operand.name: names(operand) for operand in parent.inputs}
+            own = {
+                name: nodes.difference(
+                    *(other for key, other in used.items() if key != name)
+                )
+                for name, nodes in used.items()
+            }
+            self._own[parent.name] = own
+        return own[node.name]
+
+    def record(
+        self, parent: And, node: Node, value: bool, evaluation: "Evaluation"
+    ) -> None:
+        costs = evaluation.costs
+        stats = self.stats.setdefault((parent.name, node.name), [0, 0, 0.0])
+        stats[0] += 1
+        stats[1] += value
+        stats[2] += sum(
+            costs.get(name, 0.0) for name in self.own(parent, node)
+        )
+
+    def score(self, parent: And, node: Node) -> float:
+        """Expected seconds spent per evaluation it settles"""
+        evaluations, hits, seconds = self.stats.get(
+            (parent.name, node.name), (0, 0, 0.0)
+        )
+        if not evaluations:
+            return -1.0
+        settled = (hits if parent.short else evaluations - hits) / evaluations
+        return seconds / evaluations / max(settled, 1e-6)
+
+    def order(self, parent: And) -> List[Node]:
+        order = self._orders.get(parent.name)
+        count = self._counts.get(parent.name, 0)
+        if order is None or count >= self.every:
+            # `sorted` is stable, ties keep the written order
+            order = sorted(parent.inputs, key=partial(self.score, parent))
+            self._orders[parent.name] = order
+            count = 0
+        self._counts[parent.name] = count + 1
+        return order
+
+    def report(self) -> List[dict]:
+        """Every operand seen, the most expensive in total first"""
+        rows = [
+            {
+                "rule": parent,
+                "predicate": name,
+                "evaluations": int(evaluations),
+                "hit_rate": hits / evaluations,
+                "mean_cost": seconds / evaluations,
+                "total_cost": seconds,
+            }
+            for (parent, name), (evaluations, hits, seconds) in (
+                self.stats.items()
+            )
+        ]
+        return sorted(rows, key=lambda row: -row["total_cost"])
+
+
+class Evaluation:
+    """
+    Lazily computed node values for one close series. `env` (a
+    strategy class or instance) provides the `param` values, `stats`
+    (if any) orders and measures the `&`/`|` operands. When measured,
+    `costs` holds the seconds each node took to compute, not counting
+    its inputs.
+    """
+
+    def __init__(
+        self,
+        values: Dict[str, Value],
+        env: object = None,
+        stats: Optional[SignalStats] = None,
+    ) -> None:
+        self.values = values
+        self.env = env
+        self.stats = stats
+        self.costs: Dict[str, float] = {}
+        # Seconds spent computing the inputs of the node being computed
+        self._inner = 0.0
+
+    @classmethod
+    def of(
+        cls,
+        close: Iterable[float],
+        env: object = None,
+        stats: Optional[SignalStats] = None,
+    ) -> "Evaluation":
+        return cls({"close": np.asarray(close, dtype=float)}, env, stats)
+
+    def __getitem__(self, node: Node) -> Value:
+        if node.name not in self.values:
+            if self.stats is None:
+                self.values[node.name] = node.evaluate(self)
+            else:
+                self.values[node.name] = self._measure(node)
+        return self.values[node.name]
+
+    def _measure(self, node: Node) -> Value:
+        outer, self._inner = self._inner, 0.0
+        started = time.perf_counter()
+        try:
+            return node.evaluate(self)
+        finally:
+            took = time.perf_counter() - started
+            self.costs[node.name] = took - self._inner
+            self._inner = outer + took
+
+    def last(self, node: Node) -> bool:
+        """The value of `node` at the latest bar"""
+        return node.last(self)
+
+
+class Program:
+    """
+    Rules compiled into one DAG: `nodes` holds every distinct node
+    (inputs before the nodes using them) shared by all `outputs`.
+    """
+
+    def __init__(self, *outputs: Optional[Node]) -> None:
+        self.outputs = outputs
+        self.nodes: List[Node] = []
+        seen = set()
+
+        def visit(node: Node) -> None:
+            if node.name in seen:
+                return
+            seen.add(node.name)
+            for child in node.inputs:
+                visit(child)
+            self.nodes.append(node)
+
+        for node in outputs:
+            if node is not None:
+                visit(node)
+
+    def precompute(
+        self,
+        close: Iterable[float],
+        cache: Optional["IndicatorCache"] = None,
+        key: tuple = (),
+    ) -> Dict[str, Value]:
+        """
+        Values of every static node, reusable by `run` for any env.
+        With a `cache`, indicators computed straight off the close
+        (RSI, MACD, ...) are read from it under `key`.
+        """
+        evaluation = Evaluation.of(close)
+        for node in self.nodes:
+            if not node.static:
+                continue
+            if cache is not None and node.inputs == (CLOSE,):
+                evaluation.values[node.name] = cache.get(
+                    key, node.name, evaluation.values["close"], node.compute
+                )
+            evaluation[node]
+        return evaluation.values
+
+    def run(
+        self, values: Dict[str, Value], env: object = None
+    ) -> List[np.ndarray]:
+        """Whole series of every output, `False` where it's missing"""
+        evaluation = Evaluation(dict(values), env)
+        length = len(evaluation.values["close"])
+        return [
+            (
+                np.zeros(length, dtype=bool)
+                if node is None
+                else np.broadcast_to(evaluation[node], length).astype(bool)
+            )
+            for node in self.outputs
+        ]
+
+
+@lru_cache(maxsize=None)
+def compile_rules(*outputs: Union[Node, str, None]) -> Program:
+    """A (cached) `Program` of rules given as nodes or strings"""
+    return Program(*(parse(o) if isinstance(o, str) else o for o in outputs))
+
+
+def names(node: Node) -> Set[str]:
+    """Names of `node` and everything it's computed from"""
+    seen, todo = set(), [node]
+    while todo:
+        node = todo.pop()
+        if node.name not in seen:
+            seen.add(node.name)
+            todo += node.inputs
+    return seen
+
+
+def lift(value: object) -> Node:
+    if isinstance(value, Node):
+        return value
+    if isinstance(value, (bool, int, float, np.number)):
+        return Const(value)
+    raise TypeError("Can't use %r in a signal expression" % (value,))
+
+
+def binary(op: str, fn: Callable, a: object, b: object) -> Node:
+    a, b = lift(a), lift(b)
+    return Apply(f"({a.name} {op} {b.name})", fn, a, b)
+
+
+def call(name: str, fn: Callable, *inputs: object, **params: object) -> Node:
+    """A function node, `params` are fixed at build time"""
+    inputs = [lift(node) for node in inputs]
+    args = [node.name for node in inputs]
+    args += [f"{key}={value!r}" for key, value in params.items()]
+    return Apply(f"{name}({', '.join(args)})", partial(fn, **params), *inputs)
+
+
+def field(node: Node, key: str) -> Node:
+    return Apply(f"{node.name}.{key}", operator.itemgetter(key), node)
+
+
+CLOSE = Close()
+
+
+def close() -> Node:
+    return CLOSE
+
+
+def param(attr: str) -> Node:
+    return Param(attr)
+
+
+def _rsi(close: np.ndarray, window: int, source: str) -> np.ndarray:
+    if source == "ta":
+        from pandas import Series
+        from ta.momentum import RSIIndicator
+
+        return RSIIndicator(Series(close), window).rsi().to_numpy()
+
+    from blankly.indicators import rsi
+
+    out = np.full(len(close), np.nan)
+    if len(close) > window:
+        values = rsi(np.ascontiguousarray(close), window)
+        out[len(close) - len(values) :] = values
+    return out
+
+
+def rsi(window: int = 14, source: str = "tulip") -> Node:
+    """
+    RSI of the close, `tulip` (blankly.indicators) or `ta` flavoured.
+    They smooth differently, so they're different series.
+    """
+    if source not in ("tulip", "ta"):
+        raise ValueError("Unknown RSI source `%s`" % source)
+    return call("rsi", _rsi, CLOSE, window=window, source=source)
+
+
+def _stoch_rsi(
+    close: np.ndarray, window: int, smooth1: int, smooth2: int, fillna: bool
+) -> Dict[str, np.ndarray]:
+    from pandas import Series
+    from ta.momentum import StochRSIIndicator
+
+    stoch = StochRSIIndicator(
+        Series(close), window, smooth1, smooth2, fillna=fillna
+    )
+    return {
+        "k": stoch.stochrsi_k().to_numpy(),
+        "d": stoch.stochrsi_d().to_numpy(),
+    }
+
+
+def stoch_rsi(
+    window: int = 14, smooth1: int = 3, smooth2: int = 3, fillna: bool = False
+) -> Node:
+    """Stochastic RSI (0-1), read its lines with `stoch_rsi_k`/`_d`"""
+    return call(
+        "stoch_rsi",
+        _stoch_rsi,
+        CLOSE,
+        window=window,
+        smooth1=smooth1,
+        smooth2=smooth2,
+        fillna=fillna,
+    )
+
+
+def stoch_rsi_k(*args, **kwargs) -> Node:
+    return field(stoch_rsi(*args, **kwargs), "k")
+
+
+def stoch_rsi_d(*args, **kwargs) -> Node:
+    return field(stoch_rsi(*args, **kwargs), "d")
+
+
+def _macd(
+    close: np.ndarray, slow: int, fast: int, signal: int
+) -> Dict[str, np.ndarray]:
+    from pandas import Series
+    from ta.trend import MACD
+
+    macd = MACD(Series(close), slow, fast, signal)
+    return {
+        "line": macd.macd().to_numpy(),
+        "signal": macd.macd_signal().to_numpy(),
+    }
+
+
+def _macd_node(slow: int = 26, fast: int = 12, signal: int = 9) -> Node:
+    return call("macd", _macd, CLOSE, slow=slow, fast=fast, signal=signal)
+
+
+def macd(*args, **kwargs) -> Node:
+    return field(_macd_node(*args, **kwargs), "line")
+
+
+def macd_signal(*args, **kwargs) -> Node:
+    return field(_macd_node(*args, **kwargs), "signal")
+
+
+def recently(mask: Node, window: object) -> Node:
+    return call("recently", patterns.recently, mask, window)
+
+
+def rising(values: Node, window: object) -> Node:
+    return call("rising", patterns.rising, values, window)
+
+
+def falling(values: Node, window: object) -> Node:
+    return call("falling", patterns.falling, values, window)
+
+
+def crossed_above(a: Node, b: object) -> Node:
+    return call("crossed_above", patterns.crossed_above, a, b)
+
+
+def crossed_below(a: Node, b: object) -> Node:
+    return call("crossed_below", patterns.crossed_below, a, b)
+
+
+def macd_cross_up(*args, **kwargs) -> Node:
+    return crossed_above(macd(*args, **kwargs), macd_signal(*args, **kwargs))
+
+
+def macd_cross_down(*args, **kwargs) -> Node:
+    return crossed_below(macd(*args, **kwargs), macd_signal(*args, **kwargs))
+
+
+FUNCTIONS: Dict[str, Callable[..., Node]] = {
+    "close": close,
+    "param": param,
+    "rsi": rsi,
+    "stoch_rsi_k": stoch_rsi_k,
+    "stoch_rsi_d": stoch_rsi_d,
+    "macd": macd,
+    "macd_signal": macd_signal,
+    "recently": recently,
+    "rising": rising,
+    "falling": falling,
+    "crossed_above": crossed_above,
+    "crossed_below": crossed_below,
+    "macd_cross_up": macd_cross_up,
+    "macd_cross_down": macd_cross_down,
+}
+
+_COMPARE = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+_ARITHMETIC = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+
+def parse(text: str) -> Node:
+    """
+    Parse a rule, e.g `rsi(14) <= OVERSOLD & ~macd_cross_down()`.
+
+    Calls are looked up in `FUNCTIONS` and bare names are strategy
+    constants (`param`). Unlike Python, `&`, `|` and `~` bind looser
+    than comparisons.
+    """
+    # `and`/`or`/`not` have the precedence we want
+    source = text.replace("&", " and ").replace("|", " or ")
+    source = source.replace("~", " not ")
+    return _build(ast.parse(source.strip(), mode="eval").body)
+
+
+def _build(tree: ast.AST) -> Node:  # noqa: C901
+    if isinstance(tree, ast.BoolOp):
+        nodes = [_build(value) for value in tree.values]
+        return (And if isinstance(tree.op, ast.And) else Or)(*nodes)
+    if isinstance(tree, ast.UnaryOp) and isinstance(tree.op, ast.Not):
+        return ~_build(tree.operand)
+    if isinstance(tree, ast.UnaryOp) and isinstance(tree.op, ast.USub):
+        return 0 - _build(tree.operand)
+    if isinstance(tree, ast.Compare):
+        nodes = [_build(tree.left)] + [_build(c) for c in tree.comparators]
+        pairs = [
+            _COMPARE[type(op)](a, b)
+            for op, a, b in zip(tree.ops, nodes, nodes[1:])
+            if type(op) in _COMPARE
+        ]
+        if len(pairs) != len(tree.ops):
+            raise SyntaxError("Unsupported comparison in %s" % ast.dump(tree))
+        return pairs[0] if len(pairs) == 1 else And(*pairs)
+    if isinstance(tree, ast.BinOp) and type(tree.op) in _ARITHMETIC:
+        return _ARITHMETIC[type(tree.op)](
+            _build(tree.left), _build(tree.right)
+        )
+    if isinstance(tree, ast.Call) and isinstance(tree.func, ast.Name):
+        if tree.func.id not in FUNCTIONS:
+            raise NameError("Unknown signal function `%s`" % tree.func.id)
+        args = [_literal(arg) for arg in tree.args]
+        kwargs = {kw.arg: _literal(kw.value) for kw in tree.keywords}
+        return FUNCTIONS[tree.func.id](*args, **kwargs)
+    if isinstance(tree, ast.Name):
+        return param(tree.id)
+    if isinstance(tree, ast.Constant) and not isinstance(tree.value, str):
+        return lift(tree.value)
+    raise SyntaxError("Unsupported expression %s" % ast.dump(tree))
+
+
+def _literal(tree: ast.AST) -> object:
+    # Function arguments are plain values (e.g windows) or expressions
+    if isinstance(tree, ast.Constant):
+        return tree.value
+    return _build(tree)
@@ -0,0 +1,215 @@
+import json
+import logging
+from collections import defaultdict, namedtuple
+from pathlib import Path
+from typing import Dict, List, Mapping, Sequence, Set, Union
+
+import numpy as np
+from pandas import read_csv
+
+logger = logging.getLogger("Splits")
+
+# `ratio` is new shares per old share, e.g 4.0 for a 4-for-1 split and
+# 0.1 for a 1-for-10 reverse split
+Split = namedtuple("Split", field_names=["time", "ratio"])
+
+PRICE_COLUMNS = ("open", "high", "low", "close")
+
+# Per cache file, the split times already applied to it
+MANIFEST = ".splits.json"
+
+
+def parse_ratio(value: Union[str, float]) -> float:
+    """`"4:1"`, `"4/1"`, `"4-for-1"` or `4` -> 4.0"""
+    if isinstance(value, str):
+        for sep in (":", "/", "-for-"):
+            if sep in value:
+                new, old = value.split(sep)
+                return float(new) / float(old)
+    return float(value)
+
+
+def load(path: Union[Path, str]) -> Dict[str, List[Split]]:
+    """Every split with a ratio in a `splits.json` file, by symbol"""
+    with open(path) as fp:
+        data = json.load(fp)
+    splits = defaultdict(list)
+    for symbol, events in data.items():
+        for event in events:
+            if event.get("ratio"):
+                splits[symbol].append(
+                    Split(float(event["time"]), parse_ratio(event["ratio"]))
+                )
+        splits[symbol].sort()
+    return {symbol: events for symbol, events in splits.items() if events}
+
+
+def replace(
+    path: Union[Path, str], generated: Mapping[str, Sequence[Split]]
+) -> int:
+    """
+    Write generated splits into a `splits.json` file. Those of an
+    earlier generation of the same symbols (the entries with a ratio)
+    are replaced, entries without one are kept. Returns how many
+    splits were written.
+    """
+    path = Path(path)
+    data: Dict[str, List[dict]] = {}
+    if path.exists():
+        with open(path) as fp:
+            data = json.load(fp)
+    changed, written = False, 0
+    for symbol, events in generated.items():
+        times = {int(split.time) for split in events}
+        old = data.get(symbol, [])
+        kept = [
+            event
+            for event in old
+            if not event.get("ratio") and event.get("time") not in times
+        ]
+        new = [
+            {
+                "start": int(split.time) - 86400,
+                "end": int(split.time) + 86400,
+                "time": int(split.time),
+                "ratio": split.ratio,
+            }
+            for split in events
+        ]
+        if kept + new != old:
+            changed = True
+            if kept or new:
+                data[symbol] = kept + new
+            else:
+                data.pop(symbol, None)
+        written += len(new)
+    if changed:
+        with open(path, "w") as fp:
+            json.dump(data, fp, indent=4)
+    return written
+
+
+def factors(time: np.ndarray, splits: Sequence[Split]) -> np.ndarray:
+    """
+    The cumulative ratio of every split after each bar, i.e what a
+    bar's price has to be divided by (and its volume multiplied by) to
+    line up with the prices after the last split
+    """
+    time = np.asarray(time, dtype=float)
+    if not splits:
+        return np.ones(len(time))
+    splits = sorted(splits)
+    times = np.array([split.time for split in splits])
+    ratios = np.array([split.ratio for split in splits])
+    # The product of the ratios of split i and every split after it
+    after = np.r_[np.cumprod(ratios[::-1])[::-1], 1.0]
+    return after[np.searchsorted(times, time, side="right")]
+
+
+def adjust(
+    columns: Mapping[str, Sequence], splits: Sequence[Split]
+) -> Dict[str, np.ndarray]:
+    """
+    Back-adjust OHLCV `columns` (a blankly style dict of columns, or a
+    DataFrame) for `splits` in one vectorized pass. Columns other than
+    prices and volume are copied as they are.
+    """
+    factor = factors(columns["time"], splits)
+    adjusted = {}
+    for column in columns:
+        values = np.asarray(columns[column])
+        if column in PRICE_COLUMNS:
+            values = values / factor
+        elif column == "volume":
+            values = values * factor
+        adjusted[column] = values
+    return adjusted
+
+
+def symbol_of(path: Path) -> str:
+    # Price cache files are `exchange,sandbox,symbol,start,stop,res.csv`
+    parts = path.stem.split(",")
+    return parts[2] if len(parts) == 6 else path.stem
+
+
+def splits_for(
+    symbol: str, splits: Mapping[str, Sequence[Split]]
+) -> Sequence[Split]:
+    if symbol in splits:
+        return splits[symbol]
+    return splits.get(symbol.partition("-")[0], ())
+
+
+def read_manifest(directory: Path) -> Dict[str, List[float]]:
+    path = directory / MANIFEST
+    if not path.exists():
+        return {}
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def adjust_cache(
+    directory: Union[Path, str], splits: Mapping[str, Sequence[Split]]
+) -> List[Path]:
+    """
+    Back-adjust every price cache csv in `directory` in place.
+
+    A manifest in the directory records which splits each file has
+    had applied, so running this again (e.g after a backtest cached
+    more history) only adjusts new files and new splits. Returns the
+    files that were rewritten.
+    """
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+
+    rewritten, changed = [], False
+    for path in sorted(directory.glob("*.csv")):
+        events = splits_for(symbol_of(path), splits)
+        applied = set(manifest.get(path.name, []))
+        pending = [split for split in events if split.time not in applied]
+        if not pending:
+            continue
+
+        frame = read_csv(path)
+        # Splits before the first bar leave the whole file as it is
+        if len(frame) and factors(frame["time"], pending).max() != 1:
+            adjusted = adjust(frame, pending)
+            for column in frame.columns:
+                frame[column] = adjusted[column]
+            frame.to_csv(path, index=False)
+            rewritten.append(path)
+            logger.info("Adjusted %s for %d split(s)", path.name, len(pending))
+        manifest[path.name] = sorted(applied | {s.time for s in pending})
+        changed = True
+
+    if changed:
+        with open(directory / MANIFEST, "w") as fp:
+            json.dump(manifest, fp, indent=4)
+    return rewritten
+
+
+def adjusted(
+    directory: Union[Path, str], splits: Mapping[str, Sequence[Split]]
+) -> Dict[str, Set[float]]:
+    """
+    The split times (by `splits` symbol) that every cached price file
+    of their symbol has been adjusted for, per the manifest. Symbols
+    without cached files (e.g a fresh cache, downloaded during the
+    backtest) have none.
+    """
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+    applied = defaultdict(list)
+    for path in directory.glob("*.csv"):
+        symbol = symbol_of(path)
+        key = symbol if symbol in splits else symbol.partition("-")[0]
+        applied[key].append(set(manifest.get(path.name, ())))
+
+    done = {}
+    for symbol, events in splits.items():
+        if not applied.get(symbol):
+            continue
+        times = set.intersection({s.time for s in events}, *applied[symbol])
+        if times:
+            done[symbol] = times
+    return done
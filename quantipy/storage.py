@@ -0,0 +1,219 @@
+import json
+import logging
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, Mapping, Optional, Sequence, Union
+
+import numpy as np
+from pandas import DataFrame, read_csv
+
+from quantipy.resample import COLUMNS
+
+logger = logging.getLogger("Storage")
+
+# A compact price file is `MAGIC`, zlib compressed blocks of every
+# column, a JSON footer describing them, the footer's length (u32) and
+# `MAGIC` again. Blocks can be read one at a time (see `blocks`).
+#
+# - time ~> whole seconds, delta encoded from the block's first bar,
+#   zigzag mapped to unsigned ints and stored in the narrowest of
+#   uint8/16/32/64 they fit (one byte a bar for a regular series)
+# - prices and volume ~> float64, or float32 where `fits_float32` says
+#   every value survives it, byte shuffled so the exponents and high
+#   mantissa bytes of neighbouring bars compress together
+MAGIC = b"QPC\x01"
+FOOTER = struct.Struct("<I")
+SUFFIX = ".qpc"
+
+UINTS = (np.uint8, np.uint16, np.uint32, np.uint64)
+
+# Most decimals `fits_float32` looks for in quoted prices
+MAX_DECIMALS = 10
+
+
+def zigzag(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def unzigzag(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.uint64)
+    return ((values >> 1).astype(np.int64)) ^ -((values & 1).astype(np.int64))
+
+
+def encode_time(time: np.ndarray) -> tuple:
+    """(first time, narrowest unsigned dtype, zigzagged deltas)"""
+    time = np.asarray(time, dtype=np.int64)
+    deltas = zigzag(np.diff(time, prepend=time[:1]))
+    top = int(deltas.max()) if len(deltas) else 0
+    dtype = next(d for d in UINTS if top <= np.iinfo(d).max)
+    return int(time[0]) if len(time) else 0, dtype, deltas.astype(dtype)
+
+
+def decode_time(first: int, deltas: np.ndarray) -> np.ndarray:
+    return first + np.cumsum(unzigzag(deltas))
+
+
+def shuffle(values: np.ndarray) -> bytes:
+    size = values.dtype.itemsize
+    return values.view(np.uint8).reshape(-1, size).T.tobytes()
+
+
+def unshuffle(data: bytes, dtype: np.dtype) -> np.ndarray:
+    size = np.dtype(dtype).itemsize
+    raw = np.frombuffer(data, dtype=np.uint8).reshape(size, -1)
+    return np.ascontiguousarray(raw.T).view(dtype).ravel()
+
+
+def decimals_of(values: np.ndarray) -> Optional[int]:
+    """The fewest decimals (up to `MAX_DECIMALS`) all values are quoted to"""
+    values = np.asarray(values, dtype=np.float64)
+    scale = np.maximum(np.abs(values), 1.0)
+    for decimals in range(MAX_DECIMALS + 1):
+        if np.all(
+            np.abs(np.round(values, decimals) - values) <= scale * 1e-12
+        ):
+            return decimals
+    return None
+
+
+def fits_float32(
+    values: Sequence[float], decimals: Optional[int] = None
+) -> bool:
+    """
+    The precision guard for float32 prices: whether every value rounds
+    back to itself at `decimals` places (by default the decimals the
+    values are quoted to) after a float32 round trip.
+
+    float32 keeps about 7 significant digits, e.g BTC at 60000.01 still
+    fits at 2 decimals but not at 200000.01, and a satoshi-quoted
+    altcoin only fits while it's quoted to 7 significant digits or
+    fewer. Full precision floats (computed, not quoted) never fit.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return True
+    if decimals is None:
+        decimals = decimals_of(values)
+        if decimals is None:
+            return False
+    narrowed = values.astype(np.float32).astype(np.float64)
+    return bool(
+        np.array_equal(
+            np.round(narrowed, decimals), np.round(values, decimals)
+        )
+    )
+
+
+def write(
+    path: Union[Path, str],
+    columns: Mapping[str, Sequence],
+    dtype: Union[str, np.dtype] = np.float64,
+    decimals: Optional[int] = None,
+    block: int = 65_536,
+    level: int = 6,
+) -> Dict[str, str]:
+    """
+    Write OHLCV `columns` (blankly style, or a DataFrame) as a compact
+    price file. With a float32 `dtype` each column that fails
+    `fits_float32` is kept as float64 instead. Returns the dtype every
+    column was stored as.
+    """
+    time = np.asarray(columns["time"], dtype=np.float64)
+    if not np.array_equal(time, np.round(time)):
+        raise ValueError("Compact price files need whole second times")
+    values = {
+        c: np.asarray(columns[c], dtype=np.float64)
+        for c in COLUMNS[1:]
+        if c in columns
+    }
+    dtypes = {"time": "delta"}
+    for column, array in values.items():
+        narrow = np.dtype(dtype) == np.float32
+        if narrow and not fits_float32(array, decimals):
+            logger.warning(
+                "%s of %s doesn't fit float32, keeping float64",
+                column,
+                path,
+            )
+            narrow = False
+        values[column] = array.astype(np.float32 if narrow else np.float64)
+        dtypes[column] = values[column].dtype.str
+
+    meta = {"rows": len(time), "columns": dtypes, "blocks": []}
+    with open(path, "wb") as fp:
+        fp.write(MAGIC)
+        for start in range(0, len(time), block):
+            stop = min(start + block, len(time))
+            first, uint, deltas = encode_time(time[start:stop])
+            entry = {
+                "rows": stop - start,
+                "first": first,
+                "time": np.dtype(uint).str,
+                "offsets": {},
+            }
+            payloads = {"time": zlib.compress(deltas.tobytes(), level)}
+            for column, array in values.items():
+                data = shuffle(np.ascontiguousarray(array[start:stop]))
+                payloads[column] = zlib.compress(data, level)
+            for column, payload in payloads.items():
+                entry["offsets"][column] = [fp.tell(), len(payload)]
+                fp.write(payload)
+            meta["blocks"].append(entry)
+        tail = json.dumps(meta).encode()
+        fp.write(tail + FOOTER.pack(len(tail)) + MAGIC)
+    return dtypes
+
+
+def footer(path: Union[Path, str]) -> dict:
+    with open(path, "rb") as fp:
+        if fp.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a compact price file" % path)
+        fp.seek(-(FOOTER.size + len(MAGIC)), 2)
+        (size,) = FOOTER.unpack(fp.read(FOOTER.size))
+        if fp.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is truncated" % path)
+        fp.seek(-(size + FOOTER.size + len(MAGIC)), 2)
+        return json.loads(fp.read(size))
+
+
+def blocks(
+    path: Union[Path, str], columns: Optional[Sequence[str]] = None
+) -> Iterator[Dict[str, np.ndarray]]:
+    """Every block of a compact price file, as float64 columns"""
+    meta = footer(path)
+    wanted = [c for c in meta["columns"] if columns is None or c in columns]
+    with open(path, "rb") as fp:
+        for entry in meta["blocks"]:
+            out = {}
+            for column in wanted:
+                offset, size = entry["offsets"][column]
+                fp.seek(offset)
+                data = zlib.decompress(fp.read(size))
+                if column == "time":
+                    deltas = np.frombuffer(data, dtype=entry["time"])
+                    out[column] = decode_time(entry["first"], deltas)
+                    out[column] = out[column].astype(np.float64)
+                else:
+                    dtype = np.dtype(meta["columns"][column])
+                    out[column] = unshuffle(data, dtype).astype(np.float64)
+            yield out
+
+
+def read(
+    path: Union[Path, str], columns: Optional[Sequence[str]] = None
+) -> Dict[str, np.ndarray]:
+    parts = list(blocks(path, columns))
+    names = parts[0] if parts else footer(path)["columns"]
+    return {
+        c: np.concatenate([p[c] for p in parts]) if parts else np.empty(0)
+        for c in names
+    }
+
+
+def read_prices(path: Union[Path, str]) -> DataFrame:
+    """A price history file, compact or csv, as a DataFrame"""
+    if Path(path).suffix == SUFFIX:
+        return DataFrame(read(path))
+    return read_csv(path)
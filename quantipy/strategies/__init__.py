@@ -1,4 +1,23 @@
-from quantipy.strategies.rsi import Oversold
-from quantipy.strategies.stochastic import AdvancedHarmonicOscillators
+from typing import Callable
 
-__all__ = ["Oversold", "AdvancedHarmonicOscillators"]
+from quantipy.registry import Registry
+
+# Strategies are imported on first access so that importing this
+# package (e.g. to list them) doesn't pull in `ta`, pandas and blankly
+STRATEGIES = Registry(
+    {
+        "AdvancedHarmonicOscillators": (
+            "quantipy.strategies.stochastic:AdvancedHarmonicOscillators"
+        ),
+        "Oversold": "quantipy.strategies.rsi:Oversold",
+    },
+    group="quantipy.strategies",
+)
+
+__all__ = ["Oversold", "AdvancedHarmonicOscillators", "STRATEGIES"]
+
+
+def __getattr__(name: str) -> Callable:
+    if name in STRATEGIES:
+        return STRATEGIES[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
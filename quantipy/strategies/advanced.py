@@ -78,28 +78,35 @@ class AdvancedStrategy(SimpleStrategy):
     def tick(  # noqa: C901
         self, price: float, symbol: str, state: StrategyState
     ) -> None:
-        args: tuple = (price, symbol, state)
-
-        self.run_callbacks("tick", *args)
-
-        if not self.safe(symbol):
+        # Blacklisted symbols are dropped before any callback runs, unless
+        # they still hold a position for the exit checks to close
+        if symbol in self.blacklist and not self.holding(symbol, state):
             return
 
-        position: Union[Position, None] = self.manager.state.get(
-            state.base_asset
-        )
-
-        # No position found, or it's closed
-        if position is None or not position.open:
-            if self.buy(symbol):
-                self.run_callbacks("buy", *args)
-            elif self.sell(symbol):
-                self.run_callbacks("sell", *args)
-        # Maybe close our long position
-        elif position.open and position.state == TradeState.LONGING:
-            if self.sell(symbol):
-                self.manager.close(position, state)
-        # Maybe close our short
-        elif position.open and position.state == TradeState.SHORTING:
-            if self.buy(symbol):
-                self.manager.close(position, state)
+        resolution = getattr(state, "resolution", None)
+        with self.watchdog.watch(symbol, resolution):
+            args: tuple = (price, symbol, state)
+
+            self.run_callbacks("tick", *args)
+
+            if not self.safe(symbol):
+                return
+
+            position: Union[Position, None] = self.manager.state.get(
+                state.base_asset
+            )
+
+            # No position found, or it's closed
+            if position is None or not position.open:
+                if self.buy(symbol):
+                    self.run_callbacks("buy", *args)
+                elif self.sell(symbol):
+                    self.run_callbacks("sell", *args)
+            # Maybe close our long position
+            elif position.open and position.state == TradeState.LONGING:
+                if self.sell(symbol):
+                    self.manager.close(position, state)
+            # Maybe close our short
+            elif position.open and position.state == TradeState.SHORTING:
+                if self.buy(symbol):
+                    self.manager.close(position, state)
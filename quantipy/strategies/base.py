@@ -1,11 +1,12 @@
 import inspect
 import logging
 from collections import defaultdict
-from typing import List
+from typing import Dict, List
 
 from blankly import Strategy
 from blankly.exchanges.exchange import Exchange
 
+from quantipy.feeds import Blacklist
 from quantipy.types import (
     Callable,
     Callback,
@@ -13,10 +14,18 @@ from quantipy.types import (
     HistoricalData,
     Positions,
 )
+from quantipy.watchdog import TickWatchdog
 
 
-def event(event: str) -> Callable:
+def event(event: str, deferrable: bool = False) -> Callable:
+    """
+    Register a callback for `event`. Deferrable callbacks are secondary
+    work the tick watchdog may run in the background once a tick is
+    running late (see `StrategyBase.TICK_BUDGET`)
+    """
+
     def decorator(callback: Callback) -> Callback:
+        callback.deferrable = deferrable
         StrategyBase.register_event_callback(event, callback)
         return callback
 
@@ -39,11 +48,18 @@ class StrategyBase(Strategy):
     logger: logging.RootLogger = logging.getLogger()
     callbacks: EventCallbacks = defaultdict(list)
 
+    # Seconds a tick may take per resolution, e.g {"1m": 0.5, "1h": 5}.
+    # Late ticks defer audit records, debug logs and deferrable
+    # callbacks and overruns are counted (see `TickWatchdog`).
+    # Resolutions not listed aren't watched
+    TICK_BUDGET: Dict[str, float] = {}
+
     def __init__(self, exchange: Exchange) -> None:
         super().__init__(exchange)
         self.positions: Positions = defaultdict(dict)
         self.data: HistoricalData = defaultdict(dict)
-        self.blacklist: List[str] = []
+        self.blacklist: Blacklist = Blacklist()
+        self.watchdog = TickWatchdog(self.TICK_BUDGET)
         self._clean_callbacks()
 
     def _clean_callbacks(self) -> None:
@@ -80,7 +96,15 @@ class StrategyBase(Strategy):
 
     def run_callbacks(self, _type: str, *args, **kwargs) -> None:
         for fn in self.callbacks[_type]:
-            fn(self, *args, **kwargs)
+            if getattr(fn, "deferrable", False):
+                self.watchdog.run(fn, self, *args, **kwargs)
+            else:
+                fn(self, *args, **kwargs)
+
+    def debug(self, message: str, *args) -> None:
+        """Debug log off the tick's time once it's running late"""
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.watchdog.run(self.logger.debug, message, *args)
 
     def buy(self) -> bool:
         return False
@@ -1,6 +1,4 @@
-import numpy as np
 from blankly import StrategyState
-from blankly.indicators import rsi
 
 from quantipy.strategies.simple import SimpleStrategy, event
 
@@ -11,6 +9,13 @@ class Oversold(SimpleStrategy):
     (respecitvely)
     """
 
+    # RSI thresholds
+    OVERSOLD: float = 30
+    OVERBOUGHT: float = 70
+
+    BUY = "rsi(14) <= OVERSOLD"
+    SELL = "rsi(14) >= OVERBOUGHT"
+
     @event("buy")
     def b(self, price: float, symbol: str, state: StrategyState) -> float:
         return self.manager.order(price, symbol, state)
@@ -18,11 +23,3 @@ class Oversold(SimpleStrategy):
     @event("sell")
     def s(self, price: float, symbol: str, state: StrategyState) -> float:
         return self.manager.order(price, symbol, state, side="sell")
-
-    def buy(self, symbol: str) -> bool:
-        _rsi: np.array = rsi(self.data[symbol]["close"])
-        return _rsi[-1] <= 30
-
-    def sell(self, symbol: str) -> bool:
-        _rsi: np.array = rsi(self.data[symbol]["close"])
-        return _rsi[-1] >= 70
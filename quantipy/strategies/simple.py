@@ -1,13 +1,32 @@
 from collections import defaultdict
 from datetime import datetime
-from typing import Union
+from typing import Dict, Optional, Set, Tuple, Union
 
+import numpy as np
 from blankly import ScreenerState, StrategyState
+from blankly.exchanges.interfaces.paper_trade.backtest_result import (
+    BacktestResult,
+)
 
+from quantipy.buffer import RingBuffer
+from quantipy.cache import HistoryCache, IndicatorCache
+from quantipy.feeds import ReferenceFeed
+from quantipy.history import HistoryStore
 from quantipy.position import Position
+from quantipy.ratelimit import RequestScheduler
+from quantipy.resample import Resampler
+from quantipy.signals import (
+    Evaluation,
+    Node,
+    Program,
+    SignalStats,
+    compile_rules,
+)
+from quantipy.storage import fits_float32
 from quantipy.strategies.base import StrategyBase, event
 from quantipy.strategies.split_protector import SplitProtector
 from quantipy.trade import TradeManager
+from quantipy.types import HistoricalData
 
 
 class SimpleStrategy(StrategyBase):
@@ -30,6 +49,12 @@ class SimpleStrategy(StrategyBase):
       - An audit log to profile the accuracy of your strategy
       - Protecting against stock splits (when backtesting)
       - Avoiding blacklisted symbols (niche)
+      - Keeping the history of many symbols within a memory budget
+      (see `HISTORY_BUDGET`)
+      - Reading symbols it doesn't trade (e.g a benchmark) without
+      ticking them, see `add_reference`
+      - Reading higher timeframes (see `TIMEFRAMES`) resampled from
+      the price event resolution
 
     Things it cannot do:
       - Short selling
@@ -37,21 +62,168 @@ class SimpleStrategy(StrategyBase):
 
     protector: SplitProtector = SplitProtector("splits.json")
 
+    # Number of bars of history kept per symbol
+    HISTORY: int = 800
+
+    # Memory (in bytes) the symbol histories may take before the least
+    # recently ticked ones are spilled to disk (see `HistoryStore`),
+    # `None` keeps every symbol in memory
+    HISTORY_BUDGET: Optional[int] = None
+
+    # dtype the history columns are kept in (unboxed, in `RingBuffer`s).
+    # "float32" halves them again but only applies to columns that
+    # `fits_float32` at `PRICE_DECIMALS` (inferred when `None`), others
+    # (e.g time) stay float64. Ticked prices aren't checked again
+    HISTORY_DTYPE: str = "float64"
+    PRICE_DECIMALS: Optional[int] = None
+
+    # Seconds a symbol stays in memory after a buy or sell signal
+    SIGNAL_TTL: float = 3600
+
+    # Higher timeframes (e.g "30m", "1d") built from the price event
+    # resolution, read them with `self.frames.close(symbol, "1d")`
+    TIMEFRAMES: Tuple[str, ...] = ()
+
+    # Set to share history fetches with other strategies in the same
+    # process (see `quantipy.scheduler`)
+    history_cache: Optional[HistoryCache] = None
+
+    # Declarative buy/sell rules (see `quantipy.signals`), either nodes
+    # or strings like "rsi(14) <= OVERSOLD". Strategies without rules
+    # override `buy` and `sell` instead
+    BUY: Optional[Union[Node, str]] = None
+    SELL: Optional[Union[Node, str]] = None
+
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self.manager = TradeManager()
+        self.frames = Resampler(self.TIMEFRAMES, size=self.HISTORY)
         self._audit_log = defaultdict(list)
+        # Symbols loaded from a checkpoint, see `quantipy.checkpoint`
+        self.restored: Set[str] = set()
+        # The checkpoint's time per restored symbol, see `append_close`
+        self.resumed: Dict[str, float] = {}
+        self.references = ReferenceFeed(size=self.HISTORY)
+        self.signalled: Dict[str, float] = {}
+        # Cost and hit rate of every rule condition, see `evaluate`
+        self.signal_stats = SignalStats()
+        self.data = HistoryStore(self.HISTORY_BUDGET, keep=self.hot)
 
-    def init(self, symbol: str, state: StrategyState) -> None:
-        self.data[symbol] = state.interface.history(
-            symbol, to=800, resolution=state.resolution, return_as="deque"
+    def throttle(self, requests: RequestScheduler) -> None:
+        """
+        Route every exchange call (history fetches in `fetch_history`,
+        account reads and orders in the `TradeManager`) through
+        `requests`
+        """
+        self.interface = requests.wrap(self.interface)
+
+    def hot(self, symbol: str) -> bool:
+        """Whether `symbol` has an open position or a recent signal"""
+        position: Optional[Position] = self.manager.state.get(
+            symbol.partition("-")[0]
+        )
+        if position is not None and position.open:
+            return True
+        signalled = self.signalled.get(symbol)
+        return signalled is not None and (
+            self.time() - signalled < self.SIGNAL_TTL
+        )
+
+    def run_callbacks(self, _type: str, *args, **kwargs) -> None:
+        if _type in ("buy", "sell") and len(args) > 1:
+            self.signalled[args[1]] = self.time()
+            self.debug("%s signal for %s at %s", _type, args[1], args[0])
+        super().run_callbacks(_type, *args, **kwargs)
+
+    def add_reference(self, symbol: str, resolution: str) -> None:
+        """
+        Track `symbol` without trading it, its bars never go through
+        `tick` but can be read with `reference`
+        """
+        self.references.add(symbol, resolution)
+
+    def backtest(
+        self,
+        to: Optional[str] = None,
+        initial_values: Optional[dict] = None,
+        start_date: Optional[Union[str, float, int]] = None,
+        end_date: Optional[Union[str, float, int]] = None,
+        settings_path: Optional[str] = None,
+        **kwargs,
+    ) -> BacktestResult:
+        # References need the backtest's prices, but no price event
+        for symbol, resolution in self.references.resolutions.items():
+            self.add_prices(symbol, resolution, to, start_date, end_date)
+        return super().backtest(
+            to, initial_values, start_date, end_date, settings_path, **kwargs
         )
 
+    def reference(self, symbol: str, column: str = "close") -> np.ndarray:
+        """A reference symbol's bars up to now, as a read-only array"""
+        return self.references.get(
+            symbol, column, now=self.time(), interface=self.interface
+        )
+
+    def fetch_history(
+        self, symbol: str, state: Union[StrategyState, ScreenerState]
+    ) -> HistoricalData:
+        if self.history_cache is not None:
+            return self.history_cache.history(
+                state.interface, symbol, self.HISTORY, state.resolution
+            )
+        return state.interface.history(
+            symbol,
+            to=self.HISTORY,
+            resolution=state.resolution,
+            return_as="deque",
+        )
+
+    def init(self, symbol: str, state: StrategyState) -> None:
+        # Carry on from the checkpointed history instead of refetching
+        if symbol in self.restored:
+            self.restored.discard(symbol)
+            return
+        self.data[symbol] = self.pack(self.fetch_history(symbol, state))
+        if self.TIMEFRAMES:
+            self.frames.seed(symbol, self.data[symbol])
+
+    def pack(self, history: HistoricalData) -> HistoricalData:
+        """
+        A fetched history as `RingBuffer`s of `HISTORY_DTYPE`, about a
+        quarter of the memory of deques of boxed floats (an eighth as
+        float32) with the same values and `maxlen`
+        """
+        packed = {}
+        for column, values in history.items():
+            maxlen = getattr(values, "maxlen", None) or self.HISTORY
+            dtype = np.dtype(self.HISTORY_DTYPE)
+            if dtype == np.float32 and not fits_float32(
+                values, self.PRICE_DECIMALS
+            ):
+                dtype = np.dtype(np.float64)
+            packed[column] = RingBuffer(maxlen, values, dtype)
+        return packed
+
     @event("tick")
     def append_close(
         self, price: float, symbol: str, state: StrategyState
     ) -> None:
-        self.data[symbol]["close"].append(price)
+        close = self.data[symbol]["close"]
+        resumed = self.resumed.pop(symbol, None) if self.resumed else None
+        if resumed is not None and self.time() <= resumed:
+            # A resumed backtest starts on the checkpointed run's last
+            # bar, which blankly ticked with the bar before's close. Its
+            # real close replaces it instead of being appended twice
+            close[-1] = price
+        else:
+            close.append(price)
+
+    @event("tick")
+    def resample(
+        self, price: float, symbol: str, state: StrategyState
+    ) -> None:
+        if self.TIMEFRAMES:
+            self.frames.update(symbol, self.time(), price)
 
     def safe(self, symbol: str) -> bool:
         if symbol in self.blacklist:
@@ -60,41 +232,113 @@ class SimpleStrategy(StrategyBase):
         # Avoid splits when backtesting
         return self.protector.safe(symbol, self.time())
 
+    def holding(self, symbol: str, state: StrategyState) -> bool:
+        """Whether there's an open position on `symbol`"""
+        for key in (symbol, getattr(state, "base_asset", symbol)):
+            position = self.manager.state.get(key)
+            if position is not None and position.open:
+                return True
+        return False
+
     def tick(self, price: float, symbol: str, state: StrategyState) -> None:
-        args: tuple = (price, symbol, state)
+        # Blacklisted symbols are dropped before any callback runs, unless
+        # they still hold a position to close
+        if symbol in self.blacklist and not self.holding(symbol, state):
+            return
+
+        resolution = getattr(state, "resolution", None)
+        with self.watchdog.watch(symbol, resolution):
+            args: tuple = (price, symbol, state)
+
+            self.run_callbacks("tick", *args)
+
+            position: Union[Position, None] = self.manager.state.get(
+                state.base_asset
+            )
+
+            if not self.safe(symbol):
+                if position is not None and position.open:
+                    self.manager.close(position, state)
+                return
 
-        self.run_callbacks("tick", *args)
+            if (position is not None and position.open) and self.sell(symbol):
+                self.run_callbacks("sell", *args)
+            elif (position is None or not position.open) and self.buy(symbol):
+                self.run_callbacks("buy", *args)
 
-        position: Union[Position, None] = self.manager.state.get(
-            state.base_asset
+    @classmethod
+    def program(cls) -> Program:
+        return compile_rules(cls.BUY, cls.SELL)
+
+    def evaluate(self, symbol: str) -> Evaluation:
+        """
+        Lazily evaluates rules over the symbol's history, cheapest and
+        most selective conditions first
+        """
+        return Evaluation.of(
+            self.data[symbol]["close"], env=self, stats=self.signal_stats
         )
 
-        if not self.safe(symbol):
-            if position is not None and position.open:
-                self.manager.close(position, state)
-            return
+    def _rule(self, symbol: Optional[str], index: int) -> bool:
+        rule = self.program().outputs[index]
+        if rule is None or symbol is None:
+            return False
+        return self.evaluate(symbol).last(rule)
+
+    def buy(self, symbol: Optional[str] = None) -> bool:
+        return self._rule(symbol, 0)
+
+    def sell(self, symbol: Optional[str] = None) -> bool:
+        return self._rule(symbol, 1)
 
-        if (position is not None and position.open) and self.sell(symbol):
-            self.run_callbacks("sell", *args)
-        elif (position is None or not position.open) and self.buy(symbol):
-            self.run_callbacks("buy", *args)
+    @classmethod
+    def indicators(
+        cls,
+        close: np.ndarray,
+        cache: Optional[IndicatorCache] = None,
+        key: tuple = (),
+    ) -> Dict[str, np.ndarray]:
+        """
+        Every indicator the rules need, computed over a whole close
+        series at once (see `quantipy.walkforward`), or read from
+        `cache` under `key`
+        """
+        return cls.program().precompute(close, cache, key)
+
+    @classmethod
+    def signals(
+        cls, indicators: Dict[str, np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized `buy` and `sell`: boolean arrays marking every bar
+        the signal fires on
+        """
+        buy, sell = cls.program().run(indicators, env=cls)
+        return buy, sell
 
     def screener(self, symbol: str, state: ScreenerState) -> dict:
-        self.data[symbol] = state.interface.history(
-            symbol, 800, resolution=state.resolution, return_as="deque"
-        )
+        self.data[symbol] = self.fetch_history(symbol, state)
         return {"buy": self.buy(symbol)}
 
     def audit(self, symbol: str, event: str, message: str, **kwargs) -> None:
+        # Stamped now, formatted and stored off the tick's time when it's
+        # running late (see `TICK_BUDGET`)
+        self.watchdog.run(
+            self._audit, symbol, int(self.time()), event, message, kwargs
+        )
+
+    def _audit(
+        self, symbol: str, time: int, event: str, message: str, data: dict
+    ) -> None:
         obj = {
-            "time": int(self.time()),
-            "date_string": datetime.fromtimestamp(int(self.time())).strftime(
+            "time": time,
+            "date_string": datetime.fromtimestamp(time).strftime(
                 "%Y-%m-%d %H:%M:%S"
             ),
             "event": event,
             "message": message,
         }
 
-        obj.update(**kwargs)
+        obj.update(**data)
 
         self._audit_log[symbol].append(obj)
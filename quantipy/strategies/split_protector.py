@@ -1,15 +1,44 @@
 import json
 from pathlib import Path
-from typing import Union
+from typing import Collection, Mapping, Optional, Union
 
 
 class SplitProtector:
-    def __init__(self, path: Union[Path, str]) -> None:
+    """
+    Keeps strategies out of the market around stock splits listed in
+    `splits.json`.
+
+    Splits with a `ratio` can be back-adjusted out of the price cache
+    instead (see `quantipy.splits`). The windows of splits in
+    `adjusted` (split times by symbol, see `splits.adjusted`) are
+    skipped, every other split still blacks out trading.
+    """
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        adjusted: Optional[Mapping[str, Collection[float]]] = None,
+    ) -> None:
         self.path: Path = Path(path)
         self.data: dict = {}
 
         with open(self.path) as fp:
-            self.data = json.load(fp)
+            data = json.load(fp)
+
+        for symbol, windows in data.items():
+            done = (adjusted or {}).get(symbol, ())
+            windows = [
+                split
+                for split in windows
+                if not (split.get("ratio") and self.time(split) in done)
+            ]
+            if windows:
+                self.data[symbol] = windows
+
+    @staticmethod
+    def time(split: dict) -> float:
+        # Older entries only have a window centered on the split
+        return float(split.get("time", (split["start"] + split["end"]) // 2))
 
     def safe(self, symbol: str, timestamp: Union[int, float]) -> bool:
         if symbol not in self.data:
@@ -0,0 +1,318 @@
+import logging
+import threading
+import time
+from multiprocessing import get_context
+from multiprocessing.managers import BaseManager
+from typing import Dict, List, Optional, Sequence, Union
+
+from blankly.utils import trunc
+
+from quantipy.position import Position
+from quantipy.trade import PositionStateManager, TradeManager
+
+
+def shard(symbols: Sequence[str], workers: int) -> List[List[str]]:
+    """Deal `symbols` round robin into (at most) `workers` shards"""
+    workers = max(1, min(workers, len(symbols)))
+    return [list(symbols[i::workers]) for i in range(workers)]
+
+
+class Coordinator:
+    """
+    The cash/risk budget and open positions shared by every worker.
+
+    Workers `reserve` quote for a new position before ordering and the
+    reservation is released once the position closes, so N workers can
+    never commit more than `budget` between them. A single symbol gets
+    at most `max_allocation` of the budget.
+
+    It lives in the supervisor's manager process, workers talk to it
+    through a proxy. Calls only happen around orders, never per tick.
+    """
+
+    def __init__(self, budget: float, max_allocation: float = 1.0) -> None:
+        self._budget = budget
+        self.max_allocation = max_allocation
+        self._allocated: Dict[str, float] = {}
+        self._positions: Dict[str, Position] = {}
+        self._lock = threading.Lock()
+
+    def budget(self) -> float:
+        return self._budget
+
+    def available(self) -> float:
+        with self._lock:
+            return self._budget - sum(self._allocated.values())
+
+    def reserve(self, symbol: str, amount: float) -> float:
+        """
+        Reserve up to `amount` for `symbol`, replacing whatever it had
+        reserved. Returns the amount granted.
+        """
+        with self._lock:
+            self._allocated.pop(symbol, None)
+            free = self._budget - sum(self._allocated.values())
+            cap = self._budget * self.max_allocation
+            granted = max(0.0, min(amount, free, cap))
+            if granted:
+                self._allocated[symbol] = granted
+            return granted
+
+    def release(self, symbol: str) -> float:
+        with self._lock:
+            return self._allocated.pop(symbol, 0.0)
+
+    def allocations(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._allocated)
+
+    def update(self, symbol: str, position: Optional[Position]) -> None:
+        with self._lock:
+            if position is None or not position.open:
+                self._positions.pop(symbol, None)
+                self._allocated.pop(symbol, None)
+            else:
+                self._positions[symbol] = position
+
+    def positions(self) -> Dict[str, Position]:
+        with self._lock:
+            return dict(self._positions)
+
+
+class SupervisorManager(BaseManager):
+    pass
+
+
+SupervisorManager.register("Coordinator", Coordinator)
+
+
+class SharedPositionStateManager(PositionStateManager):
+    """Mirrors every position change to the coordinator"""
+
+    def __init__(self, coordinator: Coordinator) -> None:
+        super().__init__()
+        self.coordinator = coordinator
+
+    def new(self, symbol: str, **kwargs) -> Position:
+        position = super().new(symbol, **kwargs)
+        self.coordinator.update(symbol, position)
+        return position
+
+    def set(self, symbol: str, **kwargs) -> Position:
+        position = super().set(symbol, **kwargs)
+        # Trailing stop updates stay local, only opens/closes are shared
+        if "open" in kwargs or "state" in kwargs:
+            self.coordinator.update(symbol, position)
+        return position
+
+
+class CoordinatedTradeManager(TradeManager):
+    """
+    A `TradeManager` sizing positions off the coordinator's shared
+    budget instead of the exchange balance alone. The risk math is the
+    same (see `TradeManager.quantity`), but the cash spent is reserved
+    from the budget and capped by what the account actually holds.
+    """
+
+    def __init__(self, coordinator: Coordinator, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.coordinator = coordinator
+        self.state = SharedPositionStateManager(coordinator)
+
+    def quantity(
+        self,
+        price: float,
+        state: object,
+        percent: float = 0.03,
+        precision: int = 4,
+    ) -> float:
+        budget: float = self.coordinator.budget()
+        cash: float = (budget * percent) / self.default_stop_loss_pct
+        cash = min(cash, state.interface.cash)
+        granted: float = self.coordinator.reserve(state.base_asset, cash)
+        if granted < 1:
+            self.coordinator.release(state.base_asset)
+            return 0
+        return trunc(granted / price, precision)
+
+    def _order(
+        self, symbol: str, side: str, size: float, state: object
+    ) -> object:
+        order = super()._order(symbol, side, size, state)
+        if order is None:
+            # Hand back the reservation of an entry that never filled
+            position = self.state.get(state.base_asset)
+            if position is None or not position.open:
+                self.coordinator.release(state.base_asset)
+        return order
+
+
+def work(
+    strategy: Union[str, type],
+    exchange: str,
+    symbols: List[str],
+    coordinator: Coordinator,
+    resolution: str = "30m",
+    live: bool = False,
+    portfolio: Optional[str] = None,
+    stream: bool = False,
+    log_level: str = "INFO",
+    rate_limit: bool = True,
+    share: float = 1.0,
+) -> None:
+    """
+    Run one shard of symbols on its own strategy instance, pacing its
+    requests with a `share` of the exchange's rate limit
+    """
+    from quantipy.exchanges import EXCHANGES, initial_values
+    from quantipy.logger import setupLogger
+    from quantipy.strategies import STRATEGIES
+
+    setupLogger()
+    for name in [None, *logging.root.manager.loggerDict]:
+        logging.getLogger(name).setLevel(log_level)
+
+    connection = EXCHANGES[exchange](portfolio_name=portfolio)
+    account = connection
+    if not live:
+        from blankly import PaperTrade
+
+        account = PaperTrade(
+            connection, initial_account_values=initial_values(exchange)
+        )
+
+    if isinstance(strategy, str):
+        strategy = STRATEGIES[strategy]
+    instance = strategy(account)
+    instance.manager = CoordinatedTradeManager(
+        coordinator,
+        default_stop_loss_pct=instance.manager.default_stop_loss_pct,
+        default_risk_ratio=instance.manager.default_risk_ratio,
+    )
+    if rate_limit:
+        from quantipy.ratelimit import RequestScheduler
+
+        instance.throttle(RequestScheduler(share=share))
+
+    # Carry on with whatever a previous worker on this shard left open
+    bases = {symbol.partition("-")[0] for symbol in symbols}
+    for base, position in coordinator.positions().items():
+        if base in bases:
+            instance.manager.state.positions[base] = position
+
+    if stream:
+        from quantipy.ingest import Ingestor, TickerSource
+
+        ingestor = Ingestor(instance, symbols, resolution)
+        TickerSource(connection.get_type(), symbols).start(ingestor.queue)
+        ingestor.run()
+        return
+
+    for symbol in symbols:
+        instance.add_price_event(
+            instance.tick,
+            symbol=symbol,
+            resolution=resolution,
+            init=instance.init,
+        )
+    instance.start()
+    threading.Event().wait()
+
+
+class Supervisor:
+    """
+    Runs a live (or paper) strategy over many symbols by sharding them
+    across `workers` processes, each with its own strategy instance,
+    so a slow symbol only delays the symbols in its own shard.
+
+    A `Coordinator` in a manager process holds the shared `budget` and
+    open positions, workers size and record their positions through
+    it. Workers that die are restarted on the same shard.
+    """
+
+    logger = logging.getLogger("Supervisor")
+
+    def __init__(
+        self,
+        strategy: Union[str, type],
+        exchange: str,
+        symbols: Sequence[str],
+        budget: float,
+        workers: int = 2,
+        max_allocation: float = 1.0,
+        restart: float = 5,
+        **options,
+    ) -> None:
+        self.strategy = strategy
+        self.exchange = exchange
+        self.shards = shard(list(symbols), workers)
+        self.budget = budget
+        self.max_allocation = max_allocation
+        self.restart = restart
+        self.options = options
+        self.context = get_context("spawn")
+        self.manager: Optional[SupervisorManager] = None
+        self.coordinator: Optional[Coordinator] = None
+        self.processes: List = []
+        self._stop = threading.Event()
+
+    def spawn(self, index: int) -> object:
+        process = self.context.Process(
+            target=work,
+            args=(
+                self.strategy,
+                self.exchange,
+                self.shards[index],
+                self.coordinator,
+            ),
+            kwargs={"share": 1 / len(self.shards), **self.options},
+            name="worker-%d" % index,
+            daemon=True,
+        )
+        process.start()
+        self.logger.info(
+            "Worker %d (pid %d) tracking %s",
+            index,
+            process.pid,
+            ", ".join(self.shards[index]),
+        )
+        return process
+
+    def start(self) -> None:
+        self.manager = SupervisorManager(ctx=self.context)
+        self.manager.start()
+        self.coordinator = self.manager.Coordinator(
+            self.budget, self.max_allocation
+        )
+        self.processes = [self.spawn(i) for i in range(len(self.shards))]
+
+    def watch(self) -> None:
+        """Restart dead workers until `stop`"""
+        while not self._stop.wait(self.restart):
+            for i, process in enumerate(self.processes):
+                if not process.is_alive():
+                    self.logger.error(
+                        "Worker %d exited (%s), restarting",
+                        i,
+                        process.exitcode,
+                    )
+                    self.processes[i] = self.spawn(i)
+
+    def run(self) -> None:
+        self.start()
+        try:
+            self.watch()
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        self._stop.set()
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.time() + 5
+        for process in self.processes:
+            process.join(max(0, deadline - time.time()))
+        if self.manager is not None:
+            self.manager.shutdown()
+            self.manager = None
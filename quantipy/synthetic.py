@@ -0,0 +1,185 @@
+import zlib
+from collections import namedtuple
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from pandas import DataFrame
+
+from quantipy.resample import Timeframe, seconds
+from quantipy.splits import Split, factors
+
+# Annualized drift and volatility of a market regime
+Regime = namedtuple("Regime", field_names=["drift", "volatility"])
+
+REGIMES: Tuple[Regime, ...] = (
+    Regime(0.10, 0.25),  # Calm uptrend
+    Regime(-0.20, 0.60),  # Volatile selloff
+    Regime(0.0, 0.15),  # Quiet range
+)
+
+# New shares per old share a generated split picks from
+SPLIT_RATIOS = (2.0, 3.0, 4.0, 0.1)
+
+YEAR = 365 * 86400
+
+OHLCV = ("time", "open", "high", "low", "close", "volume")
+
+
+def rng_for(seed: Optional[int], symbol: str) -> np.random.Generator:
+    """
+    The random generator of `symbol`, seeded from both so a symbol's
+    bars don't change when other symbols are added or dropped
+    """
+    if seed is None:
+        return np.random.default_rng()
+    return np.random.default_rng([seed, zlib.crc32(symbol.encode())])
+
+
+def regimes_of(
+    rng: np.random.Generator, bars: int, count: int, switch: float
+) -> np.ndarray:
+    """
+    Regime index of every bar: a Markov chain that leaves its regime
+    with probability `switch` per bar, for a random other one
+    """
+    if count < 2:
+        return np.zeros(bars, dtype=np.intp)
+    steps = np.where(
+        rng.random(bars) < switch, rng.integers(1, count, size=bars), 0
+    )
+    steps[0] = rng.integers(0, count)
+    return np.cumsum(steps) % count
+
+
+def generate(
+    bars: int,
+    resolution: Timeframe = 60,
+    start: float = 1_700_000_000,
+    price: float = 100.0,
+    seed: Optional[int] = None,
+    symbol: str = "SYN-USD",
+    regimes: Sequence[Regime] = REGIMES,
+    switch: float = 1e-4,
+    splits: float = 0.0,
+    gaps: float = 0.0,
+    gap_length: int = 60,
+    volume: float = 1000.0,
+) -> Tuple[Dict[str, np.ndarray], List[Split]]:
+    """
+    `bars` OHLCV bars of a geometric Brownian motion whose drift and
+    volatility follow `regimes` (see `regimes_of`), as blankly style
+    columns, and the splits in them.
+
+    - splits ~> expected splits per year, the prices (and volumes) are
+      as quoted at the time, i.e not adjusted for them
+    - gaps ~> expected gaps (halts, outages) per year, each drops a
+      geometric number of bars (`gap_length` on average) and the price
+      jumps by however much it moved meanwhile
+
+    Everything is drawn in a few vectorized passes over the whole
+    series, and the same `seed` and `symbol` always give the same bars.
+    """
+    rng = rng_for(seed, symbol)
+    step = int(seconds(resolution))
+    dt = step / YEAR
+    start = start - start % step
+    time = start + step * np.arange(bars, dtype=np.int64)
+
+    drift = np.array([regime.drift for regime in regimes], dtype=float)
+    volatility = np.array([r.volatility for r in regimes], dtype=float)
+    regime = regimes_of(rng, bars, len(regimes), switch)
+    sigma = volatility[regime] * np.sqrt(dt)
+    returns = (drift[regime] - volatility[regime] ** 2 / 2) * dt
+    returns += sigma * rng.standard_normal(bars)
+    close = price * np.exp(np.cumsum(returns))
+    open_ = np.empty(bars)
+    open_[0] = price
+    open_[1:] = close[:-1]
+
+    # The extremes reach about half a standard deviation past the open
+    # and close
+    spread = np.abs(rng.standard_normal((2, bars))) * sigma / 2
+    high = np.maximum(open_, close) * np.exp(spread[0])
+    low = np.minimum(open_, close) * np.exp(-spread[1])
+    # Heavier trading on the bigger moves
+    activity = 1 + np.abs(returns) / np.maximum(sigma, 1e-12)
+    shares = volume * activity * rng.lognormal(0, 0.5, bars)
+
+    events: List[Split] = []
+    years = bars * dt
+    count = rng.poisson(splits * years) if splits else 0
+    if count:
+        at = np.sort(rng.choice(np.arange(1, bars), count, replace=False))
+        ratios = rng.choice(SPLIT_RATIOS, count)
+        events = [Split(float(time[i]), float(r)) for i, r in zip(at, ratios)]
+        # Before a split, prices are quoted in old shares
+        factor = factors(time, events)
+        prices = (open_, high, low, close)
+        open_, high, low, close = (p * factor for p in prices)
+        shares = shares / factor
+
+    keep = np.ones(bars, dtype=bool)
+    count = rng.poisson(gaps * years) if gaps else 0
+    if count:
+        at = rng.integers(1, bars, count)
+        lengths = rng.geometric(1 / max(gap_length, 1), count)
+        # +1 at the start of every gap, -1 past its end
+        edges = np.zeros(bars + 1, dtype=np.int64)
+        np.add.at(edges, at, 1)
+        np.add.at(edges, np.minimum(at + lengths, bars), -1)
+        keep = np.cumsum(edges[:-1]) == 0
+
+    columns = {
+        "time": time,
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": shares,
+    }
+    return {name: values[keep] for name, values in columns.items()}, events
+
+
+def cache_name(
+    exchange: str, symbol: str, time: np.ndarray, resolution: Timeframe
+) -> str:
+    """
+    The price cache file name blankly looks for, which covers the bars
+    from the first up to (excluding) `stop`
+    """
+    step = int(seconds(resolution))
+    start, stop = int(time[0]), int(time[-1]) + step
+    return f"{exchange},True,{symbol},{start},{stop},{step}.csv"
+
+
+def write(
+    directory: Union[Path, str],
+    exchange: str,
+    symbol: str,
+    columns: Dict[str, np.ndarray],
+    resolution: Timeframe = 60,
+) -> Path:
+    """Write `columns` into the price cache in `directory`"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / cache_name(
+        exchange, symbol, columns["time"], resolution
+    )
+    DataFrame({name: columns[name] for name in OHLCV}).to_csv(
+        path, index=False
+    )
+    return path
+
+
+def generate_cache(
+    directory: Union[Path, str],
+    exchange: str,
+    symbol: str,
+    bars: int,
+    resolution: Timeframe = 60,
+    **kwargs,
+) -> Tuple[Path, List[Split]]:
+    """`generate` bars of `symbol` and `write` them to the price cache"""
+    columns, events = generate(bars, resolution, symbol=symbol, **kwargs)
+    return write(directory, exchange, symbol, columns, resolution), events
@@ -142,7 +142,8 @@ class TradeManager:
                 event="trade", message="Opened long", **newpos._asdict()
             )
             self.logger.info(newpos)
-        return newpos
+            return newpos
+        return Position()
 
     def short(
         self,
@@ -0,0 +1,324 @@
+import logging
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import product
+from multiprocessing import get_context
+from typing import Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from pandas import DataFrame, concat
+
+from quantipy.analysis import ROUND_TRIP_COLUMNS, round_trips, summarize
+from quantipy.arena import ArenaHandle, PriceArena
+from quantipy.cache import IndicatorCache
+from quantipy.strategies.advanced import AdvancedStrategy
+
+logger = logging.getLogger("WalkForward")
+
+Fold = namedtuple("Fold", field_names=["index", "train", "test"])
+
+Report = namedtuple("Report", field_names=["folds", "trips", "summary"])
+
+Grid = Mapping[str, Sequence]
+
+
+def split(
+    start: float,
+    stop: float,
+    train: float,
+    test: float,
+    step: Optional[float] = None,
+    anchored: bool = False,
+) -> List[Fold]:
+    """
+    Split the `start`-`stop` window into rolling train/test folds.
+
+    Each fold trains on `train` seconds and tests on the `test`
+    seconds right after it, then the whole thing moves forward by
+    `step` (defaults to `test`, so test windows don't overlap). An
+    `anchored` split always trains from `start` instead, growing the
+    train window every fold.
+    """
+    step = step or test
+    folds, offset = [], start
+    while offset + train + test <= stop:
+        train_start = start if anchored else offset
+        folds.append(
+            Fold(
+                len(folds),
+                (train_start, offset + train),
+                (offset + train, offset + train + test),
+            )
+        )
+        offset += step
+    return folds
+
+
+def variants(strategy: type, grid: Optional[Grid] = None) -> List[type]:
+    """
+    Every combination of the class constants in `grid` as a subclass
+    of `strategy`, e.g `{"STRIDE": [3, 5], "RISK_RATIO": [2, 4]}`
+    gives four subclasses. An empty grid gives just `strategy`.
+    """
+    if not grid:
+        return [strategy]
+    names = list(grid)
+    return [
+        type(strategy.__name__, (strategy,), dict(zip(names, values)))
+        for values in product(*(grid[name] for name in names))
+    ]
+
+
+def params(strategy: type, grid: Optional[Grid] = None) -> dict:
+    return {name: getattr(strategy, name) for name in grid or {}}
+
+
+def simulate(  # noqa: C901
+    strategy: type,
+    time: np.ndarray,
+    close: np.ndarray,
+    buy: np.ndarray,
+    sell: np.ndarray,
+    symbol: str = "",
+) -> List[dict]:
+    """
+    Replay `buy`/`sell` signals over `close` the same way the
+    strategy's `tick` would and return the orders it places.
+
+    `AdvancedStrategy` subclasses also short, and run their stop loss
+    (trailing) and take profit checks before the signals every bar.
+    Every position is one unit of notional, so round trip PnL is the
+    trade's return.
+    """
+    advanced = issubclass(strategy, AdvancedStrategy)
+    stop_pct = getattr(strategy, "STOP_LOSS_PCT", 0.05)
+    profit_pct = stop_pct * getattr(strategy, "RISK_RATIO", 2)
+
+    orders: List[dict] = []
+    side, size, stop, target = 0, 0.0, 0.0, 0.0
+
+    def order(i: int, direction: int, amount: float) -> None:
+        orders.append(
+            {
+                "symbol": symbol,
+                "side": "buy" if direction > 0 else "sell",
+                "time": time[i],
+                "price": close[i],
+                "size": amount,
+            }
+        )
+
+    # Flat stretches are skipped straight to the next signal
+    entries = np.flatnonzero(buy | sell if advanced else buy)
+    prices, buy, sell = close.tolist(), buy.tolist(), sell.tolist()
+    i, n = 0, len(prices)
+    while i < n:
+        if not side:
+            nxt = np.searchsorted(entries, i)
+            if nxt == len(entries):
+                break
+            i = int(entries[nxt])
+
+        price = prices[i]
+        if side and advanced:
+            # Take profit or stop loss hit, otherwise trail the stop
+            if side * (price - target) >= 0 or side * (price - stop) <= 0:
+                order(i, -side, size)
+                side = 0
+            else:
+                stop = price * (1 - side * stop_pct)
+
+        if not side:
+            if buy[i]:
+                side = 1
+            elif advanced and sell[i]:
+                side = -1
+            if side:
+                size = 1 / price
+                stop = price * (1 - side * stop_pct)
+                target = price * (1 + side * profit_pct)
+                order(i, side, size)
+        elif (side > 0 and sell[i]) or (side < 0 and buy[i]):
+            order(i, -side, size)
+            side = 0
+        i += 1
+    return orders
+
+
+def evaluate(
+    strategy: type,
+    series: Mapping[str, Tuple[np.ndarray, np.ndarray, dict]],
+    window: Tuple[float, float],
+) -> DataFrame:
+    """
+    Round trips of `strategy` over `window` given precomputed
+    `(time, close, indicators)` per symbol. Only orders inside the
+    window are kept, so positions still open at its end are dropped.
+    """
+    orders = []
+    for symbol, (time, close, indicators) in series.items():
+        lo, hi = np.searchsorted(time, window, side="left")
+        buy, sell = strategy.signals(indicators)
+        orders += simulate(
+            strategy,
+            time[lo:hi],
+            close[lo:hi],
+            buy[lo:hi],
+            sell[lo:hi],
+            symbol=symbol,
+        )
+    return round_trips(orders)
+
+
+def run_fold(
+    strategy: type,
+    handle: Union[ArenaHandle, PriceArena],
+    fold: Fold,
+    grid: Optional[Grid] = None,
+    objective: str = "net",
+    cache: Optional[IndicatorCache] = None,
+) -> dict:
+    """
+    Optimize `strategy` on the train window of `fold` and evaluate the
+    winner on its test window.
+
+    Indicators are computed once per symbol over the whole fold (so
+    the test window is warmed up by the train data) and reused by
+    every combination in `grid` (and kept in `cache` for the next
+    run). Workers get the arena's `handle`, in process runs can pass
+    the arena itself.
+    """
+    if isinstance(handle, PriceArena):
+        arena = handle
+    else:
+        arena = PriceArena.attach(handle)
+    try:
+        series = {}
+        for symbol in arena.symbols:
+            time = arena.column(symbol, "time")
+            lo, hi = np.searchsorted(time, (fold.train[0], fold.test[1]))
+            if hi - lo:
+                close = np.array(arena.column(symbol, "close")[lo:hi])
+                time = np.array(time[lo:hi])
+                # The bar spacing stands in for the resolution
+                step = time[1] - time[0] if len(time) > 1 else 0.0
+                key = (symbol, float(step), float(time[0]))
+                series[symbol] = (
+                    time,
+                    close,
+                    strategy.indicators(close, cache, key),
+                )
+    finally:
+        if arena is not handle:
+            arena.close()
+
+    best, best_score = strategy, -np.inf
+    for variant in variants(strategy, grid):
+        score = summarize(evaluate(variant, series, fold.train))[objective]
+        # No trades can score NaN, which never wins
+        if np.nan_to_num(score, nan=-np.inf) > best_score:
+            best, best_score = variant, score
+
+    trips = evaluate(best, series, fold.test)
+    logger.info(
+        "Fold %d: %s scored %s in sample, %d trades out of sample",
+        fold.index,
+        params(best, grid),
+        best_score,
+        len(trips),
+    )
+    return {
+        "fold": fold.index,
+        "params": params(best, grid),
+        "train_score": best_score,
+        "trips": trips,
+    }
+
+
+def walk_forward(
+    strategy: type,
+    data: Mapping[str, Mapping[str, Sequence]],
+    train: float,
+    test: float,
+    step: Optional[float] = None,
+    grid: Optional[Grid] = None,
+    objective: str = "net",
+    anchored: bool = False,
+    workers: Optional[int] = None,
+    cache: Optional[IndicatorCache] = None,
+) -> Report:
+    """
+    Walk-forward test `strategy` over `data` (symbol -> blankly style
+    dict of columns, or a DataFrame).
+
+    The history is cut into folds (see `split`, windows are in
+    seconds), every fold picks the constants in `grid` that maximize
+    `objective` (any `quantipy.analysis.summarize` key) on its train
+    window and is scored on its test window only. Folds run in
+    parallel on a process pool sharing the price history through a
+    `PriceArena`. Pass an `IndicatorCache` to reuse indicators across
+    runs.
+
+    The report holds one row per fold, the out-of-sample round trips
+    of every fold and their aggregated summary.
+    """
+    times = [
+        np.asarray(columns["time"], dtype=float) for columns in data.values()
+    ]
+    times = [time for time in times if len(time)]
+    start = min(time[0] for time in times)
+    stop = max(time[-1] for time in times) + 1
+    folds = split(start, stop, train, test, step, anchored)
+    if not folds:
+        raise ValueError("History is too short for a single fold")
+
+    with PriceArena.create(data) as arena:
+        # `workers=0` runs in process, handy for debugging
+        shared = arena if workers == 0 else arena.handle
+        job = partial(
+            run_fold,
+            strategy,
+            shared,
+            grid=grid,
+            objective=objective,
+            cache=cache,
+        )
+        if workers == 0:
+            results = [job(fold) for fold in folds]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=get_context("spawn")
+            ) as pool:
+                results = list(pool.map(job, folds))
+
+    rows = []
+    for fold, result in zip(folds, results):
+        stats = summarize(result["trips"], *fold.test)
+        rows.append(
+            {
+                "fold": fold.index,
+                "train_start": fold.train[0],
+                "train_stop": fold.train[1],
+                "test_start": fold.test[0],
+                "test_stop": fold.test[1],
+                "params": result["params"],
+                "train_score": result["train_score"],
+                "trades": stats["trades"],
+                "win_rate": stats["win_rate"],
+                "net": stats["net"],
+                "max_drawdown": stats["max_drawdown"],
+            }
+        )
+
+    trips = _concat(result["trips"] for result in results)
+    summary = summarize(trips, folds[0].test[0], folds[-1].test[1])
+    summary["folds"] = len(folds)
+    return Report(DataFrame(rows), trips, summary)
+
+
+def _concat(frames: Iterable[DataFrame]) -> DataFrame:
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return DataFrame(columns=ROUND_TRIP_COLUMNS)
+    return concat(frames, ignore_index=True)
@@ -0,0 +1,154 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Mapping, Optional
+
+from quantipy.resample import Timeframe, seconds
+
+# Fraction of its budget a tick may use before non-critical work is
+# deferred, so what's left of the budget goes to the tick itself
+DEFER_AT = 0.5
+
+# Overruns between warnings (the first one always warns)
+REPORT_EVERY = 100
+
+
+class TickWatchdog:
+    """
+    Per-tick latency budgets (seconds, per resolution) for strategies.
+
+    Ticks run under `watch`. Once a tick has used `defer_at` of its
+    budget, non-critical work passed to `run` (audit records, debug
+    logs, deferrable callbacks) is queued for a background thread
+    instead of holding the tick up any further. Critical work, like
+    the stop loss and take profit checks, is never passed to `run`.
+
+    Ticks that end past their budget are counted as overruns (per
+    symbol, see `metrics`) and reported every `report_every` of them.
+    Resolutions without a budget aren't watched at all and run
+    everything inline, as backtests do by default.
+    """
+
+    def __init__(
+        self,
+        budgets: Optional[Mapping[Timeframe, float]] = None,
+        defer_at: float = DEFER_AT,
+        report_every: int = REPORT_EVERY,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.budgets: Dict[int, float] = {
+            seconds(resolution): budget
+            for resolution, budget in (budgets or {}).items()
+        }
+        self.defer_at = defer_at
+        self.report_every = report_every
+        self.clock = clock
+        self.logger = logging.getLogger("Watchdog")
+        self.ticks = 0
+        self.deferred = 0
+        self.slowest = 0.0
+        self.overruns: Counter = Counter()
+        # Price events tick from their own threads, each has its own
+        # tick start and budget
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    def budget(self, resolution: Optional[Timeframe]) -> Optional[float]:
+        if not self.budgets or resolution is None:
+            return None
+        return self.budgets.get(seconds(resolution))
+
+    def set_budget(self, resolution: Timeframe, budget: float) -> None:
+        self.budgets[seconds(resolution)] = budget
+
+    @contextmanager
+    def watch(
+        self, symbol: str, resolution: Optional[Timeframe]
+    ) -> Iterator[None]:
+        budget = self.budget(resolution)
+        if budget is None:
+            yield
+            return
+        local = self._local
+        local.start, local.budget = self.clock(), budget
+        try:
+            yield
+        finally:
+            local.budget = None
+            self.record(symbol, self.clock() - local.start, budget)
+
+    def late(self) -> bool:
+        """Whether the current tick has used `defer_at` of its budget"""
+        budget = getattr(self._local, "budget", None)
+        if budget is None:
+            return False
+        return self.clock() - self._local.start >= budget * self.defer_at
+
+    def run(self, fn: Callable, *args, **kwargs) -> None:
+        """Run non-critical `fn` now, or in the background when late"""
+        if self.late():
+            self.defer(fn, *args, **kwargs)
+        else:
+            fn(*args, **kwargs)
+
+    def defer(self, fn: Callable, *args, **kwargs) -> None:
+        with self._lock:
+            self.deferred += 1
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._drain, name="quantipy-deferred", daemon=True
+                )
+                self._worker.start()
+        self._queue.put((fn, args, kwargs))
+
+    def _drain(self) -> None:
+        while True:
+            fn, args, kwargs = self._queue.get()
+            try:
+                fn(*args, **kwargs)
+            except Exception:
+                self.logger.exception(
+                    "Deferred `%s` failed", getattr(fn, "__qualname__", fn)
+                )
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Wait for everything deferred so far to have run"""
+        self._queue.join()
+
+    def record(self, symbol: str, took: float, budget: float) -> None:
+        with self._lock:
+            self.ticks += 1
+            self.slowest = max(self.slowest, took)
+            if took <= budget:
+                return
+            self.overruns[symbol] += 1
+            total, ticks = sum(self.overruns.values()), self.ticks
+        if (total - 1) % self.report_every == 0:
+            # Not on the tick's time either
+            self.defer(
+                self.logger.warning,
+                "Tick of %s took %.3fs (budget %.3fs), %d overruns in %d "
+                "ticks",
+                symbol,
+                took,
+                budget,
+                total,
+                ticks,
+            )
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "ticks": self.ticks,
+                "overruns": sum(self.overruns.values()),
+                "deferred": self.deferred,
+                "slowest": self.slowest,
+                "by_symbol": dict(self.overruns),
+            }
@@ -1,46 +1,27 @@
 import json
 import logging
+import time
 import warnings
 from argparse import ArgumentParser
 from datetime import datetime
-from logging.handlers import TimedRotatingFileHandler
+from pathlib import Path
 from sys import argv
 
-from blankly import Alpaca, Binance, PaperTrade, Screener, ScreenerState
-
-from quantipy.logger import QuantiPyLogger
-from quantipy.strategies import AdvancedHarmonicOscillators, Oversold
-
-STRATEGIES = {
-    "AdvancedHarmonicOscillators": AdvancedHarmonicOscillators,
-    "Oversold": Oversold,
-}
-EXCHANGES = {"Binance": Binance, "PaperTrade": PaperTrade, "Alpaca": Alpaca}
-
-
-def setupLogger() -> None:
-    loggers = [logging.getLogger()]
-    loggers.extend(
-        logging.getLogger(name) for name in logging.root.manager.loggerDict
-    )
-    fslog = TimedRotatingFileHandler(
-        "strategy.log", when="midnight", backupCount=30
-    )
-    fslog.suffix = "%Y%m%d"
-    for logger in loggers:
-        logger.propagate = False
-        console = logging.StreamHandler()
-        formatter = QuantiPyLogger()
-        console.setFormatter(formatter)
-        console.setLevel(logging.DEBUG)
-        logger.addHandler(console)
-        fslog.setFormatter(formatter)
-        logger.addHandler(fslog)
-        logger.setLevel(logging.DEBUG)
+from quantipy.exchanges import EXCHANGES, initial_values
+from quantipy.logger import setupLogger
+from quantipy.strategies import STRATEGIES
 
 
 def main() -> None:  # noqa: C901
-    setupLogger()
+    if len(argv) > 1 and argv[1] == "-ls":
+        print("Available strategies:")
+        for st in sorted(STRATEGIES.keys()):
+            print("" * 4, st, end="")
+            print("" * 8, STRATEGIES.doc(st))
+        print("\nAvailable exchanges:")
+        for ex in sorted(EXCHANGES.keys()):
+            print("" * 4, ex)
+        exit()
 
     parser = ArgumentParser(
         description="""
@@ -60,7 +41,7 @@ def main() -> None:  # noqa: C901
 
     parser.add_argument(
         "exchange",
-        type=EXCHANGES.get,
+        choices=EXCHANGES,
         help="The name of the exchange to use",
     )
 
@@ -96,6 +77,21 @@ def main() -> None:  # noqa: C901
         "--to", type=str, default="1y", help='Timeframe to backtest: e.g "1y"'
     )
 
+    parser.add_argument(
+        "--adjust-splits",
+        action="store_true",
+        default=False,
+        help="Back-adjust the cached prices (in place) for splits with a "
+        "ratio in splits.json, so backtests trade through them",
+    )
+
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=None,
+        help="Resume the backtest from (and save it to) this checkpoint",
+    )
+
     parser.add_argument(
         "--live",
         action="store_true",
@@ -112,6 +108,66 @@ def main() -> None:  # noqa: C901
         help="One or more symbols to process",
     )
 
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=False,
+        help="Build bars from the exchange websocket instead of polling",
+    )
+
+    parser.add_argument(
+        "--tick-budget",
+        type=float,
+        default=None,
+        help="Seconds a tick may take at --resolution, late ticks defer "
+        "audit records and debug logs and overruns are reported",
+    )
+
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=None,
+        help="Bars queued for a --stream strategy (defaults to the "
+        "websocket_buffer_size in settings.json)",
+    )
+
+    parser.add_argument(
+        "--queue-policy",
+        choices=["merge", "drop", "block"],
+        default="merge",
+        help="What gives when the --stream queue is full",
+    )
+
+    parser.add_argument(
+        "--record",
+        type=Path,
+        default=None,
+        help="Append every tick, order and history fetch to this tick "
+        "log, replay it with tools/replay_log.py",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Shard the symbols across this many worker processes",
+    )
+
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        help="Cash shared by the --workers (defaults to the account cash)",
+    )
+
+    parser.add_argument(
+        "--no-rate-limit",
+        action="store_true",
+        default=False,
+        help="Don't pace exchange requests (orders, account reads and "
+        "history fetches)",
+    )
+
     parser.add_argument(
         "--as-screener",
         action="store_true",
@@ -126,7 +182,16 @@ def main() -> None:  # noqa: C901
         "--all-symbols",
         action="store_true",
         default=False,
-        help="Use all symbols traded in a given exchange (Not recommended)",
+        help="Use all symbols traded in a given exchange (see "
+        "--memory-budget)",
+    )
+
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        default=None,
+        help="MB of symbol history kept in memory, the least recently "
+        "ticked symbols are spilled to disk past it",
     )
 
     parser.add_argument(
@@ -143,18 +208,12 @@ def main() -> None:  # noqa: C901
         help="Dump the strategy audit log for analysis",
     )
 
-    if len(argv) > 1 and argv[1] == "-ls":
-        print("Available strategies:")
-        for st in sorted(STRATEGIES.keys()):
-            print("" * 4, st, end="")
-            print("" * 8, STRATEGIES[st].__doc__)
-        print("\nAvailable exchanges:")
-        for ex in sorted(EXCHANGES.keys()):
-            print("" * 4, ex)
-        exit()
-
     args = parser.parse_args()
 
+    # Set up after parsing so the loggers of the (lazily) imported
+    # strategy and exchange get configured too
+    setupLogger()
+
     loggers = [logging.getLogger()]
     loggers.extend(
         logging.getLogger(name) for name in logging.root.manager.loggerDict
@@ -164,18 +223,54 @@ def main() -> None:  # noqa: C901
 
     logger = logging.getLogger()
 
-    exchange = args.exchange(portfolio_name=args.portfolio)
+    from blankly import PaperTrade
+
+    exchange = EXCHANGES[args.exchange](portfolio_name=args.portfolio)
+    connection = exchange
 
-    initial = {}
-    if args.exchange == Binance:
-        initial["USDT"] = 1000
-    else:
-        initial["USD"] = 1000
+    initial = initial_values(args.exchange)
 
     if not args.live:
         exchange = PaperTrade(exchange, initial_account_values=initial)
 
     strategy = args.strategy(exchange)
+    if args.memory_budget is not None:
+        strategy.data.budget = int(args.memory_budget * 1024**2)
+
+    if not (args.backtest or args.no_rate_limit):
+        from quantipy.ratelimit import RequestScheduler
+
+        # Orders go out before account reads and history fetches once
+        # the exchange's rate limit gets tight
+        strategy.throttle(RequestScheduler())
+
+    if args.tick_budget is not None and not args.as_screener:
+        import atexit
+
+        strategy.watchdog.set_budget(args.resolution, args.tick_budget)
+
+        def report() -> None:
+            strategy.watchdog.flush()
+            logger.info("Tick budget: %s", strategy.watchdog.metrics())
+
+        atexit.register(report)
+
+    if args.record is not None and not (args.backtest or args.as_screener):
+        import atexit
+
+        from quantipy.recorder import TickRecorder
+
+        # Outside the rate limiter, so orders are logged as they return.
+        # Price events tick from their own threads until the process
+        # exits, the log is closed (and flushed) then
+        recording = TickRecorder(args.record)
+        recording.record(strategy)
+        atexit.register(recording.close)
+
+    if args.all_symbols:
+        args.symbols = [
+            product["symbol"] for product in strategy.interface.get_products()
+        ]
 
     if len(args.symbols) == 1 and args.symbols[0] in ["NASDAQ100"]:
         # Select the top 10 of these lists
@@ -189,20 +284,48 @@ def main() -> None:  # noqa: C901
         with open("backtest.json") as fp:
             data = json.load(fp)
             settings = data.get("settings", {})
+            cache = Path(settings.get("cache_location", "./price_caches"))
             benchmark = settings.get("benchmark_symbol")
             if benchmark and benchmark not in args.symbols:
-                logging.info(
-                    "Benchmark symbol %s not in symbols, adding it now",
-                    benchmark,
-                )
-                args.symbols.append(benchmark)
+                # Blankly loads the benchmark's prices for its metrics
+                # itself, strategies can read them with `reference`
+                # but it's never ticked (or traded)
+                logging.info("Using %s as a reference feed", benchmark)
+                strategy.add_reference(benchmark, args.resolution)
+
+    if args.workers > 1 and not (args.backtest or args.as_screener):
+        from quantipy.supervisor import Supervisor
+
+        budget = args.budget
+        if budget is None:
+            budget = strategy.interface.cash
+        supervisor = Supervisor(
+            args.strategy,
+            args.exchange,
+            args.symbols,
+            budget,
+            workers=args.workers,
+            resolution=args.resolution,
+            live=args.live,
+            portfolio=args.portfolio,
+            stream=args.stream,
+            log_level=args.log_level,
+            rate_limit=not args.no_rate_limit,
+        )
+        try:
+            supervisor.run()
+        except KeyboardInterrupt:
+            supervisor.stop()
+        exit()
 
-                # We need this in the backtest data but don't
-                # necessarily want to actually *trade* it
-                strategy.blacklist.append(benchmark)
+    # Blacklisted symbols don't get price events at all
+    args.symbols = [s for s in args.symbols if s not in strategy.blacklist]
 
+    streaming = args.stream and not (args.backtest or args.as_screener)
     for symbol in args.symbols:
         logger.info("Tracking symbol: %s", symbol)
+        if streaming:
+            continue
         strategy.add_price_event(
             strategy.tick,
             symbol=symbol,
@@ -211,18 +334,66 @@ def main() -> None:  # noqa: C901
         )
 
     if args.backtest:
+        from quantipy import checkpoint
+
+        window = {"to": args.to, "initial_values": initial}
+        if args.checkpoint is not None and args.checkpoint.exists():
+            # Only replay the bars since the last run
+            previous = checkpoint.load(args.checkpoint)
+            checkpoint.restore(strategy, previous)
+            window = {
+                "start_date": previous.time,
+                "end_date": time.time(),
+                "initial_values": previous.account,
+            }
+            logger.info(
+                "Resuming from checkpoint at %s",
+                datetime.fromtimestamp(previous.time).strftime("%c"),
+            )
+        from quantipy import splits
+        from quantipy.strategies.split_protector import SplitProtector
+
+        # Splits with a known ratio can be back-adjusted out of the
+        # cached prices (rewriting them, so only when asked to). Only
+        # splits every cached file of their symbol is adjusted for are
+        # traded through, the rest (e.g on a fresh cache, downloaded
+        # during this backtest) keep their blackout windows
+        events = splits.load("splits.json")
+        if args.adjust_splits:
+            splits.adjust_cache(cache, events)
+        strategy.protector = SplitProtector(
+            "splits.json", adjusted=splits.adjusted(cache, events)
+        )
+
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            res = strategy.backtest(to=args.to, initial_values=initial)
+            res = strategy.backtest(**window)
             with open(f"{args.strategy.__name__}_results.json", "w") as fp:
                 json.dump(res.to_dict(), fp, indent=4)
                 logger.info("Wrote backtest results to `%s`", fp.name)
+        if args.adjust_splits and splits.adjust_cache(cache, events):
+            logger.warning(
+                "Prices downloaded by this backtest were not split adjusted "
+                "yet, it kept out of the market around their splits. They "
+                "are adjusted now, so the next run trades through them"
+            )
+        report = getattr(strategy, "signal_stats", None)
+        if report is not None and report.stats:
+            from pandas import DataFrame
+
+            logger.info(
+                "Rule conditions:\n%s",
+                DataFrame(report.report()).to_string(index=False),
+            )
+        if args.checkpoint is not None:
+            checkpoint.save(strategy, args.checkpoint, res.stop_time)
         if args.dump_audit and strategy._audit_log != {}:
             with open(f"{strategy.__class__.__name__}_audit.json", "w") as fp:
                 json.dump(strategy._audit_log, fp, indent=4)
         exit()
 
     if args.as_screener:
+        from blankly import Screener, ScreenerState
 
         def init(state: ScreenerState) -> None:
             state.resolution = args.resolution
@@ -242,6 +413,23 @@ def main() -> None:  # noqa: C901
             formatter=formatter,
         )
 
+    if streaming:
+        from quantipy.ingest import Ingestor, TickerSource
+
+        ingestor = Ingestor(
+            strategy,
+            args.symbols,
+            args.resolution,
+            maxsize=args.queue_size,
+            policy=args.queue_policy,
+        )
+        TickerSource(connection.get_type(), args.symbols).start(ingestor.queue)
+        try:
+            ingestor.run()
+        except KeyboardInterrupt:
+            ingestor.stop()
+        exit()
+
     strategy.start()
 
 
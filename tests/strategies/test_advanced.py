@@ -1,4 +1,5 @@
 import math
+import threading
 from pathlib import Path
 from unittest.mock import MagicMock
 
@@ -299,3 +300,80 @@ def test_advanced_tick_sell(exchange):
     position = st.manager.state.get(symbol)
     assert not position.open
     assert position.state == TradeState.CLOSED
+
+
+class Budgeted(AdvancedStrategy):
+    TICK_BUDGET = {"1m": 1.0}
+
+
+def test_late_ticks_still_check_exits(exchange, monkeypatch) -> None:
+    st = Budgeted(exchange)
+    symbol = "FOO"
+    now = [0.0]
+    st.watchdog.clock = lambda: now[0]
+    st.manager._order = lambda sym, sid, qty, ste: True
+    st.manager.state.new(
+        symbol,
+        open=True,
+        size=1,
+        entry=60,
+        stop_loss=50,
+        take_profit=80,
+        state=TradeState.LONGING,
+    )
+    ran = []
+
+    def heavy(self, price, symbol, state) -> None:
+        now[0] += 1.5
+        self.audit(symbol, "heavy", "Ran long")
+
+    def notify(self, price, symbol, state) -> None:
+        ran.append(threading.current_thread().name)
+
+    notify.deferrable = True
+    monkeypatch.setitem(
+        st.callbacks,
+        "tick",
+        [
+            heavy,
+            notify,
+            AdvancedStrategy.take_profit,
+            AdvancedStrategy.stop_loss,
+        ],
+    )
+    state = StrategyState(st, {}, symbol, resolution=60)
+    st.tick(45, symbol, state)
+
+    # The stop loss closed the position within the tick
+    assert st.manager.state.get(symbol).state == TradeState.CLOSED
+    st.watchdog.flush()
+    assert ran == ["quantipy-deferred"]
+    assert st._audit_log[symbol][0]["event"] == "heavy"
+    assert st.watchdog.metrics()["overruns"] == 1
+
+
+def test_blacklisted_positions_still_hit_stop_loss(
+    exchange, monkeypatch
+) -> None:
+    st = Budgeted(exchange)
+    symbol = "FOO"
+    st.blacklist.append(symbol)
+    st.manager._order = lambda sym, sid, qty, ste: True
+    st.manager.state.new(
+        symbol,
+        open=True,
+        size=1,
+        entry=60,
+        stop_loss=50,
+        take_profit=80,
+        state=TradeState.LONGING,
+    )
+    monkeypatch.setitem(
+        st.callbacks,
+        "tick",
+        [AdvancedStrategy.take_profit, AdvancedStrategy.stop_loss],
+    )
+    state = StrategyState(st, {}, symbol, resolution=60)
+    st.tick(45, symbol, state)
+
+    assert st.manager.state.get(symbol).state == TradeState.CLOSED
@@ -0,0 +1,186 @@
+from pathlib import Path
+
+import pytest
+from blankly import KeylessExchange
+from blankly.data.data_reader import PriceReader
+from blankly.utils.exceptions import InvalidOrder
+from pandas import read_csv
+
+from quantipy import synthetic
+from quantipy.broker import SimulatedBroker, replay, stream
+from quantipy.strategies.rsi import Oversold
+from quantipy.strategies.simple import SimpleStrategy
+
+
+class Busy(Oversold):
+    # Trades far more often than the real thresholds
+    OVERSOLD = 45
+    OVERBOUGHT = 55
+
+
+@pytest.fixture(scope="module", autouse=True)
+def data_path() -> Path:
+    yield Path(__file__).parent / "data" / "pine_wave_technologies.csv"
+
+
+@pytest.fixture(scope="module")
+def data(data_path) -> object:
+    yield read_csv(data_path)
+
+
+def make_strategy(data_path) -> Busy:
+    exchange = KeylessExchange(
+        price_reader=PriceReader(str(data_path.resolve()), "PWT-USD")
+    )
+    # Other tests clear (or prune) the shared callbacks
+    Busy.register_event_callback("tick", SimpleStrategy.append_close)
+    Busy.register_event_callback("buy", Oversold.b)
+    Busy.register_event_callback("sell", Oversold.s)
+    st = Busy(exchange)
+    st.fills = []
+    place = st.manager._order
+
+    def _order(symbol, side, size, state):
+        order = place(symbol, side, size, state)
+        if order:
+            st.fills.append(
+                (
+                    st.time(),
+                    side,
+                    size,
+                    state.interface.get_price(symbol),
+                    state.interface.cash,
+                )
+            )
+        return order
+
+    st.manager._order = _order
+    return st
+
+
+def test_broker_matches_paper_trade(data_path, data) -> None:
+    # Stay clear of the last bar, a backtest ticks it with the price
+    # of the bar before
+    end = int(data["time"].iloc[-1]) - 3600
+    start = end - 86400
+
+    paper = make_strategy(data_path)
+    paper.add_price_event(
+        paper.tick, symbol="PWT-USD", resolution="1m", init=paper.init
+    )
+    paper.backtest(
+        start_date=start,
+        end_date=end,
+        initial_values={"USD": 500},
+        GUI_output=False,
+        settings_path=Path(__file__).parent / "settings.json",
+    )
+
+    simulated = make_strategy(data_path)
+    broker = SimulatedBroker({"PWT-USD": data}, {"USD": 500})
+    replay(simulated, broker, start=start, stop=end)
+
+    assert paper.fills
+    assert simulated.fills == paper.fills
+    assert len(broker.orders()) == len(paper.fills)
+    # A backtest also ticks once more past `end`, repeating its price
+    paper_close = list(paper.data["PWT-USD"]["close"])
+    simulated_close = list(simulated.data["PWT-USD"]["close"])
+    assert simulated_close[1:] == paper_close[:-1]
+
+
+def test_broker_rejects_orders(data) -> None:
+    broker = SimulatedBroker({"PWT-USD": data}, {"USD": 10})
+    broker.prices["PWT-USD"] = 20.0
+    with pytest.raises(InvalidOrder):
+        broker.market_order("PWT-USD", "buy", 1)
+    with pytest.raises(InvalidOrder):
+        broker.market_order("PWT-USD", "sell", 1)
+    assert broker.orders() == []
+
+    broker.shortable = True
+    order = broker.market_order("PWT-USD", "sell", 1)
+    assert order.get_status()["status"] == "done"
+    assert broker.account.PWT.available == -1
+    assert broker.cash == 30
+
+
+def test_broker_fees_and_history(data) -> None:
+    broker = SimulatedBroker({"PWT-USD": data}, {"USD": 100}, fee=0.01)
+    broker.now = data["time"].iloc[100]
+    broker.prices["PWT-USD"] = 10.0
+    broker.market_order("PWT-USD", "buy", 2)
+    assert broker.account["PWT"]["available"] == pytest.approx(1.98)
+    assert broker.cash == pytest.approx(80)
+
+    history = broker.history("PWT-USD", to=50, resolution="1m")
+    assert len(history["close"]) == 50
+    assert history["time"][-1] == data["time"].iloc[99]
+
+    hourly = broker.history("PWT-USD", to=50, resolution="1h")
+    assert hourly["time"][-1] % 3600 == 0
+
+
+def test_broker_history_budget_keeps_fills(data_path, data) -> None:
+    end = int(data["time"].iloc[-1]) - 3600
+    start = end - 4 * 3600
+    frames = {}
+    for i, base in enumerate(["AAA", "BBB", "CCC", "DDD"]):
+        frame = data.copy()
+        frame[["open", "high", "low", "close"]] *= 1 + i / 10
+        frames[f"{base}-USD"] = frame
+
+    runs = []
+    for budget in (None, 60_000):
+        st = make_strategy(data_path)
+        st.data.budget = budget
+        broker = SimulatedBroker(frames, {"USD": 5000})
+        replay(st, broker, start=start, stop=end)
+        runs.append(st)
+
+    unlimited, budgeted = runs
+    assert unlimited.fills
+    assert budgeted.fills == unlimited.fills
+    assert budgeted.data.evictions and budgeted.data.rehydrations
+    for symbol in frames:
+        assert list(budgeted.data[symbol]["close"]) == list(
+            unlimited.data[symbol]["close"]
+        )
+
+
+def test_stream_matches_replay(data_path, tmp_path) -> None:
+    sources = {}
+    for symbol in ("AAA-USD", "BBB-USD", "CCC-USD"):
+        columns, _ = synthetic.generate(
+            6000, seed=1, symbol=symbol, price=50, gaps=100, gap_length=20
+        )
+        sources[symbol] = synthetic.write(tmp_path, "test", symbol, columns)
+    data = {symbol: read_csv(path) for symbol, path in sources.items()}
+    start = int(data["AAA-USD"]["time"].iloc[1000])
+    stop = int(data["AAA-USD"]["time"].iloc[-500])
+
+    st = make_strategy(data_path)
+    broker = SimulatedBroker(data, {"USD": 1000})
+    replay(st, broker, start=start, stop=stop)
+
+    streamed = make_strategy(data_path)
+    # Chunks smaller than the history fetched at `init`, and a window
+    # just big enough for it
+    window = streamed.HISTORY + 1
+    out = stream(
+        streamed,
+        sources,
+        {"USD": 1000},
+        start=start,
+        stop=stop,
+        window=window,
+        chunk=500,
+    )
+    assert st.fills
+    assert streamed.fills == st.fills
+    assert out.orders() == broker.orders()
+    assert max(len(bars) for bars in out.bars.values()) == window
+    for symbol in sources:
+        assert list(streamed.data[symbol]["close"]) == list(
+            st.data[symbol]["close"]
+        )
@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import pytest
+from blankly import KeylessExchange
+from blankly.data.data_reader import PriceReader
+from pandas import read_csv
+
+from quantipy import checkpoint
+from quantipy.strategies.simple import SimpleStrategy
+
+
+@pytest.fixture(scope="module", autouse=True)
+def data_path() -> Path:
+    yield Path(__file__).parent / "data" / "pine_wave_technologies.csv"
+
+
+def make_strategy(data_path) -> SimpleStrategy:
+    exchange = KeylessExchange(
+        price_reader=PriceReader(str(data_path.resolve()), "PWT-USD")
+    )
+    # Other tests clear the (shared) tick callbacks
+    SimpleStrategy.register_event_callback("tick", SimpleStrategy.append_close)
+    st = SimpleStrategy(exchange)
+    st.ticks = 0
+
+    def tick(*args) -> None:
+        st.ticks += 1
+        st.tick(*args)
+
+    st.add_price_event(
+        tick,
+        symbol="PWT-USD",
+        resolution="1m",
+        init=st.init,
+    )
+    return st
+
+
+def backtest(st, start, end, initial_values) -> object:
+    return st.backtest(
+        start_date=start,
+        end_date=end,
+        initial_values=initial_values,
+        GUI_output=False,
+        settings_path=Path(__file__).parent / "settings.json",
+    )
+
+
+def test_checkpoint_resume(data_path, tmp_path) -> None:
+    end = int(read_csv(data_path)["time"].iloc[-1])
+    start, middle = end - 86400, end - 43200
+    path = tmp_path / "pwt.ckpt"
+
+    whole = make_strategy(data_path)
+    backtest(whole, start, end, {"USD": 500})
+
+    first = make_strategy(data_path)
+    res = backtest(first, start, middle, {"USD": 500})
+    saved = checkpoint.save(first, path, res.stop_time)
+    assert saved.account["USD"] == 500
+
+    fetches = []
+    resumed = make_strategy(data_path)
+    resumed.fetch_history = lambda *args: fetches.append(args)
+    loaded = checkpoint.load(path)
+    assert loaded.time == res.stop_time
+    checkpoint.restore(resumed, loaded)
+    backtest(resumed, loaded.time, end, loaded.account)
+
+    # History came from the checkpoint and carried on from its last bar
+    # (ticked by both runs) as if the run had never stopped
+    assert fetches == []
+    assert "PWT-USD" not in resumed.restored and not resumed.resumed
+    assert first.ticks > 0 and resumed.ticks > 0
+    assert first.ticks + resumed.ticks - 1 == whole.ticks
+    assert list(resumed.data["PWT-USD"]["close"]) == list(
+        whole.data["PWT-USD"]["close"]
+    )
+
+
+def test_checkpoint_version(tmp_path, data_path) -> None:
+    st = make_strategy(data_path)
+    path = tmp_path / "old.ckpt"
+    checkpoint.save(st, path, 0)
+    with open(path, "rb") as fp:
+        data = checkpoint.pickle.load(fp)
+    with open(path, "wb") as fp:
+        checkpoint.pickle.dump(data._replace(version=0), fp)
+    with pytest.raises(ValueError):
+        checkpoint.load(path)
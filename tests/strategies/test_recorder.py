@@ -0,0 +1,131 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from blankly import KeylessExchange, StrategyState
+from blankly.data.data_reader import PriceReader
+from blankly.utils import AttributeDict
+from pandas import read_csv
+
+from quantipy import recorder
+from quantipy.broker import SimulatedBroker
+from quantipy.recorder import TickRecorder
+from quantipy.strategies.rsi import Oversold
+from quantipy.strategies.simple import SimpleStrategy
+
+
+class Busy(Oversold):
+    # Trades far more often than the real thresholds
+    OVERSOLD = 45
+    OVERBOUGHT = 55
+
+
+@pytest.fixture(scope="module", autouse=True)
+def data_path() -> Path:
+    yield Path(__file__).parent / "data" / "pine_wave_technologies.csv"
+
+
+def make_strategy(data_path) -> Busy:
+    exchange = KeylessExchange(
+        price_reader=PriceReader(str(data_path.resolve()), "PWT-USD")
+    )
+    # Other tests clear (or prune) the shared callbacks
+    Busy.register_event_callback("tick", SimpleStrategy.append_close)
+    Busy.register_event_callback("buy", Oversold.b)
+    Busy.register_event_callback("sell", Oversold.s)
+    return Busy(exchange)
+
+
+def test_log_round_trip(tmp_path) -> None:
+    path = tmp_path / "session.qlog"
+    log = TickRecorder(path)
+    log.history("A-USD", {c: [1.0, 2.0] for c in recorder.BAR_COLUMNS}, 60, 5)
+    log.tick("A-USD", 10.5, 100.0, 0.25, 60)
+    log.order("A-USD", "sell", 2.0, 10.5, 101.0)
+    log.close()
+
+    # Reopening carries on with the same symbol ids
+    log = TickRecorder(path)
+    log.tick("B-USD", 3.0, 102.0, 0.5, 60)
+    log.tick("A-USD", 11.0, 160.0, 0.5, 60)
+    log.close()
+    assert recorder.symbols(path) == ["A-USD", "B-USD"]
+
+    # A record cut off by a crash is dropped
+    with open(path, "ab") as fp:
+        fp.write(recorder.RECORD.pack(recorder.TICK, 0, 1, 2, 3)[:-4])
+
+    events = [e for e in recorder.read(path) if e.kind != "symbol"]
+    assert [(e.kind, e.symbol, e.time) for e in events] == [
+        ("history", "A-USD", 5),
+        ("tick", "A-USD", 100.0),
+        ("order", "A-USD", 101.0),
+        ("tick", "B-USD", 102.0),
+        ("tick", "A-USD", 160.0),
+    ]
+    assert np.array_equal(events[0].bars["close"], [1.0, 2.0])
+    assert events[1].price == 10.5 and events[1].value == 0.25
+    assert events[2].value == -2.0
+
+
+def test_replay_reproduces_a_recorded_session(data_path, tmp_path) -> None:
+    data = read_csv(data_path)
+    path = tmp_path / "session.qlog"
+
+    # A "live" session: ticks at each bar's close on a local exchange,
+    # the recorder hooked in like `run.py --record` does
+    live = make_strategy(data_path)
+    broker = SimulatedBroker({"PWT-USD": data}, {"USD": 500})
+    live.interface = broker
+    live.time = broker.time
+    log = TickRecorder(path, clock=broker.time)
+    log.record(live)
+    state = StrategyState(live, AttributeDict({}), "PWT-USD", resolution=60)
+    bars = data.iloc[-2000:]
+    for i, (t, close) in enumerate(zip(bars["time"], bars["close"])):
+        broker.now = float(t)
+        broker.prices["PWT-USD"] = float(close)
+        if not i:
+            live.init("PWT-USD", state)
+        live.tick(float(close), "PWT-USD", state)
+    log.close()
+    assert broker.orders()
+
+    replayed = recorder.replay(make_strategy(data_path), path, {"USD": 500})
+    assert replayed.broker.orders() == broker.orders()
+    assert [o["side"] for o in replayed.session.orders] == [
+        o["side"] for o in broker.orders()
+    ]
+    assert len(replayed.live) == len(replayed.replayed) == len(bars)
+    assert (replayed.live > 0).all()
+
+
+def test_replay_speed(data_path, tmp_path) -> None:
+    path = tmp_path / "session.qlog"
+    log = TickRecorder(path)
+    for i in range(5):
+        log.tick("PWT-USD", 50.0 + i, 1000.0 + 60 * i, 0.0, 60)
+    log.close()
+
+    now, slept = [0.0], []
+
+    def sleep(seconds: float) -> None:
+        slept.append(seconds)
+        now[0] += seconds
+
+    class Ticks:
+        interface = time = None
+        ticked = []
+
+        def init(self, symbol: str, state: StrategyState) -> None:
+            pass
+
+        def tick(self, price: float, symbol: str, state: object) -> None:
+            self.ticked.append((now[0], price))
+
+    strategy = Ticks()
+    recorder.replay(
+        strategy, path, speed=60, clock=lambda: now[0], sleep=sleep
+    )
+    # 60x the recorded pace, a minute between ticks is a second
+    assert strategy.ticked == [(float(i), 50.0 + i) for i in range(5)]
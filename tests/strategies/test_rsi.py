@@ -6,6 +6,7 @@ import pytest
 from blankly import KeylessExchange
 from blankly.data.data_reader import PriceReader
 from blankly.indicators import rsi
+from pandas import read_csv
 
 from quantipy.strategies.rsi import Oversold
 
@@ -49,3 +50,14 @@ def test_buy_and_sell_fns(exchange) -> None:
     assert st.b(1, symbol, None) == 42
     st.manager.order = lambda _, __, ___, side: 42
     assert st.s(1, symbol, None) == 42
+
+
+def test_vectorized_signals_match_tick(data_path, exchange) -> None:
+    st = Oversold(exchange)
+    symbol = "PWT-USD"
+    close = read_csv(data_path)["close"].to_numpy()[:400]
+    buy, sell = st.signals(st.indicators(close))
+    for n in range(20, len(close) + 1):
+        st.data[symbol]["close"] = list(close[:n])
+        assert st.buy(symbol) == buy[n - 1]
+        assert st.sell(symbol) == sell[n - 1]
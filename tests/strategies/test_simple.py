@@ -169,3 +169,59 @@ def test_on_tick_append(exchange) -> None:
     args = (price, symbol, state)
     st.run_callbacks("tick", *args)
     assert st.data[symbol]["close"][-1] == price
+
+
+def test_simple_blacklist_skips_tick_callbacks(exchange) -> None:
+    st = SimpleStrategy(exchange)
+    st.blacklist.append("FOO")
+    assert "FOO" in st.blacklist
+    ticked = []
+    st.run_callbacks = lambda *args: ticked.append(args)
+    st.tick(42, "FOO", None)
+    assert ticked == []
+
+
+def test_simple_blacklist_closes_open_positions(exchange) -> None:
+    st = SimpleStrategy(exchange)
+    st.blacklist.append("FOO")
+    st.data["FOO"]["close"] = []
+    position = st.manager.state.new("FOO", entry=42, open=True)
+    st.manager.close = MagicMock()
+    state = StrategyState(st, {}, "FOO")
+    st.tick(42, "FOO", state)
+    st.manager.close.assert_called_once_with(position, state)
+
+
+def test_simple_reads_reference_without_ticking(data_path) -> None:
+    prices = read_csv(data_path)
+    reference = prices.copy()
+    reference["close"] *= 2
+    exchange = KeylessExchange(
+        price_reader=PriceReader([prices, reference], ["PWT-USD", "REF-USD"])
+    )
+    seen = []
+
+    class Watcher(SimpleStrategy):
+        def tick(self, price, symbol, state) -> None:
+            seen.append((symbol, price, self.reference("REF-USD")))
+
+    st = Watcher(exchange)
+    st.add_reference("REF-USD", "1m")
+    st.add_price_event(
+        st.tick, symbol="PWT-USD", resolution="1m", init=st.init
+    )
+    start, end = get_one_day_start_end(data_path)
+    st.backtest(
+        start_date=start - 3600,
+        end_date=end - 3600,
+        initial_values={"USD": 500},
+        GUI_output=False,
+        settings_path=Path(__file__).parent / "settings.json",
+    )
+    assert {symbol for symbol, _, _ in seen} == {"PWT-USD"}
+    # Only bars that opened before each tick, read-only
+    for previous, (_, _, closes) in zip(seen, seen[1:]):
+        assert closes[-1] == pytest.approx(previous[1] * 2)
+    assert len(seen[-1][2]) == len(seen)
+    with pytest.raises(ValueError):
+        seen[-1][2][0] = 0
@@ -116,3 +116,15 @@ def test_advanced_harmonic_oscillators_inssuficent_data(exchange) -> None:
     )
     assert not st.buy(symbol)
     assert not st.sell(symbol)
+
+
+def test_vectorized_signals_match_tick(data_path, exchange) -> None:
+    st = AdvancedHarmonicOscillators(exchange)
+    st.audit = MagicMock()
+    symbol = "PWT-USD"
+    close = read_csv(data_path)["close"].to_numpy()[:400]
+    buy, sell = st.signals(st.indicators(close))
+    for n in range(st.STRIDE, len(close) + 1):
+        st.data[symbol]["close"] = list(close[:n])
+        assert st.buy(symbol) == buy[n - 1]
+        assert st.sell(symbol) == sell[n - 1]
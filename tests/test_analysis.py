@@ -0,0 +1,131 @@
+import time
+
+import numpy as np
+import pytest
+
+from quantipy.analysis import (
+    analyze,
+    by_symbol,
+    drawdown,
+    exposure,
+    round_trips,
+    summarize,
+)
+
+
+def order(symbol, side, time, price, size=1):
+    return {
+        "symbol": symbol,
+        "side": side,
+        "time": time,
+        "price": price,
+        "size": size,
+    }
+
+
+@pytest.fixture
+def orders() -> list:
+    return [
+        order("FOO", "buy", 0, 10),
+        order("BAR", "sell", 5, 20, 2),
+        order("FOO", "sell", 10, 12),
+        order("BAR", "buy", 15, 18, 2),
+        order("FOO", "buy", 20, 12),
+        order("FOO", "sell", 30, 9),
+        # Still open
+        order("BAR", "buy", 40, 18),
+    ]
+
+
+def test_round_trips_pairs_longs_and_shorts(orders) -> None:
+    trips = round_trips(orders)
+    assert len(trips) == 3
+
+    foo = trips[trips["symbol"] == "FOO"]
+    assert list(foo["direction"]) == [1, 1]
+    assert list(foo["pnl"]) == [2, -3]
+    assert list(foo["holding"]) == [10, 10]
+
+    bar = trips[trips["symbol"] == "BAR"].iloc[0]
+    assert bar["direction"] == -1
+    # Shorted 2 @ 20, covered 2 @ 18
+    assert bar["pnl"] == 4
+    assert bar["return"] == pytest.approx(0.1)
+
+
+def test_summarize(orders) -> None:
+    summary = summarize(round_trips(orders), start=0, stop=40)
+    assert summary["trades"] == 3
+    assert summary["wins"] == 2
+    assert summary["win_rate"] == pytest.approx(2 / 3)
+    assert summary["net"] == 3
+    assert summary["profit_factor"] == pytest.approx(2)
+    assert summary["expectancy"] == pytest.approx(1)
+    # Open from 0-15 and 20-30
+    assert summary["exposure"] == pytest.approx(25 / 40)
+    assert summary["max_drawdown"] == -3
+
+
+def test_exposure_counts_overlap_once() -> None:
+    trips = round_trips(
+        [
+            order("A", "buy", 0, 1),
+            order("B", "buy", 5, 1),
+            order("A", "sell", 10, 1),
+            order("B", "sell", 20, 1),
+        ]
+    )
+    assert exposure(trips, 0, 40) == pytest.approx(0.5)
+
+
+def test_rolling_drawdown() -> None:
+    trips = round_trips(
+        [
+            order("A", "buy", 0, 10),
+            order("A", "sell", 1, 15),
+            order("A", "buy", 2, 10),
+            order("A", "sell", 3, 8),
+            order("A", "buy", 4, 10),
+            order("A", "sell", 5, 9),
+        ]
+    )
+    assert list(drawdown(trips)) == [0, -2, -3]
+    assert list(drawdown(trips, window=2)) == [0, -2, -1]
+
+
+def test_by_symbol(orders) -> None:
+    frame = by_symbol(round_trips(orders))
+    assert frame.loc["FOO", "trades"] == 2
+    assert frame.loc["FOO", "win_rate"] == 0.5
+    assert frame.loc["BAR", "net"] == 4
+
+
+def test_analyze_results_dict(orders) -> None:
+    report = analyze(
+        {"trades": {"created": orders}, "start_time": 0, "stop_time": 40}
+    )
+    assert report["summary"]["trades"] == 3
+    assert len(report["round_trips"]) == 3
+
+
+def test_empty_orders() -> None:
+    trips = round_trips([])
+    assert trips.empty
+    assert summarize(trips)["trades"] == 0
+
+
+def test_round_trips_scale() -> None:
+    rng = np.random.default_rng(42)
+    n = 1_000_000
+    orders = {
+        "symbol": rng.integers(0, 500, n).astype(str),
+        "side": np.where(rng.random(n) > 0.5, "buy", "sell"),
+        "time": np.arange(n, dtype=float),
+        "price": rng.uniform(1, 100, n),
+        "size": rng.uniform(1, 10, n),
+    }
+    began = time.perf_counter()
+    trips = round_trips(orders)
+    summarize(trips)
+    assert time.perf_counter() - began < 10
+    assert len(trips) <= n // 2
@@ -0,0 +1,135 @@
+import os
+import subprocess
+import sys
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from quantipy.arena import PriceArena
+
+
+def total_close(handle) -> float:
+    arena = PriceArena.attach(handle)
+    try:
+        return float(
+            sum(arena.column(s, "close").sum() for s in arena.symbols)
+        )
+    finally:
+        arena.close()
+
+
+# Attaches in the creating process, a spawned worker and an unrelated
+# process (with its own resource tracker), then unlinks, or crashes
+# with the block still linked
+SCRIPT = """
+import json
+import os
+import subprocess
+import sys
+from multiprocessing import get_context
+
+from quantipy.arena import ArenaHandle, PriceArena
+
+
+def total(handle):
+    arena = PriceArena.attach(ArenaHandle(*handle))
+    try:
+        return float(arena.column("FOO", "close").sum())
+    finally:
+        arena.close()
+
+
+if __name__ == "__main__":
+    if sys.argv[1] == "attach":
+        print(total(json.loads(sys.argv[2])))
+        sys.exit()
+    arena = PriceArena.create({"FOO": {"close": [1.0, 2.0]}})
+    assert total(arena.handle) == 3.0
+    with get_context("spawn").Pool(1) as pool:
+        assert pool.map(total, [arena.handle]) == [3.0]
+    subprocess.run(
+        [sys.executable, __file__, "attach", json.dumps(arena.handle)],
+        check=True,
+    )
+    # The unrelated process' tracker didn't unlink it on exit
+    assert total(arena.handle) == 3.0
+    print(arena.shm.name, flush=True)
+    if sys.argv[1] == "crash":
+        os._exit(1)
+    arena.unlink()
+"""
+
+
+def run_script(tmp_path, mode: str) -> subprocess.CompletedProcess:
+    script = tmp_path / "arena_script.py"
+    script.write_text(SCRIPT)
+    root = str(Path(__file__).parents[1])
+    env = dict(os.environ, PYTHONPATH=root)
+    # Waits for the resource tracker too, it holds stderr until it exits
+    return subprocess.run(
+        [sys.executable, str(script), mode],
+        capture_output=True,
+        text=True,
+        env=env,
+        timeout=60,
+    )
+
+
+@pytest.fixture
+def data() -> dict:
+    return {
+        "FOO": {"time": [0, 60, 120], "close": [1.0, 2.0, 3.0]},
+        "BAR": {
+            "time": [0, 60],
+            "open": [9, 9],
+            "high": [9, 9],
+            "low": [9, 9],
+            "close": [10.0, 20.0],
+            "volume": [1, 1],
+        },
+    }
+
+
+def test_arena_layout(data) -> None:
+    with PriceArena.create(data) as arena:
+        assert arena.index == {"FOO": (0, 3), "BAR": (3, 2)}
+        assert list(arena["FOO"]["close"]) == [1, 2, 3]
+        assert list(arena.column("BAR", "close")) == [10, 20]
+        assert np.isnan(arena["FOO"]["volume"]).all()
+        assert "FOO" in arena and len(arena) == 2
+
+
+def test_arena_views_are_read_only(data) -> None:
+    with PriceArena.create(data) as arena:
+        attached = PriceArena.attach(arena.handle)
+        view = attached["FOO"]["close"]
+        with pytest.raises(ValueError):
+            view[0] = 42
+        del view
+        attached.close()
+
+
+def test_arena_shared_across_processes(data) -> None:
+    with PriceArena.create(data) as arena:
+        with get_context("spawn").Pool(2) as pool:
+            results = pool.map(total_close, [arena.handle] * 2)
+        assert results == [36.0, 36.0]
+
+
+def test_arena_attach_keeps_the_creators_registration(tmp_path) -> None:
+    done = run_script(tmp_path, "unlink")
+    assert done.returncode == 0, done.stderr
+    # The tracker complains about blocks it lost track of (KeyError) or
+    # had to clean up itself (leaked)
+    assert "Traceback" not in done.stderr
+    assert "leaked" not in done.stderr
+
+
+@pytest.mark.skipif(not Path("/dev/shm").is_dir(), reason="needs /dev/shm")
+def test_arena_crashed_creator_is_cleaned_up(tmp_path) -> None:
+    done = run_script(tmp_path, "crash")
+    assert done.returncode == 1
+    name = done.stdout.split()[-1]
+    assert not (Path("/dev/shm") / name.lstrip("/")).exists()
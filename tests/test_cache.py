@@ -0,0 +1,67 @@
+from pathlib import Path
+
+import numpy as np
+from pandas import read_csv
+
+from quantipy.cache import IndicatorCache
+from quantipy.strategies.rsi import Oversold
+from quantipy.strategies.stochastic import AdvancedHarmonicOscillators
+
+DATA = Path(__file__).parent / "strategies" / "data"
+
+
+def close() -> np.ndarray:
+    return read_csv(DATA / "pine_wave_technologies.csv")["close"].to_numpy()
+
+
+def same(a: dict, b: dict) -> None:
+    assert a.keys() == b.keys()
+    for key in a:
+        x, y = a[key], b[key]
+        if isinstance(x, dict):
+            same(x, y)
+        else:
+            assert np.allclose(x, y, rtol=1e-9, equal_nan=True), key
+
+
+def test_indicator_cache_hits(tmp_path) -> None:
+    prices = close()[:2000]
+    cache = IndicatorCache(tmp_path)
+    key = ("PWT", 60.0, 0.0)
+    strategy = AdvancedHarmonicOscillators
+    expected = strategy.indicators(prices)
+
+    same(strategy.indicators(prices, cache, key), expected)
+    # RSI, Stochastic RSI and MACD
+    assert (cache.hits, cache.misses) == (0, 3)
+    same(strategy.indicators(prices, cache, key), expected)
+    assert (cache.hits, cache.misses) == (3, 3)
+
+    # Other prices (or another key) don't hit
+    Oversold.indicators(prices * 2, cache, key)
+    assert cache.misses == 4
+    strategy.indicators(prices, cache, ("PWT", 3600.0, 0.0))
+    assert cache.misses == 7
+
+
+def test_indicator_cache_extends(tmp_path) -> None:
+    prices = close()
+    cache = IndicatorCache(tmp_path)
+    strategy = AdvancedHarmonicOscillators
+    strategy.indicators(prices[:3000], cache)
+    extended = strategy.indicators(prices, cache)
+    assert (cache.extended, cache.misses) == (3, 3)
+    same(extended, strategy.indicators(prices))
+    same(strategy.indicators(prices, cache), extended)
+    assert cache.hits == 3
+
+
+def test_indicator_cache_evicts(tmp_path) -> None:
+    prices = close()[:1000]
+    cache = IndicatorCache(tmp_path, max_bytes=20_000)
+    for i in range(4):
+        Oversold.indicators(prices + i, cache, (i,))
+    # Each entry is ~8KB, only the last two fit
+    assert len(list(tmp_path.glob("*.npz"))) == 2
+    Oversold.indicators(prices + 3, cache, (3,))
+    assert cache.hits == 1
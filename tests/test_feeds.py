@@ -0,0 +1,40 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from quantipy.feeds import Blacklist, ReferenceFeed
+
+
+class FakeInterface:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def history(self, symbol, to, resolution, return_as) -> dict:
+        self.calls += 1
+        time = np.arange(self.calls * 60, (self.calls + 5) * 60, 60.0)
+        return {"time": deque(time), "close": deque(time / 60)}
+
+
+def test_blacklist() -> None:
+    blacklist = Blacklist(["FOO"])
+    blacklist.append("BAR")
+    blacklist.append("BAR")
+    blacklist.extend(["BAZ"])
+    assert blacklist == {"FOO", "BAR", "BAZ"}
+
+
+def test_reference_feed_refreshes_once_per_bar() -> None:
+    feed = ReferenceFeed(size=5)
+    interface = FakeInterface()
+    with pytest.raises(KeyError):
+        feed.get("SPY", now=0, interface=interface)
+
+    feed.add("SPY", "1m")
+    assert list(feed.get("SPY", now=300, interface=interface)) == [1, 2, 3, 4]
+    assert len(feed.get("SPY", now=330, interface=interface)) == 5
+    assert interface.calls == 1
+    closes = feed.get("SPY", now=360, interface=interface)
+    assert list(closes) == [2, 3, 4, 5]
+    assert interface.calls == 2
+    assert not closes.flags.writeable
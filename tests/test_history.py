@@ -0,0 +1,88 @@
+from collections import deque
+
+import numpy as np
+
+from quantipy.buffer import RingBuffer
+from quantipy.history import HistoryStore, size_of
+
+
+def history(n: int, start: float = 0) -> dict:
+    return {
+        "time": deque(range(n), 800),
+        "close": deque(np.arange(start, start + n, dtype=float), 800),
+    }
+
+
+def test_history_store_acts_like_defaultdict() -> None:
+    store = HistoryStore()
+    assert "FOO" not in store
+    store["FOO"]["close"] = []
+    assert store["FOO"] == {"close": []}
+    assert list(store) == ["FOO"] and len(store) == 1
+    store.update({"BAR": history(3)})
+    assert dict(store)["BAR"]["time"] == deque([0, 1, 2])
+    del store["FOO"]
+    assert "FOO" not in store
+
+
+def test_history_store_spills_least_recently_used(tmp_path) -> None:
+    budget = 2 * size_of(history(101)) + 1
+    hot = {"AAA"}
+    store = HistoryStore(budget, tmp_path, keep=hot.__contains__)
+    for i, symbol in enumerate(["AAA", "BBB", "CCC", "DDD"]):
+        store[symbol] = history(100, i * 1000)
+        store[symbol]["close"].append(-1.0)
+
+    # AAA is kept, BBB and CCC were the coldest
+    assert set(store.hot) == {"AAA", "DDD"}
+    assert set(store.cold) == {"BBB", "CCC"}
+    assert len(list(tmp_path.glob("*.npy"))) == 4
+
+    bbb = store["BBB"]
+    assert list(bbb["close"])[:2] == [1000.0, 1001.0]
+    assert bbb["close"][-1] == -1.0
+    assert bbb["close"].maxlen == 800
+    assert list(bbb["time"]) == list(range(100))
+    assert isinstance(bbb["time"][0], int)
+    assert "DDD" in store.cold
+    assert store.memory() <= budget
+    assert store.metrics()["rehydrations"] == 1
+
+
+def test_history_store_spills_ring_buffers(tmp_path) -> None:
+    close = history(800)["close"]
+    packed = {"close": RingBuffer(800, close, np.float32)}
+    assert size_of(packed) < size_of({"close": close}) / 4
+
+    store = HistoryStore(1, tmp_path)
+    store["AAA"] = packed
+    store["BBB"] = history(10)
+    assert "AAA" in store.cold
+    close = store["AAA"]["close"]
+    assert isinstance(close, RingBuffer)
+    assert close.maxlen == 800 and close.dtype == np.float32
+    assert list(close) == list(range(800))
+
+
+def test_history_store_tracks_sizes_incrementally(
+    tmp_path, monkeypatch
+) -> None:
+    store = HistoryStore(50 * size_of(history(100)), tmp_path)
+    for i in range(100):
+        store[f"S{i}"] = history(100)
+    assert len(store.hot) < 100 and store.memory() <= store.budget
+    assert store.memory() == sum(size_of(h) for h in store.hot.values())
+
+    # Reading a spilled symbol back only measures what it touches
+    measured = []
+    monkeypatch.setattr(
+        "quantipy.history.size_of", lambda h: measured.append(h) or 1000
+    )
+    store["S0"]
+    assert len(measured) == 1
+
+    monkeypatch.undo()
+    store["S1"]["close"].extend([1.0] * 100)
+    store["S1"]
+    del store["S0"]
+    assert store.memory() == sum(size_of(h) for h in store.hot.values())
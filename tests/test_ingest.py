@@ -0,0 +1,142 @@
+import pytest
+
+from quantipy.ingest import FakeStream, Ingestor, Tick, TickQueue
+
+
+def ticks(symbol, prices, start=0.0, spacing=20.0) -> list:
+    return [
+        Tick(symbol, price, start + i * spacing, 1.0)
+        for i, price in enumerate(prices)
+    ]
+
+
+class FakeStrategy:
+    def __init__(self) -> None:
+        self.inits = []
+        self.ticks = []
+
+    def init(self, symbol, state) -> None:
+        self.inits.append(symbol)
+
+    def tick(self, price, symbol, state) -> None:
+        self.ticks.append((symbol, price))
+        if price < 0:
+            raise ValueError("Bad tick")
+
+
+def test_queue_coalesces_ticks() -> None:
+    queue = TickQueue("1m", maxsize=10)
+    for tick in ticks("FOO", [1, 3, 2, 5, 4, 6, 7]):
+        queue.put(*tick)
+
+    # 20s apart, so three ticks per bar and the last one still building
+    assert len(queue) == 2
+    first = queue.get(0)
+    assert (first.time, first.open, first.high, first.low, first.close) == (
+        0,
+        1,
+        3,
+        1,
+        2,
+    )
+    assert first.volume == 3
+    second = queue.get(0)
+    assert (second.time, second.open, second.close) == (60, 5, 6)
+    assert queue.get(0) is None
+
+    assert queue.flush(now=179) == 0
+    assert queue.flush(now=180) == 1
+    assert queue.get(0).close == 7
+
+
+@pytest.mark.parametrize(
+    "policy,closes,dropped,merged",
+    [("drop", [3, 4], 3, 0), ("merge", [0, 4], 0, 3)],
+)
+def test_queue_full_policies(policy, closes, dropped, merged) -> None:
+    queue = TickQueue("1m", maxsize=2, policy=policy)
+    for tick in ticks("FOO", range(6), spacing=60):
+        queue.put(*tick)
+
+    metrics = queue.metrics()
+    assert metrics["depth"] == metrics["max_depth"] == 2
+    assert metrics["dropped"] == dropped
+    assert metrics["merged"] == merged
+    assert [queue.get(0).close for _ in range(2)] == closes
+
+
+def test_queue_merges_only_its_own_symbol() -> None:
+    queue = TickQueue("1m", maxsize=1, policy="merge")
+    stream = ticks("FOO", range(3), spacing=60)
+    stream += ticks("BAR", range(3), spacing=60)
+    for tick in sorted(stream, key=lambda tick: tick.time):
+        queue.put(*tick)
+    # BAR has nothing queued to merge into, so FOO's bar gets dropped
+    assert queue.metrics()["dropped"] == 3
+    assert queue.metrics()["merged"] == 0
+    assert queue.get(0).symbol == "BAR"
+
+
+def test_queue_blocks_producers() -> None:
+    queue = TickQueue("1m", maxsize=1, policy="block")
+    stream = FakeStream(ticks("FOO", range(5), spacing=60))
+    stream.start(queue)
+
+    closes = []
+    while len(closes) < 4:
+        bar = queue.get(1)
+        assert bar is not None
+        closes.append(bar.close)
+    stream.join(1)
+    assert closes == [0, 1, 2, 3]
+    assert queue.metrics()["max_depth"] == 1
+    assert queue.metrics()["dropped"] == 0
+
+
+def test_queue_flush_never_blocks() -> None:
+    queue = TickQueue("1m", maxsize=1, policy="block", clock=lambda: 1000)
+    queue.put("FOO", 1, 0)
+    queue.put("BAR", 2, 0)
+    queue.put("FOO", 3, 60)
+
+    # Full, the due bars stay pending instead of waiting for room
+    assert queue.flush() == 0
+    assert queue.get(0).close == 1
+    assert queue.flush() == 1
+    assert queue.get(0).close == 3
+    assert queue.flush() == 1
+    assert queue.get(0).close == 2
+    assert queue.metrics()["dropped"] == 0
+
+
+def test_ingestor_feeds_tick() -> None:
+    strategy = FakeStrategy()
+    # Stand still until every tick is in, so no bar closes early
+    now = 0.0
+    ingestor = Ingestor(
+        strategy, ["FOO", "BAR"], "1m", maxsize=100, clock=lambda: now
+    )
+    stream = FakeStream(
+        ticks("FOO", [1, 2, -3, 4, 5, 6]) + ticks("BAR", [7, 8, 9, 10])
+    )
+    ingestor.start()
+    stream.start(ingestor.queue)
+    stream.join(1)
+    now = 1000.0
+    ingestor.queue.flush()
+    ingestor.stop(1)
+
+    assert strategy.inits == ["FOO", "BAR"]
+    assert strategy.ticks == [("FOO", -3), ("BAR", 9), ("FOO", 6), ("BAR", 10)]
+    metrics = ingestor.metrics()
+    assert metrics["bars"] == 4
+    assert metrics["errors"] == 1
+    assert metrics["depth"] == 0
+    assert metrics["ticks"] == 10
+    assert metrics["wait_max"] >= 0
+    assert metrics["lag_max"] > 0
+
+
+def test_queue_unknown_policy() -> None:
+    with pytest.raises(ValueError):
+        TickQueue("1m", policy="ignore")
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from pandas import DataFrame
+
+from quantipy.montecarlo import monte_carlo, risk, simulate
+
+
+def test_bootstrap_constant_trades() -> None:
+    paths = simulate([2.0] * 50, simulations=100, seed=0)
+    assert (paths.final == 100).all()
+    assert (paths.max_drawdown == 0).all()
+    assert (paths.trough == 0).all()
+
+
+def test_permute_keeps_total() -> None:
+    pnl = [3.0, -1.0, -1.0, 2.0, -4.0]
+    paths = simulate(pnl, simulations=500, method="permute", seed=0)
+    assert np.allclose(paths.final, -1)
+    # Every loss in a row is the worst case, no loss in a row the best
+    assert paths.max_drawdown.min() >= -6
+    assert paths.max_drawdown.max() <= -4
+    assert paths.trough.min() >= -6
+
+
+def test_chunks_are_bounded_and_reproducible() -> None:
+    pnl = np.random.default_rng(0).normal(0, 1, 200)
+    whole = simulate(pnl, simulations=300, seed=42)
+    # 5 simulations per chunk
+    chunked = simulate(pnl, simulations=300, seed=42, memory=16 * 200 * 5)
+    for a, b in zip(whole, chunked):
+        assert np.allclose(a, b)
+
+
+def test_risk_and_ruin() -> None:
+    paths = simulate([-10.0] * 10, simulations=10, seed=0)
+    report = risk(paths, capital=100, ruin=0.5)
+    assert report["ruin"] == 1
+    assert report["final"]["p50"] == -100
+    assert report["return"]["mean"] == -1
+    assert report["max_drawdown_pct"]["p5"] == -1
+
+    paths = simulate([1.0, -1.0], simulations=10, seed=0)
+    assert "ruin" not in risk(paths)
+    assert risk(paths, capital=100)["ruin"] == 0
+
+
+def test_monte_carlo_from_round_trips() -> None:
+    trips = DataFrame({"exit_time": [3, 1, 2], "pnl": [5.0, -1.0, 2.0]})
+    report = monte_carlo(trips, simulations=1000, method="permute", seed=0)
+    assert report["simulations"] == 1000
+    assert report["final"]["mean"] == pytest.approx(6)
+
+
+def test_unknown_method() -> None:
+    with pytest.raises(ValueError):
+        simulate([1.0], method="jackknife")
+    with pytest.raises(ValueError):
+        simulate([1.0], method="permute", length=3)
@@ -0,0 +1,80 @@
+import numpy as np
+
+from quantipy import patterns
+
+
+def test_recently() -> None:
+    values = np.array([30.0, 10, 30, 30, 30, 30])
+    assert patterns.recently_below(values, 20, 3).tolist() == [
+        False,
+        False,
+        True,
+        True,
+        False,
+        False,
+    ]
+    assert patterns.recently_above(values, 20, 2).tolist() == [
+        False,
+        True,
+        True,
+        True,
+        True,
+        True,
+    ]
+    # Window longer than the series
+    assert not patterns.recently_below(values, 100, 10).any()
+
+
+def test_rising_and_falling() -> None:
+    values = np.array([1.0, 2, 3, 3, 4, 5, np.nan, 6])
+    assert patterns.rising(values, 3).tolist() == [
+        False,
+        False,
+        True,
+        False,
+        False,
+        True,
+        False,
+        False,
+    ]
+    assert patterns.rising(values, 1).tolist() == [
+        True,
+        True,
+        True,
+        True,
+        True,
+        True,
+        False,
+        True,
+    ]
+    assert patterns.falling(values[::-1], 2).tolist()[-3:] == [
+        False,
+        True,
+        True,
+    ]
+
+
+def test_tail_matches_whole_series() -> None:
+    values = np.random.default_rng(0).normal(size=200).cumsum()
+    whole = patterns.rising(values, 3)
+    for i in range(3, len(values) + 1):
+        assert patterns.rising(values[i - 3 : i], 3)[-1] == whole[i - 1]
+
+
+def test_crosses() -> None:
+    a = np.array([1.0, 2, 3, 2, 1])
+    b = np.full(5, 2.5)
+    assert patterns.crossed_above(a, b).tolist() == [
+        False,
+        False,
+        True,
+        False,
+        False,
+    ]
+    assert patterns.crossed_below(a, b).tolist() == [
+        False,
+        False,
+        False,
+        True,
+        False,
+    ]
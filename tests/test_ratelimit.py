@@ -0,0 +1,134 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from blankly import KeylessExchange, StrategyState
+from blankly.data.data_reader import PriceReader
+
+from quantipy.ratelimit import (
+    RateLimited,
+    RateLimitedExchange,
+    RequestScheduler,
+    TokenBucket,
+)
+from quantipy.strategies.simple import SimpleStrategy
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket() -> None:
+    clock = Clock()
+    bucket = TokenBucket(2, burst=2, clock=clock)
+    assert bucket.take() and bucket.take()
+    assert not bucket.take()
+    assert bucket.wait() == pytest.approx(0.5)
+    clock.now = 0.5
+    assert bucket.take()
+    clock.now = 100
+    assert bucket.take() and bucket.take() and not bucket.take()
+
+
+def test_scheduler_stays_under_the_exchange_limit() -> None:
+    exchange = RateLimitedExchange(rate=50, burst=2)
+    with pytest.raises(RateLimited):
+        for _ in range(5):
+            exchange.get_account()
+
+    exchange = RateLimitedExchange(rate=50, burst=2)
+    # A touch slower than the exchange allows
+    scheduler = RequestScheduler({"fake": (45, 2)})
+    interface = scheduler.wrap(exchange)
+    threads = [
+        threading.Thread(target=interface.get_account) for _ in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert exchange.rejected == 0
+    assert len(exchange.calls) == 20
+    assert scheduler.metrics()["account_requests"] == 20
+
+
+def test_scheduler_puts_orders_first() -> None:
+    exchange = RateLimitedExchange(rate=10, burst=1)
+    scheduler = RequestScheduler({"fake": (5, 1)})
+    interface = scheduler.wrap(exchange)
+    interface.get_account()
+
+    # The bucket is empty, queue up history fetches, then an order
+    threads = [
+        threading.Thread(target=interface.history, args=(f"S{i}", 10))
+        for i in range(3)
+    ]
+    threads.append(
+        threading.Thread(target=interface.market_order, args=("S0", "buy", 1))
+    )
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+
+    assert [name for name, _ in exchange.calls] == [
+        "get_account",
+        "market_order",
+        "history",
+        "history",
+        "history",
+    ]
+    assert exchange.rejected == 0
+
+
+def test_scheduler_coalesces_history() -> None:
+    exchange = RateLimitedExchange(rate=100, burst=5, latency=0.1)
+    scheduler = RequestScheduler()
+    interface = scheduler.wrap(exchange)
+    results = []
+
+    def fetch() -> None:
+        results.append(interface.history("FOO", to=5, resolution="1h"))
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(exchange.calls) == 1
+    assert scheduler.coalesced == 3
+    assert all(result == {"close": [0, 1, 2, 3, 4]} for result in results)
+    # Everyone has their own copy to append to
+    assert len({id(result["close"]) for result in results}) == 4
+    # Nothing in flight anymore, the next call goes out again
+    interface.history("FOO", to=5, resolution="1h")
+    assert len(exchange.calls) == 2
+
+
+def test_strategy_requests_go_through_the_scheduler() -> None:
+    data = Path(__file__).parent / "strategies" / "data"
+    exchange = KeylessExchange(
+        price_reader=PriceReader(
+            str(data / "pine_wave_technologies.csv"), "PWT-USD"
+        )
+    )
+    st = SimpleStrategy(exchange)
+    st.interface = RateLimitedExchange(rate=100, burst=10)
+    scheduler = RequestScheduler()
+    st.throttle(scheduler)
+    st.throttle(scheduler)
+
+    state = StrategyState(st, {}, "FOO-USD", resolution=60)
+    st.init("FOO-USD", state)
+    assert len(st.data["FOO-USD"]["close"]) == st.HISTORY
+    assert st.manager.quantity(10, state) > 0
+    metrics = scheduler.metrics()
+    assert metrics["history_requests"] == 1
+    assert metrics["account_requests"] == 1
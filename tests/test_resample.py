@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from quantipy.buffer import RingBuffer
+from quantipy.resample import Resampler, aggregate
+
+
+def test_ring_buffer_wraps() -> None:
+    buf = RingBuffer(3, [1, 2])
+    assert list(buf) == [1, 2]
+    buf.append(3)
+    buf.append(4)
+    assert list(buf) == [2, 3, 4]
+    assert buf[-1] == 4
+    assert buf[0] == 2
+    buf.extend([5, 6, 7, 8])
+    assert list(buf) == [6, 7, 8]
+    assert len(buf) == 3
+    assert np.array_equal(np.asarray(buf), [6, 7, 8])
+    with pytest.raises(IndexError):
+        buf[3]
+
+
+def test_aggregate() -> None:
+    history = {
+        "time": [0, 60, 120, 180, 240, 300],
+        "open": [1, 2, 3, 4, 5, 6],
+        "high": [2, 3, 9, 5, 6, 7],
+        "low": [0, 1, 2, 3, 4, 5],
+        "close": [1.5, 2.5, 3.5, 4.5, 5.5, 6.5],
+        "volume": [1, 1, 1, 1, 1, 1],
+    }
+    bars = aggregate(history, 180)
+    assert list(bars["time"]) == [0, 180]
+    assert list(bars["open"]) == [1, 4]
+    assert list(bars["high"]) == [9, 7]
+    assert list(bars["low"]) == [0, 3]
+    assert list(bars["close"]) == [3.5, 6.5]
+    assert list(bars["volume"]) == [3, 3]
+
+
+def test_resampler_seed_and_update() -> None:
+    frames = Resampler(["5m", "1h"], size=10)
+    history = {
+        "time": [0, 60, 120, 180, 240, 300],
+        "close": [1, 2, 3, 4, 5, 6],
+    }
+    frames.seed("FOO", history)
+
+    assert list(frames.close("FOO", "5m", partial=False)) == [5]
+    assert list(frames.close("FOO", "5m")) == [5, 6]
+    assert list(frames.close("FOO", "1h")) == [6]
+
+    frames.update("FOO", 360, 10)
+    frames.update("FOO", 420, 3)
+    bars = frames.bars_for("FOO", "5m")
+    assert bars["high"][-1] == 10
+    assert bars["low"][-1] == 3
+    assert bars["close"][-1] == 3
+
+    # Rolls into the next bucket
+    frames.update("FOO", 600, 7)
+    assert list(frames.close("FOO", "5m")) == [5, 3, 7]
+    assert list(frames.close("FOO", "1h")) == [7]
+
+    with pytest.raises(KeyError):
+        frames.close("FOO", "1d")
+
+
+def test_resampler_matches_batch_aggregation() -> None:
+    rng = np.random.default_rng(0)
+    time = np.arange(5000) * 60.0
+    close = 100 + np.cumsum(rng.normal(size=len(time)))
+
+    frames = Resampler(["30m"], size=1000)
+    frames.seed("FOO", {"time": time[:100], "close": close[:100]})
+    for t, price in zip(time[100:], close[100:]):
+        frames.update("FOO", t, price)
+
+    expected = aggregate({"time": time, "close": close}, 1800)
+    bars = frames.bars_for("FOO", "30m")
+    for column in ("time", "open", "high", "low", "close"):
+        assert np.allclose(bars[column], expected[column])
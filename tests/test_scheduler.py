@@ -0,0 +1,137 @@
+import json
+import threading
+from collections import deque
+
+import pytest
+
+from quantipy.cache import HistoryCache
+from quantipy.scheduler import Job, Scheduler
+
+
+class FakeInterface:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def get_exchange_type(self) -> str:
+        return "fake"
+
+    def history(self, symbol, to, resolution, return_as) -> dict:
+        self.calls += 1
+        return {"close": deque(range(to), to)}
+
+
+class FakeExchange:
+    instances = 0
+
+    def __init__(self, portfolio_name=None) -> None:
+        FakeExchange.instances += 1
+        self.interface = FakeInterface()
+
+
+class FakeStrategy:
+    history_cache = None
+
+    def __init__(self, exchange) -> None:
+        self.exchange = exchange
+
+    def screener(self, symbol, state) -> dict:
+        data = self.history_cache.history(
+            state.interface, symbol, 5, state.resolution
+        )
+        return {"buy": symbol == "FOO", "last": data["close"][-1]}
+
+
+@pytest.fixture
+def scheduler(tmp_path) -> Scheduler:
+    lists = tmp_path / "symbols.json"
+    lists.write_text(json.dumps({"LIST": ["FOO", "BAR", "BAZ"]}))
+    jobs = [
+        Job("a", "Fake", "Fake", "LIST", cron="*/5 * * * *", top=2),
+        Job("b", "Fake", "Fake", ["FOO"], cron="0 * * * *"),
+    ]
+    FakeExchange.instances = 0
+    return Scheduler(
+        jobs,
+        strategies={"Fake": FakeStrategy},
+        exchanges={"Fake": FakeExchange},
+        symbol_lists=lists,
+    )
+
+
+def test_history_cache_shares_fetches() -> None:
+    cache = HistoryCache()
+    interface = FakeInterface()
+    first = cache.history(interface, "FOO", 5, "1h")
+    first["close"].append(42)
+    second = cache.history(interface, "FOO", 5, "1h")
+    assert interface.calls == 1
+    assert cache.hits == 1
+    # Each caller gets its own copy
+    assert second["close"][-1] == 4
+    assert second["close"].maxlen == 5
+
+    cache.history(interface, "FOO", 5, "1m")
+    assert interface.calls == 2
+
+
+def test_history_cache_single_flight() -> None:
+    cache = HistoryCache()
+    interface = FakeInterface()
+    threads = [
+        threading.Thread(target=cache.history, args=(interface, "X", 5, "1h"))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert interface.calls == 1
+
+
+def test_scheduler_runs_due_screeners(scheduler) -> None:
+    assert scheduler.run_pending(now=0) == []
+    assert scheduler.next_run == {"a": 300, "b": 3600}
+
+    assert scheduler.run_pending(now=300) == ["a"]
+    assert scheduler.next_run["a"] == 600
+
+    assert scheduler.run_pending(now=3600) == ["a", "b"]
+
+
+def test_scheduler_shares_connections_and_history(scheduler) -> None:
+    results = scheduler.screen(scheduler.jobs[0])
+    assert results == {
+        "FOO": {"buy": True, "last": 4},
+        "BAR": {"buy": False, "last": 4},
+    }
+    scheduler.screen(scheduler.jobs[1])
+
+    assert FakeExchange.instances == 1
+    interface = scheduler.connection(scheduler.jobs[0]).interface
+    # FOO was only fetched once across both jobs
+    assert interface.calls == 2
+    assert scheduler.instances["a"].history_cache is scheduler.history
+
+
+def test_scheduler_from_file(tmp_path) -> None:
+    path = tmp_path / "schedule.json"
+    path.write_text(
+        json.dumps(
+            {
+                "jobs": [
+                    {
+                        "name": "x",
+                        "strategy": "Oversold",
+                        "exchange": "Binance",
+                        "symbols": ["BTC-USDT"],
+                        "cron": "0 0 * * *",
+                    }
+                ]
+            }
+        )
+    )
+    scheduler = Scheduler.from_file(path)
+    assert scheduler.jobs == [
+        Job("x", "Oversold", "Binance", ["BTC-USDT"], cron="0 0 * * *")
+    ]
+    assert scheduler.screeners == scheduler.jobs
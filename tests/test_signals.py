@@ -0,0 +1,145 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from quantipy.signals import (
+    Evaluation,
+    SignalStats,
+    call,
+    close,
+    compile_rules,
+    macd_cross_up,
+    param,
+    parse,
+    rising,
+    rsi,
+)
+
+
+@pytest.fixture
+def prices() -> np.ndarray:
+    return 100 + np.random.default_rng(0).normal(size=500).cumsum()
+
+
+def counter(calls: list) -> object:
+    def fn(values: np.ndarray) -> np.ndarray:
+        calls.append(1)
+        return values * 2
+
+    return fn
+
+
+def test_parse_precedence() -> None:
+    rule = parse("rsi(14) < 30 & macd_cross_up()")
+    assert rule.name == ((rsi(14) < 30) & macd_cross_up()).name
+    rule = parse("~(rsi() > HIGH) | close() >= 2 * LOW")
+    assert (
+        rule.name
+        == (~(rsi() > param("HIGH")) | (close() >= 2 * param("LOW"))).name
+    )
+    with pytest.raises(NameError):
+        parse("bogus(3) > 1")
+
+
+def test_shared_nodes_computed_once(prices) -> None:
+    calls = []
+    doubled = call("doubled", counter(calls), close())
+    # Built separately, but the same expression
+    again = call("doubled", counter(calls), close())
+    program = compile_rules(doubled > 200, again < 150)
+    assert [node.name for node in program.nodes].count(doubled.name) == 1
+
+    buy, sell = program.run({"close": prices})
+    assert len(calls) == 1
+    assert (buy == (prices * 2 > 200)).all()
+    assert (sell == (prices * 2 < 150)).all()
+
+
+def test_last_short_circuits(prices) -> None:
+    calls = []
+    rule = (close() < 0) & (call("doubled", counter(calls), close()) > 0)
+    assert not Evaluation.of(prices).last(rule)
+    assert calls == []
+    rule = (close() > 0) | (call("doubled", counter(calls), close()) > 0)
+    assert Evaluation.of(prices).last(rule)
+    assert calls == []
+
+
+def test_params_and_static_values(prices) -> None:
+    rule = rising(rsi(), param("STRIDE")) & (rsi() < param("HIGH"))
+    program = compile_rules(rule)
+    assert not rule.static and rsi().static
+
+    values = program.precompute(prices)
+    assert rsi().name in values and rule.name not in values
+
+    for stride in (1, 2, 3):
+        env = SimpleNamespace(STRIDE=stride, HIGH=60)
+        (whole,) = program.run(values, env=env)
+        # Per bar evaluation gives the same answer as the whole series
+        for n in range(len(prices) - 50, len(prices) + 1):
+            assert Evaluation.of(prices[:n], env).last(rule) == whole[n - 1]
+
+
+def test_empty_rules(prices) -> None:
+    buy, sell = compile_rules(None, "close() > 0").run({"close": prices})
+    assert not buy.any() and sell.all()
+
+
+def test_stats_put_cheap_selective_conditions_first(prices) -> None:
+    calls = []
+
+    def slow(values: np.ndarray) -> np.ndarray:
+        calls.append(1)
+        time.sleep(0.001)
+        return values
+
+    expensive = call("slow", slow, close()) > 0
+    cheap = close() < 0
+    rule = expensive & cheap
+    stats = SignalStats(every=5)
+
+    for n in range(100, 120):
+        assert Evaluation.of(prices[:n], stats=stats).last(rule) is False
+    # Written order until the first reorder, then the cheap (always
+    # rejecting) condition goes first and the slow one is skipped
+    assert len(calls) == 5
+    assert Evaluation.of(prices[:120]).last(rule) is False
+    assert [node.name for node in stats.order(rule)] == [
+        cheap.name,
+        expensive.name,
+    ]
+
+    report = {row["predicate"]: row for row in stats.report()}
+    assert report[cheap.name]["evaluations"] == 20
+    assert report[cheap.name]["hit_rate"] == 0
+    assert report[expensive.name]["evaluations"] == 5
+    assert report[expensive.name]["hit_rate"] == 1
+    assert report[expensive.name]["mean_cost"] >= 0.001
+
+
+def test_stats_leave_shared_subexpressions_out(prices) -> None:
+    def slow(values: np.ndarray) -> np.ndarray:
+        time.sleep(0.002)
+        return values
+
+    shared = call("slow", slow, close())
+    first, second = shared > 0, shared < 1e9
+    both, either = first & second, first | second
+    stats = SignalStats()
+
+    for n in range(100, 105):
+        evaluation = Evaluation.of(prices[:n], stats=stats)
+        assert evaluation.last(both) and evaluation.last(either)
+
+    # Computed for whichever went first, neither is charged for it
+    report = {(row["rule"], row["predicate"]): row for row in stats.report()}
+    assert set(report) == {
+        (both.name, first.name),
+        (both.name, second.name),
+        (either.name, first.name),
+    }
+    assert all(row["mean_cost"] < 0.002 for row in report.values())
+    assert report[both.name, first.name]["hit_rate"] == 1
@@ -0,0 +1,104 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quantipy import splits
+from quantipy.splits import Split
+from quantipy.strategies.split_protector import SplitProtector
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [("4:1", 4.0), ("1/10", 0.1), ("3-for-2", 1.5), (20, 20.0), ("2", 2.0)],
+)
+def test_parse_ratio(value, expected) -> None:
+    assert splits.parse_ratio(value) == pytest.approx(expected)
+
+
+def test_factors_and_adjust() -> None:
+    events = [Split(300, 0.5), Split(100, 4.0)]
+    time = np.array([0, 100, 200, 300, 400])
+    # A split applies from its own bar on
+    assert np.allclose(splits.factors(time, events), [2, 0.5, 0.5, 1, 1])
+    assert np.allclose(splits.factors(time, []), 1)
+
+    columns = {
+        "time": time,
+        "open": [80.0, 20.0, 22.0, 44.0, 46.0],
+        "close": [80.0, 20.0, 22.0, 44.0, 46.0],
+        "volume": [10.0, 40.0, 40.0, 20.0, 20.0],
+    }
+    adjusted = splits.adjust(columns, events)
+    assert np.allclose(adjusted["close"], [40, 40, 44, 44, 46])
+    assert np.allclose(adjusted["volume"], [20, 20, 20, 20, 20])
+    assert np.array_equal(adjusted["time"], time)
+
+
+def test_load_skips_splits_without_ratio(tmp_path) -> None:
+    path = tmp_path / "splits.json"
+    path.write_text(
+        json.dumps(
+            {
+                "AAPL": [
+                    {"start": 0, "end": 10, "time": 5, "ratio": "4:1"},
+                    {"start": 20, "end": 30},
+                ],
+                "GOOGL": [{"start": 0, "end": 10}],
+            }
+        )
+    )
+    assert splits.load(path) == {"AAPL": [Split(5.0, 4.0)]}
+
+    protector = SplitProtector(path, adjusted={"AAPL": {5.0}})
+    assert protector.safe("AAPL", 5)
+    assert not protector.safe("AAPL", 25)
+    assert not protector.safe("GOOGL", 5)
+    assert not SplitProtector(path).safe("AAPL", 5)
+
+
+def test_adjust_cache_is_idempotent(tmp_path) -> None:
+    name = "alpaca,True,AAPL-USD,0,400,60.csv"
+    frame = pd.DataFrame(
+        {
+            "time": [0, 100, 200, 300],
+            "open": [8.0, 2.0, 2.0, 2.0],
+            "high": [8.0, 2.0, 2.0, 2.0],
+            "low": [8.0, 2.0, 2.0, 2.0],
+            "close": [8.0, 2.0, 2.0, 2.0],
+            "volume": [1.0, 4.0, 4.0, 4.0],
+        }
+    )
+    frame.to_csv(tmp_path / name, index=False)
+    frame.to_csv(tmp_path / "alpaca,True,MSFT-USD,0,400,60.csv", index=False)
+
+    events = {"AAPL": [Split(100, 4.0)]}
+    assert splits.adjust_cache(tmp_path, events) == [tmp_path / name]
+    adjusted = pd.read_csv(tmp_path / name)
+    assert list(adjusted["close"]) == [2.0, 2.0, 2.0, 2.0]
+    assert list(adjusted["volume"]) == [4.0, 4.0, 4.0, 4.0]
+
+    # Already applied splits are left alone
+    assert splits.adjust_cache(tmp_path, events) == []
+    assert list(pd.read_csv(tmp_path / name)["close"]) == [2.0] * 4
+
+    # A later split only applies on top of the earlier one
+    events["AAPL"].append(Split(300, 2.0))
+    assert splits.adjust_cache(tmp_path, events) == [tmp_path / name]
+    assert list(pd.read_csv(tmp_path / name)["close"]) == [1, 1, 1, 2]
+
+
+def test_only_adjusted_files_drop_the_blackout(tmp_path) -> None:
+    events = {"AAPL": [Split(100, 4.0)]}
+    # A fresh cache, the backtest downloads (unadjusted) prices itself
+    assert splits.adjusted(tmp_path, events) == {}
+
+    frame = pd.DataFrame({"time": [0, 100], "close": [8.0, 2.0]})
+    frame.to_csv(tmp_path / "alpaca,True,AAPL,0,200,60.csv", index=False)
+    splits.adjust_cache(tmp_path, events)
+    assert splits.adjusted(tmp_path, events) == {"AAPL": {100.0}}
+
+    # Until a newly cached file is adjusted too
+    frame.to_csv(tmp_path / "alpaca,True,AAPL,200,400,60.csv", index=False)
+    assert splits.adjusted(tmp_path, events) == {}
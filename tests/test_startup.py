@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import pytest
+
+RUN = Path(__file__).parent.parent / "run.py"
+
+# Seconds `run.py -ls` may take, override for slow CI machines
+BUDGET = float(os.environ.get("QUANTIPY_STARTUP_BUDGET", 1.0))
+
+HEAVY = ["blankly", "pandas", "ta", "bokeh"]
+
+
+def run(code: str, cwd: Path) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_list_within_startup_budget(tmp_path) -> None:
+    # Warm up the bytecode cache so we only measure imports
+    subprocess.run([sys.executable, str(RUN), "-ls"], cwd=tmp_path)
+    began = perf_counter()
+    result = subprocess.run(
+        [sys.executable, str(RUN), "-ls"],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = perf_counter() - began
+    assert "Oversold" in result.stdout
+    assert "A simple strategy" in result.stdout
+    assert elapsed < BUDGET, "run.py -ls took %.2fs" % elapsed
+
+
+def test_list_does_not_import_heavy_modules(tmp_path) -> None:
+    code = f"""
+import runpy, sys
+sys.path.insert(0, {str(RUN.parent)!r})
+sys.argv = ["run.py", "-ls"]
+try:
+    runpy.run_path({str(RUN)!r}, run_name="__main__")
+except SystemExit:
+    pass
+print("imported:" + ",".join(sorted(m for m in {HEAVY!r} if m in sys.modules)))
+"""
+    result = run(code, tmp_path)
+    assert result.stdout.splitlines()[-1] == "imported:"
+    assert not (tmp_path / "strategy.log").exists()
+
+
+@pytest.mark.parametrize("name", ["Oversold", "AdvancedHarmonicOscillators"])
+def test_strategies_imported_on_access(name) -> None:
+    from quantipy.strategies import STRATEGIES
+
+    assert STRATEGIES[name].__name__ == name
+    assert STRATEGIES.doc(name) == STRATEGIES[name].__doc__
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pandas import read_csv
+
+from quantipy import storage, synthetic
+from quantipy.broker import chunks
+
+
+def test_time_deltas_use_the_narrowest_dtype() -> None:
+    time = np.arange(1.7e9, 1.7e9 + 60 * 1000, 60)
+    first, dtype, deltas = storage.encode_time(time)
+    assert dtype == np.uint8 and first == 1.7e9
+    assert np.array_equal(storage.decode_time(first, deltas), time)
+
+    # Gaps and out of order bars still round trip
+    time = np.array([100, 160, 100_000, 99_940, 200_000])
+    first, dtype, deltas = storage.encode_time(time)
+    assert dtype == np.uint32
+    assert np.array_equal(storage.decode_time(first, deltas), time)
+
+
+def test_float32_guard() -> None:
+    assert storage.fits_float32([60000.01, 0.5, 123.45])
+    assert not storage.fits_float32([200000.01])
+    assert storage.fits_float32([200000.01], decimals=0)
+    assert storage.fits_float32([0.00001234, 0.00005678])
+    assert not storage.fits_float32(np.random.default_rng(0).random(10))
+
+
+def test_round_trip(tmp_path) -> None:
+    columns, _ = synthetic.generate(10_000, seed=3, gaps=5)
+    columns["close"] = np.round(columns["close"], 2)
+    path = tmp_path / "prices.qpc"
+
+    dtypes = storage.write(path, columns, dtype="float32", block=3000)
+    assert dtypes["close"] == "<f4" and dtypes["open"] == "<f8"
+    assert len(storage.footer(path)["blocks"]) == 4
+    assert [len(b["time"]) for b in storage.blocks(path, ["time"])] == [
+        3000,
+        3000,
+        3000,
+        1000,
+    ]
+
+    read = storage.read(path)
+    assert np.array_equal(read["time"], columns["time"])
+    assert np.array_equal(read["open"], columns["open"])
+    assert np.array_equal(np.round(read["close"], 2), columns["close"])
+
+    with pytest.raises(ValueError):
+        storage.write(path, {"time": [0.5], "close": [1.0]})
+
+
+def test_streams_like_the_csv(tmp_path) -> None:
+    csv = Path(__file__).parent / "strategies/data/pine_wave_technologies.csv"
+    data = read_csv(csv).round(2)
+    path = tmp_path / "prices.qpc"
+    storage.write(path, data, dtype="float32", block=1000)
+    assert path.stat().st_size * 3 < len(data.to_csv(index=False))
+
+    streamed = list(chunks(path, 1000))
+    assert len(streamed) == 6
+    prices = storage.read_prices(path)
+    assert np.allclose(prices.values, data[list(prices)].values)
@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+import pytest
+from pandas import DataFrame
+
+from quantipy.broker import SimulatedBroker
+from quantipy.state import TradeState
+from quantipy.supervisor import (
+    CoordinatedTradeManager,
+    Coordinator,
+    SupervisorManager,
+    shard,
+)
+
+
+def test_shard() -> None:
+    symbols = ["S%d" % i for i in range(10)]
+    shards = shard(symbols, 3)
+    assert [len(s) for s in shards] == [4, 3, 3]
+    assert sorted(sum(shards, [])) == sorted(symbols)
+    assert shard(symbols[:2], 8) == [["S0"], ["S1"]]
+
+
+def test_coordinator_budget() -> None:
+    coordinator = Coordinator(1000, max_allocation=0.5)
+    assert coordinator.reserve("FOO", 800) == 500
+    assert coordinator.reserve("BAR", 800) == 500
+    assert coordinator.reserve("BAZ", 10) == 0
+    assert coordinator.available() == 0
+
+    # Re-reserving replaces the old reservation
+    assert coordinator.reserve("FOO", 100) == 100
+    assert coordinator.available() == 400
+    assert coordinator.release("BAR") == 500
+    assert coordinator.allocations() == {"FOO": 100}
+
+
+def make_state(broker, symbol, strategy) -> SimpleNamespace:
+    return SimpleNamespace(
+        interface=broker,
+        base_asset=symbol.partition("-")[0],
+        strategy=strategy,
+    )
+
+
+def test_managers_share_budget() -> None:
+    data = DataFrame({"time": [0.0], "close": [10.0]})
+    broker = SimulatedBroker(
+        {"FOO-USD": data, "BAR-USD": data}, {"USD": 10_000}
+    )
+    broker.prices.update({"FOO-USD": 10.0, "BAR-USD": 10.0})
+    strategy = SimpleNamespace(audit=lambda **kwargs: None)
+
+    coordinator = Coordinator(1000, max_allocation=0.8)
+    one = CoordinatedTradeManager(coordinator)
+    two = CoordinatedTradeManager(coordinator)
+
+    foo = make_state(broker, "FOO-USD", strategy)
+    bar = make_state(broker, "BAR-USD", strategy)
+    # 3% risk at a 5% stop ~> 60% of the budget
+    first = one.order(10, "FOO-USD", foo)
+    assert first.open and first.size == 60
+    assert coordinator.positions()["FOO"].state == TradeState.LONGING
+
+    # ... leaving only 40% for the other worker
+    second = two.order(10, "BAR-USD", bar)
+    assert second.size == 40
+    assert coordinator.available() == 0
+
+    # Nothing left, the entry is skipped and nothing stays reserved
+    baz = make_state(broker, "BAZ-USD", strategy)
+    broker.prices["BAZ-USD"] = 10.0
+    assert not one.order(10, "BAZ-USD", baz).open
+    assert "BAZ" not in coordinator.allocations()
+
+    one.order(10, "FOO-USD", foo)
+    assert "FOO" not in coordinator.positions()
+    assert coordinator.available() == 600
+
+
+def test_coordinator_proxy() -> None:
+    manager = SupervisorManager()
+    manager.start()
+    try:
+        coordinator = manager.Coordinator(100)
+        trades = CoordinatedTradeManager(coordinator)
+        trades.state.new("FOO", open=True, entry=1)
+        assert coordinator.positions()["FOO"].entry == 1
+        assert coordinator.reserve("FOO", 50) == pytest.approx(50)
+    finally:
+        manager.shutdown()
@@ -0,0 +1,98 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from quantipy import splits, synthetic
+from quantipy.synthetic import Regime
+
+
+def test_generate_is_reproducible_per_symbol() -> None:
+    columns, _ = synthetic.generate(5000, seed=7, symbol="AAA-USD")
+    again, _ = synthetic.generate(5000, seed=7, symbol="AAA-USD")
+    other, _ = synthetic.generate(5000, seed=7, symbol="BBB-USD")
+    for name in synthetic.OHLCV:
+        assert np.array_equal(columns[name], again[name])
+    assert not np.array_equal(columns["close"], other["close"])
+
+    assert np.all(np.diff(columns["time"]) == 60)
+    assert columns["time"][0] % 60 == 0
+    assert np.all(
+        columns["high"] >= np.maximum(columns["open"], columns["close"])
+    )
+    assert np.all(
+        columns["low"] <= np.minimum(columns["open"], columns["close"])
+    )
+    assert np.all(columns["low"] > 0) and np.all(columns["volume"] > 0)
+
+
+def test_regimes_switch_volatility() -> None:
+    regimes = (Regime(0.0, 0.1), Regime(0.0, 1.0))
+    index = synthetic.regimes_of(np.random.default_rng(0), 10_000, 2, 1e-3)
+    assert set(np.unique(index)) == {0, 1}
+    # Every switch goes to the other regime
+    switches = np.count_nonzero(np.diff(index))
+    assert 2 < switches < 30
+
+    calm, _ = synthetic.generate(20_000, seed=1, regimes=regimes[:1])
+    wild, _ = synthetic.generate(20_000, seed=1, regimes=regimes[1:])
+    ratio = np.std(np.diff(np.log(wild["close"]))) / np.std(
+        np.diff(np.log(calm["close"]))
+    )
+    assert 8 < ratio < 12
+
+
+def test_splits_adjust_back_to_a_continuous_series() -> None:
+    columns, events = synthetic.generate(100_000, seed=3, splits=20, gaps=0)
+    assert events
+    returns = np.abs(np.diff(np.log(columns["close"])))
+    # A split is a jump of the whole ratio in the quoted prices
+    assert returns.max() > np.log(1.9)
+
+    adjusted = splits.adjust(columns, events)
+    returns = np.abs(np.diff(np.log(adjusted["close"])))
+    assert returns.max() < 0.05
+
+
+def test_gaps_drop_bars() -> None:
+    columns, _ = synthetic.generate(100_000, seed=5, gaps=200)
+    steps = np.diff(columns["time"])
+    assert len(columns["time"]) < 100_000
+    assert steps.max() > 60 and steps.min() == 60
+
+
+def test_write_price_cache(tmp_path) -> None:
+    path, events = synthetic.generate_cache(
+        tmp_path, "alpaca", "SYN-USD", 1000, "1h", seed=0, splits=50
+    )
+    frame = pd.read_csv(path)
+    start, stop = frame["time"].iloc[0], frame["time"].iloc[-1] + 3600
+    assert path.name == f"alpaca,True,SYN-USD,{start},{stop},3600.csv"
+    assert list(frame.columns) == list(synthetic.OHLCV)
+    assert splits.symbol_of(path) == "SYN-USD"
+
+    # The backtest split adjusts them like downloaded prices
+    assert splits.adjust_cache(tmp_path, {"SYN-USD": events}) == [path]
+    adjusted = pd.read_csv(path)
+    assert np.abs(np.diff(np.log(adjusted["close"]))).max() < 0.1
+
+
+def test_regenerating_replaces_generated_splits(tmp_path) -> None:
+    path = tmp_path / "splits.json"
+    manual = {"start": 0, "end": 86400}
+    path.write_text(json.dumps({"SYN-USD": [manual]}))
+
+    _, first = synthetic.generate_cache(
+        tmp_path, "alpaca", "SYN-USD", 1000, "1h", seed=0, splits=50
+    )
+    assert splits.replace(path, {"SYN-USD": first}) == len(first)
+    _, events = synthetic.generate_cache(
+        tmp_path, "alpaca", "SYN-USD", 1000, "1h", seed=1, splits=50
+    )
+    assert splits.replace(path, {"SYN-USD": events}) == len(events)
+    assert {split.time for split in first} != {split.time for split in events}
+
+    # Only this generation's splits are adjusted for, the manual
+    # blackout is kept
+    assert splits.load(path) == {"SYN-USD": sorted(events)}
+    assert json.loads(path.read_text())["SYN-USD"][0] == manual
@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pandas import read_csv
+
+from quantipy.cache import IndicatorCache
+from quantipy.strategies.advanced import AdvancedStrategy
+from quantipy.strategies.rsi import Oversold
+from quantipy.strategies.simple import SimpleStrategy
+from quantipy.walkforward import simulate, split, variants, walk_forward
+
+DATA = Path(__file__).parent / "strategies" / "data"
+
+
+class Stops(AdvancedStrategy):
+    STOP_LOSS_PCT = 0.1
+    RISK_RATIO = 2
+
+
+def test_split() -> None:
+    folds = split(0, 100, train=40, test=20)
+    assert [(f.train, f.test) for f in folds] == [
+        ((0, 40), (40, 60)),
+        ((20, 60), (60, 80)),
+        ((40, 80), (80, 100)),
+    ]
+    anchored = split(0, 100, train=40, test=20, step=30, anchored=True)
+    assert [(f.train, f.test) for f in anchored] == [
+        ((0, 40), (40, 60)),
+        ((0, 70), (70, 90)),
+    ]
+    assert split(0, 10, train=40, test=20) == []
+
+
+def test_variants() -> None:
+    grid = {"OVERSOLD": [20, 30], "OVERBOUGHT": [70]}
+    classes = variants(Oversold, grid)
+    assert [(c.OVERSOLD, c.OVERBOUGHT) for c in classes] == [
+        (20, 70),
+        (30, 70),
+    ]
+    assert all(issubclass(c, Oversold) for c in classes)
+    assert Oversold.OVERSOLD == 30
+    assert variants(Oversold) == [Oversold]
+
+
+def test_simulate_long_only() -> None:
+    time = np.arange(6.0)
+    close = np.array([1.0, 2, 3, 4, 5, 6])
+    buy = np.array([1, 1, 0, 0, 1, 0], dtype=bool)
+    sell = np.array([1, 0, 1, 0, 0, 1], dtype=bool)
+    orders = simulate(SimpleStrategy, time, close, buy, sell, "X")
+    assert [(o["side"], o["time"]) for o in orders] == [
+        ("buy", 0),
+        ("sell", 2),
+        ("buy", 4),
+        ("sell", 5),
+    ]
+    # One unit of notional per position
+    assert orders[0]["size"] == 1 and orders[2]["size"] == 0.2
+
+
+def test_simulate_stops() -> None:
+    time = np.arange(5.0)
+    nothing = np.zeros(5, dtype=bool)
+
+    # Long hits its take profit (+20%)
+    close = np.array([10.0, 11, 12, 12, 12])
+    buy = nothing.copy()
+    buy[0] = True
+    orders = simulate(Stops, time, close, buy, nothing)
+    assert [(o["side"], o["price"]) for o in orders] == [
+        ("buy", 10),
+        ("sell", 12),
+    ]
+
+    # Short is stopped out by a 10% move against it
+    close = np.array([10.0, 10.5, 11.6, 11, 11])
+    sell = nothing.copy()
+    sell[0] = True
+    orders = simulate(Stops, time, close, nothing, sell)
+    assert [(o["side"], o["price"]) for o in orders] == [
+        ("sell", 10),
+        ("buy", 11.6),
+    ]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_walk_forward(workers) -> None:
+    data = {"PWT-USD": read_csv(DATA / "pine_wave_technologies.csv")}
+    grid = {"OVERSOLD": [20, 30], "OVERBOUGHT": [70, 80]}
+    report = walk_forward(
+        Oversold, data, train=86400, test=43200, grid=grid, workers=workers
+    )
+    assert report.summary["folds"] == len(report.folds) == 5
+    assert report.summary["trades"] == report.folds["trades"].sum()
+    assert report.summary["net"] == pytest.approx(report.folds["net"].sum())
+    assert (report.trips["entry_time"] >= report.folds["test_start"][0]).all()
+    for params in report.folds["params"]:
+        assert params["OVERSOLD"] in (20, 30)
+        assert params["OVERBOUGHT"] in (70, 80)
+
+
+def test_walk_forward_indicator_cache(tmp_path) -> None:
+    data = {"PWT-USD": read_csv(DATA / "pine_wave_technologies.csv")}
+    grid = {"OVERSOLD": [20, 30]}
+    window = {"train": 86400, "test": 43200, "grid": grid, "workers": 0}
+    expected = walk_forward(Oversold, data, **window)
+    cache = IndicatorCache(tmp_path)
+    for misses in (5, 5):
+        report = walk_forward(Oversold, data, cache=cache, **window)
+        assert report.summary == expected.summary
+        assert cache.misses == misses
+    # Every fold was read back from the cache the second time
+    assert cache.hits == 5
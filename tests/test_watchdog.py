@@ -0,0 +1,67 @@
+import threading
+
+from quantipy.watchdog import TickWatchdog
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_unbudgeted_resolutions_run_inline() -> None:
+    clock = Clock()
+    watchdog = TickWatchdog({"1m": 1.0}, clock=clock)
+    ran = []
+    with watchdog.watch("FOO", 3600):
+        clock.now += 10
+        watchdog.run(ran.append, threading.current_thread())
+    assert ran == [threading.current_thread()]
+    assert watchdog.metrics()["ticks"] == 0
+    assert watchdog.budget("1m") == watchdog.budget(60) == 1.0
+
+
+def test_late_ticks_defer_and_overruns_are_counted() -> None:
+    clock = Clock()
+    watchdog = TickWatchdog({"1m": 1.0}, report_every=2, clock=clock)
+    ran = []
+
+    def work(name: str) -> None:
+        ran.append((name, threading.current_thread().name))
+
+    with watchdog.watch("FOO", 60):
+        watchdog.run(work, "early")
+        clock.now += 0.6
+        assert watchdog.late()
+        watchdog.run(work, "late")
+        clock.now += 0.6
+    assert not watchdog.late()
+    with watchdog.watch("BAR", "1m"):
+        clock.now += 0.2
+    with watchdog.watch("FOO", "1m"):
+        clock.now += 1.5
+    watchdog.flush()
+
+    main = threading.current_thread().name
+    assert ran == [("early", main), ("late", "quantipy-deferred")]
+    metrics = watchdog.metrics()
+    assert metrics["ticks"] == 3 and metrics["overruns"] == 2
+    assert metrics["by_symbol"] == {"FOO": 2}
+    assert metrics["slowest"] == 1.5
+    # The late work and the first overrun's warning
+    assert metrics["deferred"] == 2
+
+
+def test_ticks_are_watched_per_thread() -> None:
+    clock = Clock()
+    watchdog = TickWatchdog({"1m": 1.0}, clock=clock)
+    late = []
+    with watchdog.watch("FOO", 60):
+        clock.now += 0.9
+        other = threading.Thread(target=lambda: late.append(watchdog.late()))
+        other.start()
+        other.join()
+        assert watchdog.late()
+    assert late == [False]
@@ -1,11 +1,42 @@
 import collections
+import csv
 import json
 from argparse import ArgumentParser
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 from zoneinfo import ZoneInfo
 
 
+def split_event(
+    date: str, tz: ZoneInfo, pad: int, ratio: Optional[str] = None
+) -> dict:
+    timestamp = datetime.strptime(date, "%Y-%m-%d").astimezone(tz).timestamp()
+    event = {
+        "start": int(timestamp - (86400 * pad)),
+        "end": int(timestamp + (86400 * pad)),
+        "time": int(timestamp),
+    }
+    if ratio:
+        event["ratio"] = ratio
+    return event
+
+
+def add(data: dict, symbol: str, event: dict) -> bool:
+    """Add `event` unless the symbol already has a split at that time"""
+    events = data.setdefault(symbol, [])
+    for obj in events:
+        # Older entries only have a window centered on the split
+        if obj.get("time", (obj["start"] + obj["end"]) // 2) == event["time"]:
+            # Fill in a ratio for a split that only had a window
+            if event.get("ratio") and not obj.get("ratio"):
+                obj.update(event)
+                return True
+            return False
+    events.append(event)
+    return True
+
+
 def main() -> None:
     parser = ArgumentParser(
         description="""
@@ -13,14 +44,34 @@ def main() -> None:
 
         Timestamps are calculated in US/Eastern offsets unless otherwise
         specified.
+
+        Splits with a ratio (e.g "4:1") can be back-adjusted out of the
+        price cache (see `quantipy.splits`) instead of blacking out
+        trading around them.
         """
     )
 
     parser.add_argument(
-        "symbol", type=str, help="Path of the backtest results"
+        "symbol", type=str, nargs="?", help="Symbol that split"
+    )
+
+    parser.add_argument(
+        "date", type=str, nargs="?", help="The date in YYYY-mm-dd format"
     )
 
-    parser.add_argument("date", type=str, help="The date in YYYY-mm-dd format")
+    parser.add_argument(
+        "--ratio",
+        type=str,
+        default=None,
+        help='New shares per old share, e.g "4:1" or "1:10"',
+    )
+
+    parser.add_argument(
+        "--csv",
+        type=Path,
+        default=None,
+        help="Bulk import splits from a csv with symbol,date,ratio columns",
+    )
 
     parser.add_argument(
         "--tz", type=ZoneInfo, default="US/Eastern", help="The timezone offset"
@@ -30,9 +81,19 @@ def main() -> None:
         "--pad", type=int, default=1, help="Pad X days out from start"
     )
 
+    parser.add_argument(
+        "--splits",
+        type=Path,
+        default=Path("./splits.json"),
+        help="Path of the splits file",
+    )
+
     args = parser.parse_args()
 
-    splits_path = Path("./splits.json")
+    if args.csv is None and not (args.symbol and args.date):
+        parser.error("Pass a symbol and date, or --csv")
+
+    splits_path = args.splits
     if not splits_path.exists():
         print("Could not find splits.json along %s" % splits_path)
         exit(1)
@@ -40,28 +101,29 @@ def main() -> None:
     with open(splits_path) as fp:
         data = json.load(fp)
 
-    date = datetime.strptime(args.date, "%Y-%m-%d").astimezone(args.tz)
-
-    if args.symbol not in data:
-        data[args.symbol] = []
-
-    for obj in data[args.symbol]:
-        if obj["start"] == date.timestamp():
+    rows = []
+    if args.symbol and args.date:
+        rows.append((args.symbol, args.date, args.ratio))
+    if args.csv is not None:
+        with open(args.csv, newline="") as fp:
+            for row in csv.DictReader(fp):
+                rows.append((row["symbol"], row["date"], row.get("ratio")))
+
+    added = 0
+    for symbol, date, ratio in rows:
+        event = split_event(date, args.tz, args.pad, ratio)
+        if add(data, symbol, event):
+            added += 1
+        else:
             print(
-                "%s -> %d already configured" % (args.date, date.timestamp())
+                "%s %s -> %d already configured"
+                % (symbol, date, event["time"])
             )
-            exit()
-
-    data[args.symbol].append(
-        {
-            "start": int(date.timestamp() - (86400 * args.pad)),
-            "end": int(date.timestamp() + (86400 * args.pad)),
-        }
-    )
 
     with open(splits_path, "w") as fp:
         ordered = collections.OrderedDict(data.items())
         json.dump(ordered, fp, indent=4)
+    print("Added %d of %d split(s)" % (added, len(rows)))
 
 
 if __name__ == "__main__":
@@ -1,10 +1,9 @@
 import json
 from argparse import ArgumentParser
-from collections import defaultdict
 from pathlib import Path
 
 
-def main() -> None:  # noqa: C901
+def main() -> None:
     parser = ArgumentParser(
         description="""
         CLI tool to analyze backtest json files.
@@ -19,52 +18,104 @@ def main() -> None:  # noqa: C901
         help="Path of the backtest results",
     )
 
+    parser.add_argument(
+        "--simulations",
+        type=int,
+        default=10_000,
+        help="Monte Carlo resamples of the trade sequence (0 to skip)",
+    )
+
+    parser.add_argument(
+        "--method",
+        choices=["bootstrap", "permute"],
+        default="bootstrap",
+        help="Resample trades with replacement or shuffle them",
+    )
+
+    parser.add_argument(
+        "--capital",
+        type=float,
+        default=1000,
+        help="Starting capital, used for returns and ruin",
+    )
+
+    parser.add_argument(
+        "--ruin",
+        type=float,
+        default=0.5,
+        help="Fraction of the capital that counts as ruin when lost",
+    )
+
+    parser.add_argument("--seed", type=int, default=None)
+
     args = parser.parse_args()
 
+    # Returns and ruin are fractions of it
+    if args.capital <= 0:
+        parser.error("--capital must be positive")
+
     if not args.path.exists():
         print('Could not find file along path "%s"' % args.path)
         exit(1)
 
     with open(args.path) as fp:
         data = json.load(fp)
-        orders = data["trades"]["created"]
-
-        orders_list = defaultdict(list)
-        for order in orders:
-            symbol = order["symbol"]
-            orders_list[symbol].append(
-                {
-                    "side": order["side"],
-                    "price": order["price"],
-                    "size": order["size"],
-                }
-            )
 
-        profit, loss = 0, 0
-        for symbol, orders in orders_list.items():
-            wins, pairs = 0, 0
-            for buy, sell in zip(orders[::2], orders[1::2]):
-                buy_p, sell_p, buy_q, sell_q = (
-                    buy["price"],
-                    sell["price"],
-                    buy["size"],
-                    sell["size"],
-                )
-                pairs += 1
-                if buy["price"] < sell["price"]:
-                    profit += (sell_p * sell_q) - (buy_p * buy_q)
-                    wins += 1
-                else:
-                    loss += (sell_p * sell_q) - (buy_p * buy_q)
+    # Imported here so `--help` doesn't pay for numpy/pandas
+    from quantipy.analysis import analyze
+
+    report = analyze(data)
+    summary = report["summary"]
+
+    for symbol, row in report["symbols"].iterrows():
+        print(
+            "Win Percentage [%s] ~> (%d%%) => %d wins / %d trades"
+            % (symbol, int(row.win_rate * 100), row.wins, row.trades)
+        )
+    print("Total Profit $%.2f" % summary["gross_profit"])
+    print("Total Loss $%.2f" % summary["gross_loss"])
+    print("Net $%.2f" % summary["net"])
+    print("Profit factor %.2f" % summary["profit_factor"])
+    print("Expectancy $%.2f" % summary["expectancy"])
+    print("Exposure %.2f%%" % (summary["exposure"] * 100))
+    for name, value in summary["holding"].items():
+        print("Holding period (%s) %.0fs" % (name, value))
+    print("Realized Drawdown $%.2f" % summary["max_drawdown"])
+    if "metrics" in data:
+        print("Max Drawdown %.2f%%" % data["metrics"]["max_drawdown"]["value"])
+
+    if args.simulations and len(report["round_trips"]):
+        from quantipy.montecarlo import monte_carlo
+
+        risk = monte_carlo(
+            report["round_trips"],
+            args.simulations,
+            args.method,
+            capital=args.capital,
+            ruin=args.ruin,
+            seed=args.seed,
+        )
+        print("Monte Carlo (%d %s runs)" % (args.simulations, args.method))
+        for name, label in (("final", "Net"), ("max_drawdown", "Drawdown")):
+            stats = risk[name]
             print(
-                "Win Percentage [%s] ~> (%d%%) => %d wins / %d trades"
-                % (symbol, int((wins / pairs) * 100), wins, pairs)
+                "%s $%.2f (5%% ~> $%.2f, 50%% ~> $%.2f, 95%% ~> $%.2f)"
+                % (
+                    label,
+                    stats["mean"],
+                    stats["p5"],
+                    stats["p50"],
+                    stats["p95"],
+                )
             )
-        print("Total Profit $%.2f" % profit)
-        print("Total Loss $%.2f" % loss)
-        print("Net $%.2f" % (profit + loss))
-        print("Profit factor %.2f" % abs(profit / loss))
-        print("Max Drawdown %.2f%%" % data["metrics"]["max_drawdown"]["value"])
+        print(
+            "Return 90%% interval %.2f%% to %.2f%%"
+            % (risk["return"]["p5"] * 100, risk["return"]["p95"] * 100)
+        )
+        print(
+            "Probability of losing %d%% ~> %.2f%%"
+            % (args.ruin * 100, risk["ruin"] * 100)
+        )
 
 
 if __name__ == "__main__":
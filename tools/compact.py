@@ -0,0 +1,81 @@
+from argparse import ArgumentParser
+from pathlib import Path
+
+
+def main() -> None:
+    parser = ArgumentParser(
+        description="""
+        Convert price history csv files (e.g the price cache) to compact
+        price files: delta encoded timestamps and block compressed
+        columns, optionally float32 prices (see `quantipy.storage`).
+
+        Replays and walk-forward tests read them like the csv files.
+        """
+    )
+
+    parser.add_argument(
+        "paths", type=Path, nargs="+", help="Price history csv files"
+    )
+
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Directory to write to (defaults to next to each file)",
+    )
+
+    parser.add_argument(
+        "--float32",
+        action="store_true",
+        help="Store prices and volume as float32 where every value "
+        "survives it, float64 otherwise",
+    )
+
+    parser.add_argument(
+        "--decimals",
+        type=int,
+        default=None,
+        help="Decimals the prices are quoted to, for the float32 check "
+        "(inferred by default)",
+    )
+
+    parser.add_argument(
+        "--block", type=int, default=65_536, help="Bars per compressed block"
+    )
+
+    args = parser.parse_args()
+
+    # Imported here so `--help` doesn't pay for numpy/pandas
+    from pandas import read_csv
+
+    from quantipy import storage
+
+    before = after = 0
+    for path in args.paths:
+        directory = args.output or path.parent
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / (path.stem + storage.SUFFIX)
+        dtypes = storage.write(
+            target,
+            read_csv(path),
+            dtype="float32" if args.float32 else "float64",
+            decimals=args.decimals,
+            block=args.block,
+        )
+        size, compact = path.stat().st_size, target.stat().st_size
+        before, after = before + size, after + compact
+        print(
+            "%s %d -> %d bytes (%.1fx) %s"
+            % (
+                target.name,
+                size,
+                compact,
+                size / max(compact, 1),
+                ",".join(sorted(set(dtypes.values()) - {"delta"})),
+            )
+        )
+    print("Total %d -> %d bytes" % (before, after))
+
+
+if __name__ == "__main__":
+    main()
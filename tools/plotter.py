@@ -1,24 +1,328 @@
 import json
 from argparse import ArgumentParser
 from pathlib import Path
+from typing import TYPE_CHECKING, Union
 
-from bokeh.layouts import column, gridplot
-from bokeh.models import ColumnDataSource
-from bokeh.plotting import figure, show
-from pandas import DataFrame, concat, read_csv, to_datetime, to_numeric
-from ta.momentum import RSIIndicator, StochRSIIndicator
+# bokeh, pandas and ta are imported where they're used so `--help`
+# (and importing this module) stays fast
+if TYPE_CHECKING:
+    import numpy as np
+    from bokeh.layouts import column
+    from pandas import DataFrame
 
+COLUMNS = ["time", "open", "high", "low", "close", "volume"]
+
+# Runs in the browser whenever the shared x range moves. The visible
+# window of the full resolution data is min-max decimated into the
+# (much smaller) source that is actually rendered, so zooming in
+# reveals detail without ever drawing every bar.
+ZOOM_CALLBACK = """
+const time = full.data.time;
+const close = full.data.close;
+const n = time.length;
+
+function bisect(value) {
+    let lo = 0, hi = n;
+    while (lo < hi) {
+        const mid = (lo + hi) >>> 1;
+        if (time[mid] < value) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+}
+
+const lo = Math.max(bisect(x_range.start) - 1, 0);
+const hi = Math.min(bisect(x_range.end) + 1, n);
+const picked = [];
+
+if (hi - lo <= points) {
+    for (let i = lo; i < hi; i++) picked.push(i);
+} else {
+    const buckets = Math.floor(points / 2);
+    const width = (hi - lo) / buckets;
+    for (let b = 0; b < buckets; b++) {
+        const start = lo + Math.floor(b * width);
+        const stop = Math.min(lo + Math.floor((b + 1) * width), hi);
+        let min = start, max = start;
+        for (let i = start; i < stop; i++) {
+            if (close[i] < close[min]) min = i;
+            if (close[i] > close[max]) max = i;
+        }
+        picked.push(Math.min(min, max));
+        if (min != max) picked.push(Math.max(min, max));
+    }
+}
+
+const data = {};
+for (const key of Object.keys(full.data)) {
+    const values = full.data[key];
+    data[key] = picked.map((i) => values[i]);
+}
+view.data = data;
+"""
+
+
+def overlaps(path: Path, symbol: str, start: int, end: int) -> bool:
+    """
+    Price cache files are named
+    `exchange,sandbox,symbol,start,stop,resolution.csv`, which lets
+    us skip any file outside of the requested window without reading
+    it.
+    """
+    parts = path.stem.split(",")
+    if len(parts) != 6:
+        return True
+    if parts[2] != symbol:
+        return False
+    return float(parts[3]) <= end and float(parts[4]) >= start
+
+
+def get_price_data(
+    symbol: str, start: int, end: int
+) -> Union["DataFrame", None]:
+    from pandas import concat, read_csv
 
-def get_price_data(symbol: str, start: int, end: int) -> DataFrame:
     data = []
     for _file in Path("./price_caches").glob("*%s*.csv" % symbol):
-        data.append(read_csv(_file))
+        if not overlaps(_file, symbol, start, end):
+            continue
+        frame = read_csv(_file, usecols=lambda col: col in COLUMNS)
+        data.append(frame[frame["time"].between(start, end)])
+    if not data:
+        return None
     df = concat(data)
-    df["time"] = to_numeric(df["time"], downcast="integer")
+    df["time"] = df["time"].astype("int64")
     return df.drop_duplicates(subset="time").sort_values(by="time")
 
 
-def main() -> None:  # noqa: C901
+def add_indicators(data: "DataFrame") -> "DataFrame":
+    """Compute every plotted indicator once over the full series"""
+    from ta.momentum import RSIIndicator, StochRSIIndicator
+
+    stoch = StochRSIIndicator(data["close"])
+    data["rsi"] = RSIIndicator(data["close"]).rsi()
+    data["stoch_rsi"] = stoch.stochrsi()
+    data["stoch_rsi_k"] = stoch.stochrsi_k() * 100
+    data["stoch_rsi_d"] = stoch.stochrsi_d() * 100
+    return data
+
+
+def lttb(x: "np.ndarray", y: "np.ndarray", points: int) -> "np.ndarray":
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the indices of the `points` samples that best preserve the
+    visual shape of `y`. The first and last samples are always kept.
+    """
+    import numpy as np
+
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, points - 1).astype(int)
+    picked = np.empty(points, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point)
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+            avg_x, avg_y = x[nxt].mean(), y[nxt].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        prev = picked[i]
+        area = np.abs(
+            (x[prev] - avg_x) * (y[lo:hi] - y[prev])
+            - (x[prev] - x[lo:hi]) * (avg_y - y[prev])
+        )
+        picked[i + 1] = lo + int(np.nanargmax(area)) if len(area) else lo
+
+    return picked
+
+
+def minmax(values: "np.ndarray", points: int) -> "np.ndarray":
+    """
+    Indices of the lowest and highest value in each of `points / 2`
+    equal buckets (in order), so spikes survive the decimation
+    """
+    import numpy as np
+
+    n = len(values)
+    buckets = max(points // 2, 1)
+    if n <= points:
+        return np.arange(n)
+    width = -(-n // buckets)
+    padded = np.full(buckets * width, np.nan)
+    padded[:n] = values
+    padded = padded.reshape(buckets, width)
+    # Buckets past the end are all NaN, nanargmin would raise on them
+    filled = np.isfinite(padded).any(axis=1)
+    offsets = np.arange(buckets)[filled] * width
+    lows = np.nanargmin(padded[filled], axis=1) + offsets
+    highs = np.nanargmax(padded[filled], axis=1) + offsets
+    return np.unique(np.concatenate((lows, highs)))
+
+
+def plot_symbol(
+    symbol: str,
+    group: "DataFrame",
+    data: Union["DataFrame", None],
+    points: int,
+    max_bars: int = 100_000,
+) -> "column":
+    import numpy as np
+    from bokeh.layouts import column
+    from bokeh.models import ColumnDataSource, CustomJS
+    from bokeh.plotting import figure
+
+    p = figure(
+        title=f"{symbol} Market Orders",
+        x_axis_type="datetime",
+        min_width=800,
+        min_height=400,
+    )
+
+    # Plot buy orders
+    buy_orders = group[group["side"] == "buy"]
+    p.scatter(
+        marker="circle",
+        x="time",
+        y="price",
+        size=10,
+        color="green",
+        alpha=0.5,
+        legend_label="Buy",
+        source=ColumnDataSource(buy_orders),
+    )
+
+    # Plot sell orders
+    sell_orders = group[group["side"] == "sell"]
+    p.scatter(
+        marker="triangle",
+        x="time",
+        y="price",
+        size=10,
+        color="red",
+        alpha=0.5,
+        legend_label="Sell",
+        source=ColumnDataSource(sell_orders),
+    )
+
+    p.legend.location = "top_left"
+    p.xaxis.axis_label = "Time"
+    p.yaxis.axis_label = "Price"
+
+    if data is None:
+        return column(p)
+
+    data = add_indicators(data)
+    # Milliseconds since epoch, what bokeh datetime axes expect
+    data["time"] = data["time"] * 1000
+    columns = {
+        name: data[name].to_numpy(dtype=float)
+        for name in ["time", "close", "volume", "rsi"]
+        + ["stoch_rsi_k", "stoch_rsi_d"]
+    }
+
+    # The detail the zoom callback decimates from is embedded in the
+    # HTML (and parsed by the browser) but never drawn. Past `max_bars`
+    # it's min-max decimated first, so a year of 1m bars doesn't ship
+    # whole, only zooming in below `max_bars / 2` buckets loses detail
+    if len(data) > max_bars:
+        kept = minmax(columns["close"], max_bars)
+        print(
+            "%s: embedding %d of %d bars (see --max-bars)"
+            % (symbol, len(kept), len(data))
+        )
+        columns = {k: v[kept] for k, v in columns.items()}
+    full = ColumnDataSource(columns)
+    indices = lttb(columns["time"], columns["close"], points)
+    view = ColumnDataSource({k: v[indices] for k, v in columns.items()})
+
+    callback = CustomJS(
+        args={
+            "full": full,
+            "view": view,
+            "x_range": p.x_range,
+            "points": points,
+        },
+        code=ZOOM_CALLBACK,
+    )
+    p.x_range.js_on_change("start", callback)
+    p.x_range.js_on_change("end", callback)
+
+    p.line(
+        x="time",
+        y="close",
+        line_width=2,
+        color="grey",
+        alpha=0.7,
+        legend_label="Price",
+        source=view,
+    )
+
+    volume_plot = figure(
+        title="Volume",
+        tools="xpan, xwheel_zoom, reset",
+        x_axis_type="datetime",
+        width=800,
+        height=100,
+        x_range=p.x_range,
+    )
+
+    spacing = np.median(np.diff(columns["time"])) if len(data) > 1 else 1
+    volume_plot.vbar(
+        x="time",
+        top="volume",
+        width=spacing,
+        color="blue",
+        source=view,
+    )
+
+    rsi_plot = figure(
+        title="RSI",
+        tools="xpan, xwheel_zoom, reset",
+        x_axis_type="datetime",
+        width=800,
+        height=200,
+        x_range=p.x_range,
+    )
+    rsi_plot.line(
+        x="time",
+        y="rsi",
+        line_width=2,
+        color="orange",
+        source=view,
+    )
+
+    stoch_rsi_plot = figure(
+        title="Stochastic RSI",
+        tools="xpan, xwheel_zoom, reset",
+        x_axis_type="datetime",
+        width=800,
+        height=200,
+        x_range=p.x_range,
+    )
+    stoch_rsi_plot.line(
+        x="time",
+        y="stoch_rsi_k",
+        line_width=2,
+        color="blue",
+        source=view,
+    )
+    stoch_rsi_plot.line(
+        x="time",
+        y="stoch_rsi_d",
+        line_width=2,
+        color="orange",
+        source=view,
+    )
+
+    return column(p, volume_plot, stoch_rsi_plot, rsi_plot)
+
+
+def main() -> None:
     parser = ArgumentParser(
         description="""
         CLI tool to analyze backtest json files.
@@ -34,8 +338,41 @@ def main() -> None:  # noqa: C901
         help="Path of the backtest results",
     )
 
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=None,
+        help="HTML file to write (defaults to <path>.html)",
+    )
+
+    parser.add_argument(
+        "--points",
+        type=int,
+        default=2000,
+        help="Maximum number of price points drawn at any zoom level",
+    )
+
+    parser.add_argument(
+        "--max-bars",
+        type=int,
+        default=100_000,
+        help="Most price bars embedded in the HTML per symbol, longer "
+        "histories are decimated to it (keeping every high and low)",
+    )
+
+    parser.add_argument(
+        "--show",
+        action="store_true",
+        default=False,
+        help="Open the plot in a browser after writing it",
+    )
+
     args = parser.parse_args()
 
+    if args.max_bars < args.points:
+        parser.error("--max-bars must be at least --points")
+
     if not args.path.exists():
         print('Could not find file along path "%s"' % args.path)
         exit(1)
@@ -46,133 +383,27 @@ def main() -> None:  # noqa: C901
         start = int(data["start_time"])
         end = int(data["stop_time"])
 
+    from bokeh.io import output_file, save, show
+    from bokeh.layouts import gridplot
+    from pandas import DataFrame, to_datetime
+
     df = DataFrame(orders)
     df["time"] = to_datetime(df["time"], unit="s")
 
-    grouped = df.groupby("symbol")
-
     plots = []
-    for symbol, group in grouped:
-        p = figure(
-            title=f"{symbol} Market Orders",
-            x_axis_type="datetime",
-            min_width=800,
-            min_height=400,
-        )
-
-        # Plot buy orders
-        buy_orders = group[group["side"] == "buy"]
-        p.scatter(
-            marker="circle",
-            x="time",
-            y="price",
-            size=10,
-            color="green",
-            alpha=0.5,
-            legend_label="Buy",
-            source=ColumnDataSource(buy_orders),
-        )
-
-        # Plot sell orders
-        sell_orders = group[group["side"] == "sell"]
-        p.scatter(
-            marker="triangle",
-            x="time",
-            y="price",
-            size=10,
-            color="red",
-            alpha=0.5,
-            legend_label="Sell",
-            source=ColumnDataSource(sell_orders),
-        )
-
-        # Plot symbol price as a grey line
-        if (data := get_price_data(symbol, start, end)) is not None:
-            data["price"] = data["close"]
-            data["time"] = to_datetime(data["time"], unit="s")
-            data["rsi"] = RSIIndicator(data["close"]).rsi()
-            data["stoch_rsi"] = StochRSIIndicator(data["close"]).stochrsi()
-            data["stoch_rsi_k"] = (
-                StochRSIIndicator(data["close"]).stochrsi_k() * 100
-            )
-            data["stoch_rsi_d"] = (
-                StochRSIIndicator(data["close"]).stochrsi_d() * 100
-            )
-            p.line(
-                x="time",
-                y="price",
-                line_width=2,
-                color="grey",
-                alpha=0.7,
-                legend_label="Price",
-                source=data,
-            )
-
-        p.legend.location = "top_left"
-        p.xaxis.axis_label = "Time"
-        p.yaxis.axis_label = "Price"
-
-        volume_plot = figure(
-            title="Volume",
-            tools="xpan, xwheel_zoom, reset",
-            x_axis_type="datetime",
-            width=800,
-            height=100,
-            x_range=p.x_range,
+    for symbol, group in df.groupby("symbol"):
+        prices = get_price_data(symbol, start, end)
+        plots.append(
+            plot_symbol(symbol, group, prices, args.points, args.max_bars)
         )
 
-        volume_plot.vbar(
-            x="time",
-            top="volume",
-            width=86400 * 1000,
-            color="blue",
-            source=ColumnDataSource(data),
-        )
-
-        rsi_plot = figure(
-            title="RSI",
-            tools="xpan, xwheel_zoom, reset",
-            x_axis_type="datetime",
-            width=800,
-            height=200,
-            x_range=p.x_range,
-        )
-        rsi_plot.line(
-            x="time",
-            y="rsi",
-            line_width=2,
-            color="orange",
-            source=ColumnDataSource(data),
-        )
-
-        stoch_rsi_plot = figure(
-            title="RSI",
-            tools="xpan, xwheel_zoom, reset",
-            x_axis_type="datetime",
-            width=800,
-            height=200,
-            x_range=p.x_range,
-        )
-        stoch_rsi_plot.line(
-            x="time",
-            y="stoch_rsi_k",
-            line_width=2,
-            color="blue",
-            source=ColumnDataSource(data),
-        )
-        stoch_rsi_plot.line(
-            x="time",
-            y="stoch_rsi_d",
-            line_width=2,
-            color="orange",
-            source=ColumnDataSource(data),
-        )
-
-        plots.append(column(p, volume_plot, stoch_rsi_plot, rsi_plot))
-
     # Arrange plots in a grid
     grid = gridplot(plots, ncols=1)
-    show(grid)
+    output_file(args.output or args.path.with_suffix(".html"))
+    if args.show:
+        show(grid)
+    else:
+        save(grid)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+import json
+from argparse import ArgumentParser
+from pathlib import Path
+
+
+def symbol_of(path: Path) -> str:
+    # Price cache files are `exchange,sandbox,symbol,start,stop,res.csv`
+    parts = path.stem.split(",")
+    return parts[2] if len(parts) == 6 else path.stem
+
+
+def main() -> None:
+    parser = ArgumentParser(
+        description="""
+        Replay a strategy over price history csv files on a local
+        simulated broker, much faster than a full backtest.
+
+        Fills match a paper trading backtest on a keyless exchange.
+        """
+    )
+
+    parser.add_argument("strategy", type=str, help="Strategy to replay")
+
+    parser.add_argument(
+        "paths",
+        type=Path,
+        nargs="+",
+        help="Price history files (csv or compact, see tools/compact.py)",
+    )
+
+    parser.add_argument(
+        "-sym",
+        "--symbol",
+        action="append",
+        dest="symbols",
+        default=None,
+        help="Symbol of each file, in order (defaults to the file names)",
+    )
+
+    parser.add_argument(
+        "-r", "--resolution", default="1m", help="Resolution of the files"
+    )
+
+    parser.add_argument(
+        "--start", type=float, default=None, help="First bar (epoch)"
+    )
+
+    parser.add_argument(
+        "--stop", type=float, default=None, help="Last bar (epoch)"
+    )
+
+    parser.add_argument(
+        "--cash", type=float, default=1000, help="Starting quote balance"
+    )
+
+    parser.add_argument("--quote", type=str, default="USD")
+
+    parser.add_argument(
+        "--fee", type=float, default=0.0, help="Taker fee rate per order"
+    )
+
+    parser.add_argument(
+        "--output", type=Path, default=None, help="Write the orders as json"
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read the files in chunks instead of loading them, so any "
+        "length of history fits in memory (same fills)",
+    )
+
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=10_000,
+        help="Bars per symbol kept for history reads when streaming",
+    )
+
+    parser.add_argument(
+        "--chunk",
+        type=int,
+        default=8192,
+        help="Bars per symbol read at a time when streaming",
+    )
+
+    args = parser.parse_args()
+
+    # Imported here so `--help` doesn't pay for numpy/pandas/blankly
+    from blankly import KeylessExchange
+    from blankly.data.data_reader import PriceReader
+    from pandas import DataFrame
+
+    from quantipy.analysis import round_trips, summarize
+    from quantipy.broker import SimulatedBroker, chunks, replay, stream
+    from quantipy.storage import read_prices
+    from quantipy.strategies import STRATEGIES
+
+    if args.strategy not in STRATEGIES:
+        print('Unknown strategy "%s"' % args.strategy)
+        exit(1)
+
+    symbols = args.symbols or [symbol_of(path) for path in args.paths]
+    if args.stream:
+        # blankly's exchange only needs a few prices to start, the strategy
+        # trades on the streaming broker
+        first = DataFrame(next(chunks(args.paths[0], 3)))
+        exchange = KeylessExchange(
+            price_reader=PriceReader([first], symbols[:1])
+        )
+        strategy = STRATEGIES[args.strategy](exchange)
+        broker = stream(
+            strategy,
+            dict(zip(symbols, args.paths)),
+            {args.quote: args.cash},
+            args.resolution,
+            args.start,
+            args.stop,
+            quote=args.quote,
+            fee=args.fee,
+            window=args.window,
+            chunk=args.chunk,
+        )
+    else:
+        data = {
+            symbol: read_prices(path)
+            for symbol, path in zip(symbols, args.paths)
+        }
+        exchange = KeylessExchange(
+            price_reader=PriceReader(list(data.values()), list(data))
+        )
+        strategy = STRATEGIES[args.strategy](exchange)
+        broker = SimulatedBroker(
+            data, {args.quote: args.cash}, quote=args.quote, fee=args.fee
+        )
+        replay(strategy, broker, None, args.resolution, args.start, args.stop)
+
+    orders = broker.orders()
+    summary = summarize(round_trips(orders))
+    print("Orders %d" % len(orders))
+    print("Round trips %d" % summary["trades"])
+    print("Net $%.2f" % summary["net"])
+    for asset, account in broker.account.items():
+        print("%s %.4f" % (asset, account.available))
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(orders, fp, indent=4)
+
+
+if __name__ == "__main__":
+    main()
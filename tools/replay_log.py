@@ -0,0 +1,124 @@
+import json
+from argparse import ArgumentParser
+from pathlib import Path
+
+
+def main() -> None:
+    parser = ArgumentParser(
+        description="""
+        Replay a tick log recorded with `run.py --record` through a
+        strategy on a local simulated exchange, as fast as it can tick
+        or at a multiple of the recorded pace.
+
+        Prints how long ticks took live and in the replay, so latency
+        spikes can be reproduced (and profiled with --profile) offline.
+        """
+    )
+
+    parser.add_argument("strategy", type=str, help="Strategy to replay")
+
+    parser.add_argument("log", type=Path, help="Tick log to replay")
+
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=None,
+        help="Times the recorded pace, e.g 10 (as fast as possible by "
+        "default)",
+    )
+
+    parser.add_argument(
+        "--cash", type=float, default=1000, help="Starting quote balance"
+    )
+
+    parser.add_argument("--quote", type=str, default="USD")
+
+    parser.add_argument(
+        "--fee", type=float, default=0.0, help="Taker fee rate per order"
+    )
+
+    parser.add_argument(
+        "--slowest",
+        type=int,
+        default=10,
+        help="Number of slowest ticks to list",
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        help="Write cProfile stats of the replay to this file",
+    )
+
+    parser.add_argument(
+        "--output", type=Path, default=None, help="Write the orders as json"
+    )
+
+    args = parser.parse_args()
+
+    # Imported here so `--help` doesn't pay for numpy/pandas/blankly
+    from blankly import KeylessExchange
+    from blankly.data.data_reader import PriceReader
+    from pandas import DataFrame
+
+    from quantipy import recorder
+    from quantipy.strategies import STRATEGIES
+
+    if args.strategy not in STRATEGIES:
+        print('Unknown strategy "%s"' % args.strategy)
+        exit(1)
+
+    session = recorder.load(args.log)
+    # The strategy trades on the replay's broker, this only satisfies
+    # blankly's constructor
+    prices = [DataFrame(columns) for columns in session.data.values()]
+    exchange = KeylessExchange(
+        price_reader=PriceReader(prices, list(session.data))
+    )
+    strategy = STRATEGIES[args.strategy](exchange)
+
+    def run() -> "recorder.Replayed":
+        return recorder.replay(
+            strategy,
+            args.log,
+            {args.quote: args.cash},
+            quote=args.quote,
+            fee=args.fee,
+            speed=args.speed,
+        )
+
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        replayed = profiler.runcall(run)
+        profiler.dump_stats(args.profile)
+        print("Wrote profile to %s" % args.profile)
+    else:
+        replayed = run()
+
+    live, took = replayed.live, replayed.replayed
+    print("Ticks %d" % len(took))
+    if len(took):
+        print(
+            "Tick seconds live mean %.6f max %.6f, replay mean %.6f max %.6f"
+            % (live.mean(), live.max(), took.mean(), took.max())
+        )
+        print("Slowest live ticks (live / replay seconds):")
+        for i in live.argsort()[::-1][: args.slowest]:
+            tick = replayed.session.ticks[i]
+            print(
+                "  %s %.0f %.6f / %.6f"
+                % (tick.symbol, tick.time, live[i], took[i])
+            )
+
+    orders = replayed.broker.orders()
+    print("Orders %d (%d live)" % (len(orders), len(replayed.session.orders)))
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(orders, fp, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import json
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+
+def main() -> None:
+    parser = ArgumentParser(
+        description="""
+        Generate reproducible synthetic price history straight into the
+        price cache, so backtests and benchmarks of many symbols run
+        offline.
+
+        Prices follow a geometric Brownian motion switching between
+        market regimes, with optional stock splits and gaps (see
+        `quantipy.synthetic`). Generated splits are written to the splits
+        file (replacing those of an earlier generation of the symbol), so
+        backtests (with --adjust-splits) adjust for them like for real
+        ones.
+        """
+    )
+
+    parser.add_argument(
+        "symbols",
+        type=str,
+        nargs="*",
+        help="Symbols to generate (defaults to `--count` SYN symbols)",
+    )
+
+    parser.add_argument(
+        "-n",
+        "--count",
+        type=int,
+        default=10,
+        help="Number of symbols when none are given",
+    )
+
+    parser.add_argument(
+        "--to", type=str, default="1y", help='History per symbol: e.g "1y"'
+    )
+
+    parser.add_argument(
+        "-r", "--resolution", default="1m", help="Resolution of the bars"
+    )
+
+    parser.add_argument(
+        "--start",
+        type=float,
+        default=1_700_000_000,
+        help="Time of the first bar (epoch)",
+    )
+
+    parser.add_argument("--seed", type=int, default=0)
+
+    parser.add_argument(
+        "--switch",
+        type=float,
+        default=1e-4,
+        help="Chance per bar of switching market regime",
+    )
+
+    parser.add_argument(
+        "--splits", type=float, default=0.0, help="Expected splits per year"
+    )
+
+    parser.add_argument(
+        "--gaps", type=float, default=0.0, help="Expected gaps per year"
+    )
+
+    parser.add_argument(
+        "--gap-length",
+        type=int,
+        default=60,
+        help="Average bars missing per gap",
+    )
+
+    parser.add_argument(
+        "--exchange",
+        type=str,
+        default="alpaca",
+        help="Exchange type the cache files are for",
+    )
+
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=Path("./price_caches"),
+        help="Price cache directory",
+    )
+
+    parser.add_argument(
+        "--splits-file",
+        type=Path,
+        default=Path("./splits.json"),
+        help="Splits file generated splits are written to",
+    )
+
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Processes to generate in"
+    )
+
+    args = parser.parse_args()
+
+    # Imported here so `--help` doesn't pay for numpy/pandas
+    from quantipy import splits
+    from quantipy.resample import seconds
+    from quantipy.synthetic import generate_cache
+
+    symbols = args.symbols or ["SYN%03d-USD" % i for i in range(args.count)]
+    bars = int(seconds(args.to) // seconds(args.resolution))
+    job = partial(
+        generate_cache,
+        args.cache,
+        args.exchange,
+        bars=bars,
+        resolution=args.resolution,
+        start=args.start,
+        seed=args.seed,
+        switch=args.switch,
+        splits=args.splits,
+        gaps=args.gaps,
+        gap_length=args.gap_length,
+    )
+    with ProcessPoolExecutor(args.workers) as pool:
+        results = dict(zip(symbols, pool.map(job, symbols)))
+
+    # Regenerated files have to be split adjusted again
+    manifest_path = args.cache / splits.MANIFEST
+    if manifest_path.exists():
+        with open(manifest_path) as fp:
+            manifest = json.load(fp)
+        for path, _ in results.values():
+            manifest.pop(path.name, None)
+        with open(manifest_path, "w") as fp:
+            json.dump(manifest, fp, indent=4)
+
+    # Splits of an earlier generation of these symbols are replaced, the
+    # regenerated prices don't have them
+    added = splits.replace(
+        args.splits_file,
+        {symbol: events for symbol, (_, events) in results.items()},
+    )
+
+    print(
+        "Wrote %d bars of %d symbol(s) to %s, %d split(s)"
+        % (bars, len(symbols), args.cache, added)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import json
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Tuple
+
+
+def grid_param(value: str) -> Tuple[str, list]:
+    """`STRIDE=3,5,7` -> ("STRIDE", [3, 5, 7])"""
+    name, _, values = value.partition("=")
+    return name, [json.loads(v) for v in values.split(",")]
+
+
+def symbol_of(path: Path) -> str:
+    # Price cache files are `exchange,sandbox,symbol,start,stop,res.csv`
+    parts = path.stem.split(",")
+    return parts[2] if len(parts) == 6 else path.stem
+
+
+def main() -> None:
+    parser = ArgumentParser(
+        description="""
+        Walk-forward test a strategy over price history csv files.
+
+        Every fold optimizes the strategy constants in `--grid` on its
+        train window and is scored on the test window after it.
+        """
+    )
+
+    parser.add_argument("strategy", type=str, help="Strategy to test")
+
+    parser.add_argument(
+        "paths",
+        type=Path,
+        nargs="+",
+        help="Price history files (csv or compact, see tools/compact.py)",
+    )
+
+    parser.add_argument(
+        "--train", type=str, default="30d", help="Train window per fold"
+    )
+
+    parser.add_argument(
+        "--test", type=str, default="7d", help="Test window per fold"
+    )
+
+    parser.add_argument(
+        "--step",
+        type=str,
+        default=None,
+        help="Distance between folds (defaults to the test window)",
+    )
+
+    parser.add_argument(
+        "--anchored",
+        action="store_true",
+        help="Always train from the start of the history",
+    )
+
+    parser.add_argument(
+        "--grid",
+        type=grid_param,
+        action="append",
+        default=[],
+        help="Class constant values to try, e.g `STRIDE=3,5,7`",
+    )
+
+    parser.add_argument(
+        "--objective",
+        type=str,
+        default="net",
+        help="Summary statistic maximized on the train windows",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (0 runs every fold in this process)",
+    )
+
+    parser.add_argument(
+        "--indicator-cache",
+        type=Path,
+        default=Path("./price_caches/indicators"),
+        help="Where indicators are cached between walk-forward runs (tick "
+        "by tick backtests don't use it)",
+    )
+
+    parser.add_argument(
+        "--no-indicator-cache",
+        action="store_true",
+        help="Recompute every indicator",
+    )
+
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        help="Indicator cache size in MB, least recently used go first",
+    )
+
+    parser.add_argument(
+        "--output", type=Path, default=None, help="Write the report as json"
+    )
+
+    args = parser.parse_args()
+
+    # Imported here so `--help` doesn't pay for numpy/pandas/blankly
+    from quantipy.cache import IndicatorCache
+    from quantipy.resample import seconds
+    from quantipy.storage import read_prices
+    from quantipy.strategies import STRATEGIES
+    from quantipy.walkforward import walk_forward
+
+    if args.strategy not in STRATEGIES:
+        print('Unknown strategy "%s"' % args.strategy)
+        exit(1)
+
+    data = {symbol_of(path): read_prices(path) for path in args.paths}
+    cache = None
+    if not args.no_indicator_cache:
+        cache = IndicatorCache(
+            args.indicator_cache, max_bytes=args.cache_size * 1024**2
+        )
+    report = walk_forward(
+        STRATEGIES[args.strategy],
+        data,
+        train=seconds(args.train),
+        test=seconds(args.test),
+        step=seconds(args.step) if args.step else None,
+        grid=dict(args.grid),
+        objective=args.objective,
+        anchored=args.anchored,
+        workers=args.workers,
+        cache=cache,
+    )
+
+    print(report.folds.to_string(index=False))
+    summary = report.summary
+    print("Folds %d" % summary["folds"])
+    print(
+        "Out of sample trades %d (%.2f%% wins)"
+        % (summary["trades"], summary["win_rate"] * 100)
+    )
+    print("Out of sample net %.4f" % summary["net"])
+    print("Profit factor %.2f" % summary["profit_factor"])
+    print("Expectancy %.4f" % summary["expectancy"])
+    print("Exposure %.2f%%" % (summary["exposure"] * 100))
+    print("Realized Drawdown %.4f" % summary["max_drawdown"])
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(
+                {
+                    "folds": report.folds.to_dict(orient="records"),
+                    "summary": summary,
+                    "round_trips": report.trips.to_dict(orient="records"),
+                },
+                fp,
+                indent=4,
+                default=float,
+            )
+
+
+if __name__ == "__main__":
+    main()